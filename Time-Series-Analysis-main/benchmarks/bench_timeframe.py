@@ -0,0 +1,59 @@
+"""Timeframe slicing: binary-search view vs. the old reset_index + mask filter.
+
+Run from the app directory:  python -m benchmarks.bench_timeframe
+"""
+import datetime
+import timeit
+import dateutil.relativedelta
+import numpy as np
+import pandas as pd
+from pages.utils import timeframe
+
+PERIODS = ['5d', '1mo', '3mo', '6mo', 'ytd', '1y', '5y', 'max']
+
+
+def legacy_filter_data(dataframe, num_period):
+    # plotly_figure.filter_data before the timeframe module (works on a copy here)
+    dataframe = dataframe.copy(deep=False)
+    if dataframe.index.tz is not None:
+        dataframe.index = dataframe.index.tz_localize(None)
+
+    if num_period == '1mo':
+        date = dataframe.index[-1] + dateutil.relativedelta.relativedelta(months=-1)
+    elif num_period == '5d':
+        date = dataframe.index[-1] + dateutil.relativedelta.relativedelta(days=-5)
+    elif num_period == '6mo':
+        date = dataframe.index[-1] + dateutil.relativedelta.relativedelta(months=-6)
+    elif num_period == '1y':
+        date = dataframe.index[-1] + dateutil.relativedelta.relativedelta(years=-1)
+    elif num_period == '5y':
+        date = dataframe.index[-1] + dateutil.relativedelta.relativedelta(years=-5)
+    elif num_period == 'ytd':
+        date = datetime.datetime(dataframe.index[-1].year, 1, 1)
+    else:
+        date = dataframe.index[0]
+
+    df_reset = dataframe.reset_index()
+    return df_reset[df_reset['Date'] > date]
+
+
+def make_history(rows, tz=None):
+    index = pd.bdate_range(end='2024-06-28', periods=rows, name='Date', tz=tz)
+    close = 50 * np.exp(np.cumsum(np.random.default_rng(0).normal(0, 0.01, rows)))
+    return pd.DataFrame({'Open': close, 'High': close, 'Low': close, 'Close': close,
+                         'Volume': np.ones(rows)}, index=index)
+
+
+def main(rows=16000, repeat=200):
+    history = make_history(rows, tz='America/New_York')
+    print(f'{rows} daily bars, mean of {repeat} calls')
+    print(f"{'period':>6} {'legacy ms':>10} {'slice ms':>10} {'speedup':>8} {'rows':>6}")
+    for period in PERIODS:
+        legacy = timeit.timeit(lambda: legacy_filter_data(history, period), number=repeat) / repeat
+        fast = timeit.timeit(lambda: timeframe.slice_period(history, period), number=repeat) / repeat
+        rows_shown = len(timeframe.slice_period(history, period))
+        print(f'{period:>6} {legacy * 1e3:10.3f} {fast * 1e3:10.3f} {legacy / fast:7.0f}x {rows_shown:6d}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Cold-start import times for every utils module and page, checked against a budget.
+
+Run from the app directory:
+
+    python -m benchmarks.imports
+    python -m benchmarks.imports --module-budget 0.8 --json imports.json
+
+Each measurement imports into a fresh interpreter, so nothing is shared with
+earlier imports (the OS file cache still is; the fastest of --repeats runs is
+kept). For a page only its top-level import statements run, not the
+Streamlit script itself.
+
+Two rules fail the run (exit status 1):
+
+- a module or page takes longer than its budget;
+- a utils module pulls in one of HEAVY at import time. These belong inside
+  the functions that use them, so a page only pays for what it renders.
+"""
+import os
+import ast
+import sys
+import json
+import argparse
+import subprocess
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Seconds; pandas alone takes ~0.4s, streamlit another ~0.5s
+MODULE_BUDGET = 1.0
+PAGE_BUDGET = 2.0
+REPEATS = 3
+HEAVY = ['statsmodels', 'sklearn', 'scipy', 'matplotlib', 'yfinance', 'pandas_ta_classic', 'plotly.express']
+
+_PROBE = """
+import sys, time, json
+started = time.perf_counter()
+{imports}
+print(json.dumps({{'seconds': time.perf_counter() - started, 'modules': sorted(sys.modules)}}))
+"""
+
+
+def utils_modules():
+    folder = os.path.join(APP_DIR, 'pages', 'utils')
+    return sorted(f'pages.utils.{name[:-3]}' for name in os.listdir(folder)
+                  if name.endswith('.py') and not name.startswith('_'))
+
+
+def pages():
+    folder = os.path.join(APP_DIR, 'pages')
+    return ['Trading_App.py'] + sorted(os.path.join('pages', name) for name in os.listdir(folder)
+                                       if name.endswith('.py'))
+
+
+def page_imports(path):
+    """The top-level import statements of a page, as source."""
+    with open(os.path.join(APP_DIR, path)) as f:
+        tree = ast.parse(f.read())
+    return '\n'.join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def probe(imports, repeats=REPEATS):
+    """Fastest of repeats fresh-interpreter runs of imports: (seconds, loaded module names)."""
+    best = None
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, '-c', _PROBE.format(imports=imports)], cwd=APP_DIR,
+                             capture_output=True, text=True, check=True).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        if best is None or result['seconds'] < best['seconds']:
+            best = result
+    return best['seconds'], best['modules']
+
+
+def heavy_loaded(modules):
+    return [h for h in HEAVY if h in modules]
+
+
+def run(module_budget=MODULE_BUDGET, page_budget=PAGE_BUDGET, repeats=REPEATS, log=print):
+    rows = []
+    targets = [('module', m, f'import {m}', module_budget) for m in utils_modules()] + \
+              [('page', p, page_imports(p), page_budget) for p in pages()]
+    for kind, name, imports, budget in targets:
+        seconds, modules = probe(imports, repeats)
+        heavy = heavy_loaded(modules) if kind == 'module' else []
+        row = {'kind': kind, 'name': name, 'seconds': seconds, 'budget': budget, 'heavy': heavy,
+               'ok': seconds <= budget and not heavy}
+        rows.append(row)
+        log(f"{'ok ' if row['ok'] else 'FAIL'} {name:<36} {seconds * 1e3:8.0f} ms  (budget {budget * 1e3:.0f})"
+            + (f"  heavy: {', '.join(heavy)}" if heavy else ''))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--module-budget', type=float, default=MODULE_BUDGET, help='seconds per utils module')
+    parser.add_argument('--page-budget', type=float, default=PAGE_BUDGET, help='seconds per page')
+    parser.add_argument('--repeats', type=int, default=REPEATS)
+    parser.add_argument('--json', help='also write the results here')
+    args = parser.parse_args(argv)
+
+    rows = run(args.module_budget, args.page_budget, args.repeats)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(rows, f, indent=2)
+    failed = [r['name'] for r in rows if not r['ok']]
+    print(f'\n{len(rows) - len(failed)}/{len(rows)} within budget' + (f"; over: {', '.join(failed)}" if failed else ''))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
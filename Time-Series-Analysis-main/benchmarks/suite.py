@@ -0,0 +1,217 @@
+"""Timings for the analytics hot paths on synthetic data, saved as JSON.
+
+Run from the app directory:
+
+    python -m benchmarks.suite                        # small + realistic
+    python -m benchmarks.suite --sizes stress --filter capm
+    python -m benchmarks.suite --compare ~/.cache/time_series/benchmarks/<old>.json
+
+Everything runs offline: inputs come from benchmarks.synthetic, and the
+app's caches are pointed at a throw-away directory so results never depend on
+what an earlier run (or the dashboard) left behind. Memoized steps are timed
+cold, with their cache cleared before every repetition.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import datetime
+import tempfile
+import warnings
+import statistics
+import subprocess
+import numpy as np
+import pandas as pd
+from benchmarks import synthetic
+
+SIZES = {
+    'small': {'tickers': 3, 'years': 1},
+    'realistic': {'tickers': 10, 'years': 5},
+    'stress': {'tickers': 200, 'years': 20},
+}
+DEFAULT_SIZES = ['small', 'realistic']
+# The page's default ARIMA(30, d, 30) takes minutes per fit; a small order keeps
+# the fit benchmark about the fitting machinery rather than one huge optimisation
+FIT_ORDER = (2, 2)
+PERIODS = ['1mo', '1y', '5y', 'max']
+MIN_REPEATS = 3
+MAX_REPEATS = 200
+MIN_TIME = 0.5
+REGRESSION_THRESHOLD = 1.2
+
+RESULTS_DIR = os.path.join(os.environ.get('TS_DATA_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'time_series')),
+                           'benchmarks')
+
+
+def measure(fn, setup=None, warmup=True, min_time=MIN_TIME, max_repeats=MAX_REPEATS):
+    """Wall-clock seconds of each call to fn; setup runs untimed before each one."""
+    if warmup:
+        if setup:
+            setup()
+        fn()
+    times = []
+    while len(times) < max_repeats and (len(times) < MIN_REPEATS or sum(times) < min_time):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return times
+
+
+def cases(size):
+    """(name, fn, options) for every benchmark at one size."""
+    from pages.utils import capm_functions, indicators, intraday, model_train, panel_forecast, plotly_figure, precompute, price_panel, stationarity
+
+    tickers, years = SIZES[size]['tickers'], SIZES[size]['years']
+    history = synthetic.make_ohlcv('AAA', years)
+    history_tz = synthetic.make_ohlcv('AAA', years, tz='America/New_York', gap_rate=0.01)
+    prices = synthetic.make_capm_frame(tickers, years, gap_rate=0.01)
+    returns = capm_functions.daily_return(prices)
+    stocks = [c for c in prices.columns[1:] if c != 'sp500']
+    panel = prices.set_index('Date')[stocks]
+
+    rolling_price = model_train.get_rolling_mean(history[['Close']])
+    differencing_order = model_train.get_differencing_order(rolling_price)
+    scaled_data, _ = model_train.scaling(rolling_price)
+    clear_stationarity = stationarity._log.clear
+
+    yield 'capm.daily_return', lambda: capm_functions.daily_return(prices), {}
+    yield 'capm.normalize', lambda: capm_functions.normalize(prices), {}
+    yield 'capm.calculate_beta', lambda: [capm_functions.calculate_beta(returns, s) for s in stocks], {}
+    yield 'capm.capm_stats', lambda: capm_functions.capm_stats(returns), {}
+
+    # The CAPM pages' market join: integer day index instead of merging on Date objects
+    stock_prices, market_prices = prices.set_index('Date')[stocks], prices.set_index('Date')[['sp500']]
+    yield 'capm.price_panel_align', lambda: price_panel.from_frame(stock_prices).align(
+        price_panel.from_frame(market_prices), how='inner'), {}
+    panel_returns = capm_functions.daily_return(price_panel.from_frame(prices))
+    yield 'capm.capm_stats[panel]', lambda: capm_functions.capm_stats(panel_returns), {}
+
+    yield 'model.get_differencing_order', lambda: model_train.get_differencing_order(rolling_price), \
+        {'setup': clear_stationarity}
+    yield 'model.fit_model', lambda: model_train.fit_model(scaled_data, differencing_order, arma_order=FIT_ORDER), \
+        {'warmup': False, 'max_repeats': MIN_REPEATS}
+    # Every ticker of the size in one batched fit
+    for method in panel_forecast.METHODS:
+        yield f'model.panel_forecast[{method}]', lambda m=method: panel_forecast.forecast(panel, m), {}
+
+    for period in PERIODS:
+        yield f'figure.filter_data[{period}]', lambda p=period: plotly_figure.filter_data(history_tz, p), {}
+    for name in indicators.INDICATORS:
+        yield f'indicators.compute[{name}]', lambda n=name: indicators.compute(history['Close'], n), {}
+
+    # 1-minute store holding the size's history; each read is a cold resample
+    store = intraday.IntradayStore(tempfile.mkdtemp(prefix='intraday-'), source=None)
+    store.append('AAA', synthetic.make_minute_bars('AAA', years * synthetic.TRADING_DAYS))
+    for resolution, period in [('5m', '1mo'), ('1h', '1y'), ('1d', 'max')]:
+        yield f'intraday.bars[{resolution},{period}]', \
+            lambda r=resolution, p=period: store.bars_for_period('AAA', r, p), {'setup': store._cache.clear}
+
+    # Published indicators read back from the precompute store, against computing them above
+    results = precompute.ResultStore(tempfile.mkdtemp(prefix='precompute-'))
+    version = results.begin()
+    results.put(version, 'indicators', 'AAA', *precompute.indicator_result(history['Close']))
+    results.publish(version, {'indicators': {'AAA': {}}})
+    yield 'precompute.get[indicators]', lambda: results.get('indicators', 'AAA'), {'setup': results._memory.clear}
+
+    charts = {'close_chart': plotly_figure.close_chart, 'candlestick': plotly_figure.candlestick,
+              'RSI': plotly_figure.RSI, 'Moving_average': plotly_figure.Moving_average,
+              'MACD': plotly_figure.MACD}
+    for chart, build in charts.items():
+        for period in ('1y', 'max'):
+            yield f'figure.{chart}[{period}]', lambda b=build, p=period: b(history, p), {}
+
+
+def run(sizes, name_filter=None, log=print):
+    results = []
+    for size in sizes:
+        log(f'--- {size}: {SIZES[size]} ---')
+        for name, fn, options in cases(size):
+            if name_filter and name_filter not in name:
+                continue
+            times = measure(fn, **options)
+            row = {'case': name, 'size': size, **SIZES[size], 'repeats': len(times),
+                   'min_ms': min(times) * 1e3, 'median_ms': statistics.median(times) * 1e3,
+                   'mean_ms': statistics.fmean(times) * 1e3}
+            results.append(row)
+            log(f"{name:<40} {row['median_ms']:10.3f} ms  (min {row['min_ms']:.3f}, n={row['repeats']})")
+    return results
+
+
+def _git(*args):
+    try:
+        return subprocess.run(['git', *args], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    return {
+        'commit': _git('rev-parse', '--short', 'HEAD'),
+        'dirty': bool(_git('status', '--porcelain', '--untracked-files=no')),
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def compare(baseline, results, threshold=REGRESSION_THRESHOLD, log=print):
+    """Print new/old median ratios; returns the cases slower than threshold."""
+    old = {(r['case'], r['size']): r['median_ms'] for r in baseline['results']}
+    regressions = []
+    log(f"\n{'case':<40} {'size':<10} {'old ms':>10} {'new ms':>10} {'ratio':>7}")
+    for row in results:
+        key = (row['case'], row['size'])
+        if key not in old:
+            continue
+        ratio = row['median_ms'] / old[key] if old[key] else float('inf')
+        flag = '  <-- slower' if ratio > threshold else ''
+        log(f"{row['case']:<40} {row['size']:<10} {old[key]:10.3f} {row['median_ms']:10.3f} {ratio:6.2f}x{flag}")
+        if ratio > threshold:
+            regressions.append(key)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.suite', description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', default=','.join(DEFAULT_SIZES), help='comma-separated: ' + ','.join(SIZES))
+    parser.add_argument('--filter', help='only cases whose name contains this')
+    parser.add_argument('--output', help=f'JSON path (default: {RESULTS_DIR}/<commit>.json)')
+    parser.add_argument('--compare', help='earlier results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help='median ratio above which a case counts as a regression')
+    args = parser.parse_args(argv)
+
+    sizes = [s.strip() for s in args.sizes.split(',') if s.strip()]
+    unknown = set(sizes) - set(SIZES)
+    if unknown:
+        parser.error(f'unknown size(s): {", ".join(sorted(unknown))}')
+
+    # Must happen before pages.utils is imported: caches are created at import time
+    os.environ['TS_DATA_DIR'] = tempfile.mkdtemp(prefix='ts-bench-')
+    # statsmodels' convergence chatter would drown the table
+    warnings.simplefilter('ignore')
+    env = environment()
+    report = {'environment': env, 'results': run(sizes, args.filter)}
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{env['commit'] or 'unknown'}{'-dirty' if env['dirty'] else ''}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'\nwrote {output}')
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report['results'], args.threshold)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
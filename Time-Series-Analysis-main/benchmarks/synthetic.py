@@ -0,0 +1,98 @@
+"""Deterministic synthetic market data for benchmarks.
+
+The same (ticker, years, seed) always produces the same bars, so timings from
+different commits are measured on identical input. Closes follow a geometric
+random walk with a per-ticker drift and volatility; Open/High/Low are drawn
+around them so High >= max(Open, Close) and Low <= min(Open, Close).
+"""
+import zlib
+import numpy as np
+import pandas as pd
+
+END_DATE = '2024-06-28'
+TRADING_DAYS = 252
+
+
+def ticker_names(count):
+    """Benchmark-only symbols: AAA, AAB, ... (never real tickers hit offline)."""
+    letters = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    return [''.join(letters[(i // 26 ** k) % 26] for k in (2, 1, 0)) for i in range(count)]
+
+
+def _rng(ticker, seed):
+    return np.random.default_rng([zlib.crc32(ticker.encode()), seed])
+
+
+def make_ohlcv(ticker='AAA', years=5, end=END_DATE, tz=None, gap_rate=0.0, outage_days=0, seed=0):
+    """Daily bars for one ticker, Date-indexed like data_store returns them.
+
+    gap_rate drops that fraction of sessions at random (missing bars);
+    outage_days removes one contiguous block, like a halted or delisted stretch.
+    tz localizes the index, as yfinance's .history() does.
+    """
+    rng = _rng(ticker, seed)
+    rows = int(years * TRADING_DAYS)
+    index = pd.bdate_range(end=end, periods=rows, name='Date')
+
+    drift = rng.normal(0.08, 0.05) / TRADING_DAYS
+    vol = rng.uniform(0.15, 0.6) / np.sqrt(TRADING_DAYS)
+    close = rng.uniform(10, 500) * np.exp(np.cumsum(rng.normal(drift, vol, rows)))
+    open_ = close * np.exp(rng.normal(0, vol / 2, rows))
+    spread = np.abs(rng.normal(0, vol, (2, rows)))
+    frame = pd.DataFrame({
+        'Open': open_,
+        'High': np.maximum(open_, close) * np.exp(spread[0]),
+        'Low': np.minimum(open_, close) * np.exp(-spread[1]),
+        'Close': close,
+        'Volume': np.round(rng.lognormal(14, 0.5, rows)),
+    }, index=index)
+
+    keep = rng.random(rows) >= gap_rate
+    if outage_days and rows > outage_days:
+        start = rng.integers(0, rows - outage_days)
+        keep[start:start + outage_days] = False
+    frame = frame[keep]
+    if tz is not None:
+        # Sessions close at 16:00 local time
+        frame.index = (frame.index + pd.Timedelta(hours=16)).tz_localize(tz)
+    return frame
+
+
+def make_universe(count, years=5, tz=None, gap_rate=0.0, outage_days=0, seed=0):
+    """{ticker: bars} for count synthetic tickers."""
+    return {t: make_ohlcv(t, years, tz=tz, gap_rate=gap_rate, outage_days=outage_days, seed=seed)
+            for t in ticker_names(count)}
+
+
+def make_capm_frame(count, years=5, gap_rate=0.0, seed=0):
+    """Close prices as the CAPM pages build them: a 'Date' column, one column
+    per stock and the market as 'sp500', inner-joined on dates."""
+    universe = make_universe(count, years, gap_rate=gap_rate, seed=seed)
+    market = make_ohlcv('^GSPC', years, gap_rate=gap_rate, seed=seed)['Close'].rename('sp500')
+    closes = [bars['Close'].rename(t) for t, bars in universe.items()]
+    return pd.concat(closes + [market], axis=1, join='inner').reset_index()
+
+
+SESSION_MINUTES = 390
+
+
+def make_minute_bars(ticker='AAA', days=TRADING_DAYS, end=END_DATE, tz='America/New_York', seed=0):
+    """1-minute bars for regular sessions (09:30-16:00 local), tz-aware like yfinance's."""
+    rng = _rng(ticker, seed)
+    sessions = pd.bdate_range(end=end, periods=days)
+    opens = (sessions + pd.Timedelta(hours=9, minutes=30)).tz_localize(tz)
+    minutes = pd.to_timedelta(np.tile(np.arange(SESSION_MINUTES), days), unit='min')
+    index = (opens.repeat(SESSION_MINUTES) + minutes).rename('Date')
+
+    rows = len(index)
+    vol = rng.uniform(0.15, 0.6) / np.sqrt(TRADING_DAYS * SESSION_MINUTES)
+    close = rng.uniform(10, 500) * np.exp(np.cumsum(rng.normal(0, vol, rows)))
+    open_ = np.r_[close[0], close[:-1]]
+    spread = np.abs(rng.normal(0, vol, (2, rows)))
+    return pd.DataFrame({
+        'Open': open_,
+        'High': np.maximum(open_, close) * np.exp(spread[0]),
+        'Low': np.minimum(open_, close) * np.exp(-spread[1]),
+        'Close': close,
+        'Volume': np.round(rng.lognormal(8, 0.5, rows)),
+    }, index=index)
@@ -1,11 +1,10 @@
 import streamlit as st
 import datetime
-import yfinance as yf
-import pandas as pd
-from pages.utils import capm_functions
+from pages.utils import capm_functions, data_store, metadata, price_panel, profiling, rolling_stats
 import plotly.express as px
 
 st.set_page_config(page_title="CAPM Beta", page_icon="🧩", layout="wide")
+profiling.start_trace("CAPM_Beta")
 
 st.title('Individual Stock Beta 🧩')
 
@@ -19,13 +18,8 @@ if st.button("Analyze Stock"):
     with st.spinner(f"Fetching details and market data for {stock}..."):
         try:
             # 1. Fetch Company Details First
-            ticker_obj = yf.Ticker(stock)
-            
-            # Using .get() is safer to avoid crashes if info is missing
-            try:
-                info = ticker_obj.info
-            except:
-                info = {}
+            # Served from the metadata cache; stale entries refresh in the background
+            info = metadata.get_info(stock)
 
             # --- DISPLAY COMPANY DETAILS ---
             if info:
@@ -49,36 +43,24 @@ if st.button("Analyze Stock"):
             start = datetime.date(end.year - year, end.month, end.day)
 
             # S&P 500
-            SP500 = yf.download('^GSPC', start=start, end=end, progress=False)
-            SP500.reset_index(inplace=True)
-            SP500 = SP500[['Date', 'Close']]
-            SP500.columns = ['Date', 'sp500']
-            SP500['Date'] = pd.to_datetime(SP500['Date']).dt.date
+            SP500 = price_panel.from_frame(data_store.get_close('^GSPC', start, end, name='sp500'))
 
             # User Stock
-            stock_df = yf.download(stock, start=start, end=end, progress=False)
+            stock_df = price_panel.from_frame(data_store.get_close(stock, start, end))
             
             if stock_df.empty:
                 st.error(f"❌ Could not find price data for **{stock}**. Please check the ticker symbol.")
             else:
-                if isinstance(stock_df.columns, pd.MultiIndex):
-                    stock_df = stock_df['Close']
-                else:
-                    stock_df = stock_df[['Close']]
-                
-                stock_df.columns = [stock]
-                stock_df.reset_index(inplace=True)
-                stock_df['Date'] = pd.to_datetime(stock_df['Date']).dt.date
-
-                # 3. Merge and Calculate
-                df = pd.merge(stock_df, SP500, on='Date', how='inner')
+                # 3. Merge and Calculate (integer day index, no Date objects)
+                df = stock_df.align(SP500, how='inner')
                 
                 if len(df) < 10:
                     st.warning("Not enough overlapping data between this stock and S&P 500 to calculate Beta.")
                 else:
                     daily_ret = capm_functions.daily_return(df)
                     
-                    beta, alpha = capm_functions.calculate_beta(daily_ret, stock)
+                    stats = capm_functions.capm_stats(daily_ret)
+                    beta, alpha = stats.at[stock, 'Beta'], stats.at[stock, 'Alpha']
                     
                     # 4. Display Results
                     st.subheader("Analysis Results")
@@ -96,7 +78,7 @@ if st.button("Analyze Stock"):
                     col_return.metric("Expected Annual Return (CAPM)", f"{expected_return:.2f}%")
                     
                     # 5. Plot
-                    fig = px.scatter(daily_ret, x='sp500', y=stock, 
+                    fig = px.scatter(daily_ret.to_frame(), x='sp500', y=stock, 
                                      title=f"Regression Analysis: {stock} vs S&P 500", 
                                      template="plotly_dark",
                                      labels={'sp500': 'Market Returns (S&P 500)', stock: f'{stock} Returns'},
@@ -110,5 +92,25 @@ if st.button("Analyze Stock"):
                     
                     st.plotly_chart(fig, use_container_width=True)
 
+                    # 6. Rolling Beta (3M / 6M / 1Y windows)
+                    windows = {63: '3M', 126: '6M', 252: '1Y'}
+                    rolling = rolling_stats.rolling_beta(daily_ret, windows=list(windows))
+                    rolling = rolling.xs(stock, axis=1, level='Stock').rename(columns=windows).dropna(how='all')
+
+                    if rolling.empty:
+                        st.info("Not enough history for a rolling beta (needs at least 3 months).")
+                    else:
+                        fig_roll = px.line(rolling, x=rolling.index, y=rolling.columns,
+                                           title=f"Rolling Beta: {stock} vs S&P 500",
+                                           template="plotly_dark",
+                                           labels={'x': 'Date', 'value': 'Beta', 'Window': 'Window'})
+                        fig_roll.add_hline(y=1, line_dash="dash", line_color="#888", annotation_text="Market (Beta=1)")
+                        fig_roll.update_layout(height=400, paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)',
+                                               legend=dict(orientation="h", y=1.1))
+                        st.plotly_chart(fig_roll, use_container_width=True)
+
         except Exception as e:
-            st.error(f"An error occurred: {e}")
\ No newline at end of file
+            st.error(f"An error occurred: {e}")
+
+# Per-stage timings for this rerun (only when TS_PROFILE=1)
+profiling.render_panel()
@@ -1,13 +1,14 @@
 import streamlit as st
 import datetime
 import pandas as pd
-import yfinance as yf
-from pages.utils import capm_functions
+import numpy as np
+from pages.utils import capm_functions, data_store, portfolio, price_panel, profiling
 import plotly.express as px
 import plotly.graph_objects as go
 
 # 1. Page Config
 st.set_page_config(page_title="CAPM Return", page_icon="📉", layout="wide")
+profiling.start_trace("CAPM_Return")
 
 st.title('CAPM: Expected Returns & Portfolio Analysis 📉')
 
@@ -33,6 +34,7 @@ with col1:
 with col2:
     year = st.number_input("Analysis Period (Years)", 1, 15, 3)
     st.caption("Recommended: 3-5 Years for stable Beta calculation.")
+    n_portfolios = st.select_slider("Simulated Portfolios", [10_000, 50_000, 100_000, 250_000, 500_000], 100_000)
 
 # 3. Calculation Engine
 if st.button("🚀 Calculate CAPM Return", help="Run the Capital Asset Pricing Model"):
@@ -44,50 +46,31 @@ if st.button("🚀 Calculate CAPM Return", help="Run the Capital Asset Pricing M
                 end = datetime.date.today()
                 start = datetime.date(end.year - year, end.month, end.day)
 
-                # --- A. Download Market Data (S&P 500) ---
-                SP500 = yf.download('^GSPC', start=start, end=end, progress=False)
-                SP500.reset_index(inplace=True)
-                SP500 = SP500[['Date', 'Close']]
-                SP500.columns = ['Date', 'sp500']
-                SP500['Date'] = pd.to_datetime(SP500['Date']).dt.date
+                # --- A. Download Market + Stock Data (one batched request) ---
+                panel = price_panel.from_frame(data_store.get_panel(stocks_list + ['^GSPC'], start, end))
+                if '^GSPC' not in panel.names:
+                    st.error("Could not download S&P 500 benchmark data.")
+                    st.stop()
 
-                # --- B. Download Stock Data Loop ---
-                stocks_df = pd.DataFrame()
-                valid_stocks = []
+                SP500 = panel.select(['^GSPC']).rename({'^GSPC': 'sp500'}).dropna()
 
-                for stock in stocks_list:
-                    data = yf.download(stock, start=start, end=end, progress=False)
-                    
-                    if not data.empty:
-                        if isinstance(data.columns, pd.MultiIndex):
-                            data = data['Close']
-                        else:
-                            data = data[['Close']]
-                        
-                        data.columns = [stock]
-                        
-                        if stocks_df.empty:
-                            stocks_df = data
-                        else:
-                            stocks_df = stocks_df.join(data, how='outer')
-                        valid_stocks.append(stock)
+                # --- B. Stock Price Panel (already aligned on Date) ---
+                valid_stocks = [s for s in stocks_list if s in panel.names and s != '^GSPC']
+                stocks_df = panel.select(valid_stocks).dropna(how='all')
                 
                 if stocks_df.empty:
                     st.error("No valid data found for the selected stocks.")
                     st.stop()
 
-                stocks_df.reset_index(inplace=True)
-                stocks_df['Date'] = pd.to_datetime(stocks_df['Date']).dt.date
-                
-                # --- C. Merge Stocks with Market ---
-                merged_df = pd.merge(stocks_df, SP500, on='Date', how='inner')
+                # --- C. Merge Stocks with Market (integer day index, no Date objects) ---
+                merged_df = stocks_df.align(SP500, how='inner')
 
                 # --- D. Visuals: Performance Chart ---
                 st.markdown("---")
                 st.subheader("2. Historical Price Performance (Normalized)")
                 st.caption("This chart shows how $1 invested in each asset would have grown over the selected period.")
                 
-                normalized_df = capm_functions.normalize(merged_df)
+                normalized_df = capm_functions.normalize(merged_df).to_frame()
                 
                 # Custom Plotly Chart for better visuals
                 fig_perf = px.line(normalized_df, x='Date', y=normalized_df.columns[1:], 
@@ -98,28 +81,19 @@ if st.button("🚀 Calculate CAPM Return", help="Run the Capital Asset Pricing M
 
                 # --- E. Calculations ---
                 daily_ret = capm_functions.daily_return(merged_df)
-                
-                beta = {}
-                for i in valid_stocks:
-                    b, a = capm_functions.calculate_beta(daily_ret, i)
-                    beta[i] = b
 
                 # CAPM Inputs
                 rm = daily_ret['sp500'].mean() * 252 # Annualized Market Return
                 rf = 0 # Risk Free Rate (Simplified to 0, or set to 4.0 for 4%)
                 
-                # Create Results DataFrame
-                results_data = []
-                for stock, b_val in beta.items():
-                    exp_ret = rf + (b_val * (rm - rf))
-                    results_data.append({
-                        "Stock": stock,
-                        "Beta": round(b_val, 2),
-                        "Expected Return (%)": round(exp_ret, 2),
-                        "Volatility": "High" if b_val > 1 else "Low"
-                    })
-                
-                res_df = pd.DataFrame(results_data)
+                # Create Results DataFrame (all assets regressed in one pass)
+                stats = capm_functions.capm_stats(daily_ret, rf=rf)
+                res_df = pd.DataFrame({
+                    "Stock": stats.index,
+                    "Beta": stats['Beta'].round(2).to_numpy(),
+                    "Expected Return (%)": stats['Expected Return'].round(2).to_numpy(),
+                    "Volatility": np.where(stats['Beta'] > 1, "High", "Low"),
+                })
 
                 # --- F. Detailed Results Section ---
                 st.markdown("---")
@@ -167,5 +141,45 @@ if st.button("🚀 Calculate CAPM Return", help="Run the Capital Asset Pricing M
                 fig_scatter.update_layout(height=500, paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
                 st.plotly_chart(fig_scatter, use_container_width=True)
 
+                # --- H. Efficient Frontier ---
+                if len(valid_stocks) >= 2:
+                    st.markdown("---")
+                    st.subheader("4. Efficient Frontier (Long-Only)")
+                    st.caption(f"{n_portfolios:,} random portfolios, with the minimum-variance and maximum-Sharpe portfolios solved directly.")
+
+                    mu, cov = portfolio.moments(daily_ret)
+                    points = portfolio.simulate(mu, cov, n_portfolios, rf=rf / 100)
+                    min_var = portfolio.min_variance(mu, cov)
+                    max_sharpe = portfolio.max_sharpe(mu, cov, rf=rf / 100)
+                    curve = portfolio.frontier(mu, cov)
+
+                    # A browser cannot draw 500k markers usefully; plot a fixed sample of them
+                    shown = points.sample(min(len(points), 20_000), random_state=0)
+                    fig_frontier = go.Figure()
+                    fig_frontier.add_trace(go.Scattergl(x=shown['Volatility'] * 100, y=shown['Return'] * 100, mode='markers',
+                                                        marker=dict(size=3, color=shown['Sharpe'], colorscale='Viridis',
+                                                                    showscale=True, colorbar=dict(title='Sharpe')),
+                                                        name='Random Portfolios'))
+                    fig_frontier.add_trace(go.Scatter(x=curve['Volatility'] * 100, y=curve['Return'] * 100, mode='lines',
+                                                      line=dict(color='#00e676', width=3), name='Efficient Frontier'))
+                    for label, weights, color in [('Min Variance', min_var, '#2979ff'), ('Max Sharpe', max_sharpe, '#ff1744')]:
+                        perf = portfolio.performance(weights, mu, cov, rf / 100)
+                        fig_frontier.add_trace(go.Scatter(x=[perf['Volatility'] * 100], y=[perf['Return'] * 100], mode='markers',
+                                                          marker=dict(symbol='star', size=16, color=color), name=label))
+                    fig_frontier.add_trace(go.Scatter(x=np.sqrt(np.diag(cov)) * 100, y=mu * 100, mode='markers+text',
+                                                      text=list(mu.index), textposition='top center',
+                                                      marker=dict(size=9, color='white'), name='Assets'))
+                    fig_frontier.update_layout(template="plotly_dark", height=550, paper_bgcolor='rgba(0,0,0,0)',
+                                               plot_bgcolor='rgba(0,0,0,0)', xaxis_title='Volatility (%)',
+                                               yaxis_title='Expected Return (%)', legend=dict(orientation="h", y=1.1))
+                    st.plotly_chart(fig_frontier, use_container_width=True)
+
+                    weights_df = pd.DataFrame({'Min Variance (%)': min_var * 100, 'Max Sharpe (%)': max_sharpe * 100}).round(2)
+                    st.markdown("#### ⚖️ Optimal Weights")
+                    st.dataframe(weights_df)
+
             except Exception as e:
-                st.error(f"Analysis Failed: {e}")
\ No newline at end of file
+                st.error(f"Analysis Failed: {e}")
+
+# Per-stage timings for this rerun (only when TS_PROFILE=1)
+profiling.render_panel()
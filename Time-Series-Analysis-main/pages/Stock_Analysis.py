@@ -1,11 +1,12 @@
 import streamlit as st
 import pandas as pd
-import yfinance as yf
 import datetime
+from pages.utils import data_store, intraday, metadata, precompute, profiling
 from pages.utils.plotly_figure import plotly_table, close_chart, candlestick, RSI, Moving_average, MACD 
 
 # 1. Page Config
 st.set_page_config(page_title="Stock Analysis", page_icon="📊", layout="wide")
+profiling.start_trace("Stock_Analysis")
 
 st.title("Stock Analysis Dashboard 📊")
 
@@ -46,12 +47,9 @@ if btn_c4.button("Microsoft"): update_ticker("MSFT"); st.experimental_rerun()
 if btn_c5.button("Amazon"): update_ticker("AMZN"); st.experimental_rerun()
 
 # 3. Fetch Data & Company Details
-stock = yf.Ticker(ticker)
-
-try:
-    info = stock.info
-except:
-    info = {}
+# Cached metadata renders at once; stale entries refresh in the background
+metadata.prefetch(["AAPL", "TSLA", "GOOGL", "MSFT", "AMZN"])
+info = metadata.get_info(ticker)
 
 # --- COMPANY HEADER & DETAILS ---
 st.markdown("---")
@@ -79,8 +77,9 @@ else:
     m3.metric("52 Week High", f"${info.get('fiftyTwoWeekHigh', 'N/A')}")
     m4.metric("Beta", round(info.get('beta', 0), 2) if info.get('beta') else "N/A")
 
-    # Download Data
-    data = yf.download(ticker, start=start_date, end=end_date, progress=False)
+    # Download Data (full history once; the date-range table is a slice of it)
+    full_history = data_store.get_history(ticker)
+    data = full_history[(full_history.index >= pd.Timestamp(start_date)) & (full_history.index < pd.Timestamp(end_date))]
 
     if data.empty:
         st.warning("No price data found for the selected date range.")
@@ -93,8 +92,10 @@ else:
         
         # --- TIMEFRAME BUTTONS (New Smooth Implementation) ---
         st.write("Select Timeframe:")
-        tf1, tf2, tf3, tf4, tf5, tf6, tf7 = st.columns(7)
+        tf_d, tf_w, tf1, tf2, tf3, tf4, tf5, tf6, tf7 = st.columns(9)
         
+        if tf_d.button("1D"): update_timeframe('1d'); st.experimental_rerun()
+        if tf_w.button("5D"): update_timeframe('5d'); st.experimental_rerun()
         if tf1.button("1M"): update_timeframe('1mo'); st.experimental_rerun()
         if tf2.button("3M"): update_timeframe('3mo'); st.experimental_rerun()
         if tf3.button("6M"): update_timeframe('6mo'); st.experimental_rerun()
@@ -108,33 +109,53 @@ else:
 
         # --- CHART SETTINGS ---
         # Placed in new columns to avoid nesting issues
-        set_c1, set_c2 = st.columns(2)
+        set_c1, set_c2, set_c3 = st.columns(3)
         with set_c1:
             chart_type = st.selectbox('Chart Type', ['Candle', 'Line'])
         with set_c2:
             indicators = st.selectbox('Add Indicator', ['None', 'RSI', 'MACD', 'Moving Average'])
+        with set_c3:
+            resolution = st.selectbox('Resolution', ['1d', '1h', '15m', '5m', '1m'])
 
         # --- CHART RENDERING ---
-        ticker_obj = yf.Ticker(ticker)
-        full_history = ticker_obj.history(period='max')
-        
         # Use session state timeframe
         target_period = st.session_state.timeframe
 
+        # Daily history, or intraday bars resampled from the 1-minute store
+        chart_data, chart_key = full_history, ticker
+        if resolution == '1d':
+            # Indicators published by the post-close precompute run; new bars are folded in on top
+            precompute.load_indicators(ticker)
+        else:
+            store = intraday.get_store()
+            try:
+                store.refresh(ticker)
+            except Exception:
+                pass  # charts use whatever bars are already stored
+            bars = store.bars_for_period(ticker, resolution, target_period)
+            if bars.empty:
+                st.warning(f"No {resolution} bars stored for **{ticker}**; showing daily bars.")
+            else:
+                # Cached chart data and indicator state are kept per resolution
+                chart_data, chart_key = bars, f'{ticker}@{resolution}'
+                if bars.attrs.get('clipped'):
+                    st.caption(f"Showing the latest {len(bars):,} {resolution} bars; pick a coarser resolution for the full range.")
+
         if chart_type == 'Candle':
-            fig = candlestick(full_history, target_period)
+            fig = candlestick(chart_data, target_period, ticker=chart_key)
         else:
             if indicators == 'Moving Average':
-                fig = Moving_average(full_history, target_period)
+                fig = Moving_average(chart_data, target_period, ticker=chart_key)
             else:
-                fig = close_chart(full_history, target_period)
+                fig = close_chart(chart_data, target_period, ticker=chart_key)
 
-        st.plotly_chart(fig, use_container_width=True)
+        with profiling.span('render.chart'):
+            st.plotly_chart(fig, use_container_width=True)
 
         if indicators == 'RSI':
-            st.plotly_chart(RSI(full_history, target_period), use_container_width=True)
+            st.plotly_chart(RSI(chart_data, target_period, ticker=chart_key), use_container_width=True)
         elif indicators == 'MACD':
-            st.plotly_chart(MACD(full_history, target_period), use_container_width=True)
+            st.plotly_chart(MACD(chart_data, target_period, ticker=chart_key), use_container_width=True)
 
         # ==========================================
         # SECTION 2: RECENT DATA
@@ -153,4 +174,7 @@ else:
 
         disp_df = data.tail(10).sort_index(ascending=False).round(2)
         disp_df.index = disp_df.index.strftime('%Y-%m-%d')
-        st.dataframe(disp_df)
\ No newline at end of file
+        st.dataframe(disp_df)
+
+# Per-stage timings for this rerun (only when TS_PROFILE=1)
+profiling.render_panel()
@@ -1,32 +1,142 @@
 import streamlit as st
-from pages.utils.model_train import get_data, get_rolling_mean, get_differencing_order, scaling, evaluate_model, get_forecast, inverse_scaling
+from pages.utils.model_train import get_data, get_panel_data, get_rolling_mean, get_panel_rolling_mean, get_differencing_order, scaling, evaluate_model, get_forecast, get_fast_forecast, get_incremental_forecast, inverse_scaling
 import pandas as pd
-import yfinance as yf
 from pages.utils.plotly_figure import plotly_table, Moving_average_forecast
+from pages.utils.order_search import cached_search
+from pages.utils import backtest, metadata, panel_forecast, precompute, profiling, watchlist
 
 st.set_page_config(
         page_title="Stock Prediction",
         page_icon="chart_with_downwards_trend",
         layout="wide",
     )
+profiling.start_trace("Stock_Prediction")
 
 st.title("Stock Prediction")
 
-col1, col2, col3 = st.columns(3)
+FAST_METHODS = {'ar': f'AR({panel_forecast.AR_LAGS}) on daily changes', 'holt': 'Damped Holt smoothing',
+                'drift': 'Drift', 'naive': 'Naive (last value)'}
+
+mode_col, engine_col, method_col = st.columns(3)
+with mode_col:
+    mode = st.radio('Mode', ['Single Ticker', 'Watchlist'], horizontal=True)
+with engine_col:
+    # Fast: batched NumPy models fitted on every ticker at once instead of statsmodels ARIMA
+    engine = st.radio('Engine', ['ARIMA', 'Fast'], horizontal=True)
+with method_col:
+    if engine == 'Fast':
+        fast_method = st.selectbox('Fast Model', list(FAST_METHODS), format_func=FAST_METHODS.get)
+
+def show_forecast(slot, ticker, model, rmse, forecast, history):
+    with slot.container():
+        st.markdown(f'### {ticker}')
+        st.write(f"**Selected Model:** {model} | **Model RMSE Score:** {rmse}")
+        fig_tail = plotly_table(forecast.round(3))
+        fig_tail.update_layout(height = 220)
+        st.plotly_chart(fig_tail, use_container_width=True)
+        with profiling.span('render.chart'):
+            st.plotly_chart(Moving_average_forecast(pd.concat([history, forecast]).iloc[150:]),
+                            use_container_width=True)
+
+# --- Watchlist: forecasts fitted on worker processes, shown as each one finishes ---
+if mode == 'Watchlist':
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        tickers = st.text_input('Tickers (comma separated)', 'AAPL, MSFT, GOOGL, AMZN').upper()
+    with col2:
+        search_budget = st.number_input('Order Search Budget (seconds)', 5, 600, 30, step=5)
+    with col3:
+        search_method = st.selectbox('Order Search', ['grid', 'stepwise'])
+    with col4:
+        timeout = st.number_input('Timeout per Ticker (seconds)', 10, 1800, watchlist.TIMEOUT_SECONDS, step=10)
+
+    tickers = list(dict.fromkeys(t.strip() for t in tickers.split(',') if t.strip()))
+    status = st.empty()
+    progress = st.progress(0.0)
+    # One slot per ticker, in watchlist order, filled whenever that ticker is ready
+    slots = {t: st.empty() for t in tickers}
+    for t in tickers:
+        slots[t].info(f'{t}: queued')
+
+    if engine == 'Fast':
+        # The whole watchlist is one matrix: a single batched fit, no worker processes
+        with st.spinner('Fitting the watchlist...'), profiling.span('model.panel_forecast', method=fast_method):
+            panel = get_panel_rolling_mean(get_panel_data(tickers))
+            forecasts = get_fast_forecast(panel, fast_method)
+            rmses = panel_forecast.holdout_rmse(panel, fast_method).round(2)
+        for t in tickers:
+            if t not in forecasts:
+                slots[t].error(f'{t}: no price data')
+                continue
+            history = panel[[t]].dropna().rename(columns={t: 'Close'})
+            show_forecast(slots[t], t, FAST_METHODS[fast_method], rmses[t], forecasts[t], history)
+        progress.progress(1.0)
+        status.caption(f'Finished {len(tickers)} tickers')
+        profiling.render_panel()
+        st.stop()
+
+    # Forecasts the post-close precompute run fitted with these search settings are shown straight away
+    options = {'search_method': search_method, 'search_budget': search_budget}
+    finished, pending = 0, []
+    for t in tickers:
+        if precompute.get_store().published('forecast', t):
+            history = get_rolling_mean(get_data(t))
+            result = precompute.get_forecast(t, history.index[-1], options)
+            if result is not None:
+                show_forecast(slots[t], t, f"ARIMA({result['p'][0]}, {result['d'][0]}, {result['q'][0]}), precomputed",
+                              result['RMSE'][0], result.set_index('Date')[['Close']], history)
+                finished += 1
+                continue
+        pending.append(t)
+    progress.progress(finished / len(tickers) if tickers else 1.0)
+
+    # Changing any input reruns the script, which leaves this block and stops the workers
+    with watchlist.Watchlist(pending, search_method, search_budget, timeout=timeout) as run:
+        for event in run.events():
+            if event['event'] == 'progress':
+                status.caption(f"Running: {', '.join(event['running'])} "
+                               f"({event['done']}/{event['total']} done)")
+                continue
+            t = event['ticker']
+            if event['event'] == 'timeout':
+                slots[t].warning(f'{t}: stopped after {timeout} seconds')
+            elif event['event'] == 'failed':
+                slots[t].error(f"{t}: {event['error']}")
+            else:
+                result = event['forecast']
+                show_forecast(slots[t], t, f"ARIMA({result['p'][0]}, {result['d'][0]}, {result['q'][0]})",
+                              result['RMSE'][0], result.set_index('Date')[['Close']], get_rolling_mean(get_data(t)))
+            finished += 1
+            progress.progress(finished / len(tickers))
+    status.caption(f'Finished {len(tickers)} tickers')
+
+    profiling.render_panel()
+    st.stop()
+
+col1, col2, col3, col4 = st.columns(4)
 
 with col1:
     # ADDED .upper() HERE -> Automatically converts input to Uppercase
     ticker = st.text_input('Stock Ticker', 'AAPL').upper()
 
+with col2:
+    search_budget = st.number_input('Order Search Budget (seconds)', 5, 600, 60, step=5)
+
+with col3:
+    search_method = st.selectbox('Order Search', ['grid', 'stepwise'])
+
+with col4:
+    # Incremental: keep the fitted state and only filter the bars added since
+    forecast_mode = st.selectbox('Forecast Mode', ['Full refit', 'Incremental'])
+
 # --- Display Company Details ---
 try:
     if ticker:
-        stock = yf.Ticker(ticker)
-        # Use .info to get details, handle potential errors gracefully
-        info = stock.info
+        # Served from the metadata cache; stale entries refresh in the background
+        info = metadata.get_info(ticker)
         
         # Only show if we found valid data
-        if info and len(info) > 5:
+        if info:
             st.markdown(f"### {info.get('longName', ticker)}")
             st.write(f"**Sector:** {info.get('sector', 'N/A')} | **Industry:** {info.get('industry', 'N/A')}")
             
@@ -44,15 +154,69 @@ st.subheader('Predicting Next 30 days Close Price for: '+ticker)
 close_price = get_data(ticker)
 rolling_price = get_rolling_mean(close_price)
 
-differencing_order = get_differencing_order(rolling_price)
-scaled_data, scaler = scaling(rolling_price)
-rmse = evaluate_model(scaled_data, differencing_order)
+if engine == 'Fast':
+    # Batched NumPy fit; RMSE is on the last 30 days, in price units
+    with profiling.span('model.panel_forecast', method=fast_method):
+        forecast = get_fast_forecast(rolling_price, fast_method)['Close']
+        rmse = panel_forecast.holdout_rmse(rolling_price, fast_method).iloc[0]
+    st.write(f"**Selected Model:** {FAST_METHODS[fast_method]}")
+    st.write("**Model RMSE Score:**", round(rmse, 2))
+else:
+    # Published by the post-close precompute run when it fitted the same bars with the same search
+    # settings (always a full refit); computed here otherwise
+    options = {'search_method': search_method, 'search_budget': search_budget}
+    precomputed = precompute.get_forecast(ticker, rolling_price.index[-1], options) if forecast_mode == 'Full refit' else None
+    published = precompute.get_store().published('forecast', ticker)
+    if precomputed is None and published and published['as_of'] == str(rolling_price.index[-1]):
+        st.caption(f"Not using the precomputed forecast ({precompute.describe(published['options'])}, full refit): "
+                   "it was fitted with other settings")
+    if precomputed is not None:
+        p, differencing_order, q = (int(precomputed[c].iloc[0]) for c in ('p', 'd', 'q'))
+        rmse = precomputed['RMSE'].iloc[0]
+        forecast = precomputed.set_index('Date')[['Close']]
+        st.write(f"**Selected Model:** ARIMA({p}, {differencing_order}, {q}), precomputed after the close "
+                 f"({precompute.describe(options)})")
+        st.write("**Model RMSE Score:**",rmse)
+    else:
+        differencing_order = get_differencing_order(rolling_price)
+        scaled_data, scaler = scaling(rolling_price)
 
-st.write("**Model RMSE Score:**",rmse)
+        # Order is chosen on the training part only, so the holdout RMSE stays honest
+        with st.spinner("Searching for the best ARIMA order..."):
+            search = cached_search(scaled_data[:-30], differencing_order, ticker=ticker,
+                                   dates=rolling_price.index[:-30], method=search_method, budget=search_budget)
+        arma_order = search['order']
+        p, q = arma_order
 
-forecast = get_forecast(scaled_data, differencing_order)
+        rmse = evaluate_model(scaled_data, differencing_order, ticker=ticker, dates=rolling_price.index, arma_order=arma_order)
 
-forecast['Close'] = inverse_scaling( scaler, forecast['Close'])
+        st.write(f"**Selected Model:** ARIMA({p}, {differencing_order}, {q}) by {search['criterion'].upper()}")
+        st.write("**Model RMSE Score:**",rmse)
+
+        with st.expander("Order Search Trace"):
+            st.caption(f"{len(search['trace'])} candidates in {search['seconds']:.1f}s"
+                       + (" (budget reached)" if search['timed_out'] else ""))
+            st.dataframe(search['trace'])
+
+    # Walk-forward backtest: many origins instead of the single 30-day holdout above
+    if st.checkbox("Run walk-forward backtest (slower)"):
+        folds = st.slider("Backtest origins", 3, 20, 8)
+        with st.spinner("Backtesting over multiple cut-off dates..."):
+            bt_metrics, _ = backtest.backtest(rolling_price['Close'].to_numpy(), folds=folds,
+                                              models={f'ARIMA({p},{differencing_order},{q})': ('arima', p, q),
+                                                      'Naive': ('naive',), 'Drift': ('drift',)})
+        st.write('##### Backtest Error by Horizon (price units)')
+        shown = bt_metrics[bt_metrics['horizon'].isin([1, 5, 10, 20, 30])]
+        st.dataframe(shown.pivot(index='horizon', columns='model', values=['rmse', 'mae', 'mape']).round(3))
+
+    if precomputed is None:
+        if forecast_mode == 'Incremental':
+            forecast, update_action = get_incremental_forecast(rolling_price['Close'].to_numpy(), differencing_order,
+                                                               ticker=ticker, arma_order=arma_order)
+            st.caption(f"Incremental update: {update_action}")
+        else:
+            forecast = get_forecast(scaled_data, differencing_order, ticker=ticker, dates=rolling_price.index, arma_order=arma_order)
+            forecast['Close'] = inverse_scaling( scaler, forecast['Close'])
 st.write('##### Forecast Data (Next 30 days)')
 fig_tail = plotly_table(forecast.sort_index(ascending = True).round(3))
 fig_tail.update_layout(height = 220)
@@ -60,4 +224,8 @@ st.plotly_chart(fig_tail, use_container_width=True)
 
 forecast = pd.concat([rolling_price, forecast])
 
-st.plotly_chart(Moving_average_forecast(forecast.iloc[150:]), use_container_width=True)
\ No newline at end of file
+with profiling.span('render.chart'):
+    st.plotly_chart(Moving_average_forecast(forecast.iloc[150:]), use_container_width=True)
+
+# Per-stage timings for this rerun (only when TS_PROFILE=1)
+profiling.render_panel()
@@ -0,0 +1,159 @@
+"""Rolling-origin backtests for the forecasters in model_train.
+
+A backtest cuts a series at several origins, forecasts `horizon` steps from
+each one and scores every horizon step across all folds (RMSE, MAE, MAPE).
+Folds are split into contiguous chunks that run on a process pool; inside a
+chunk ARIMA is estimated once and later origins either just extend the
+Kalman filter with the new observations ('append'), re-estimate from the
+previous parameters ('warm') or start from scratch ('full').
+
+Models are plain tuples so they can be sent to worker processes:
+('arima', p, q) with d taken from get_differencing_order, ('naive',) and
+('drift',).
+"""
+import math
+import warnings
+import numpy as np
+import pandas as pd
+from pages.utils import parallel, profiling
+
+HORIZON = 30
+FOLDS = 8
+DEFAULT_MODELS = {'ARIMA(2,d,2)': ('arima', 2, 2), 'Naive': ('naive',), 'Drift': ('drift',)}
+
+
+def _cutoffs(n, horizon, folds, step, min_train):
+    step = step or horizon
+    last = n - horizon
+    cutoffs = [last - i * step for i in range(folds)]
+    return sorted(c for c in cutoffs if c >= min_train)
+
+
+def _baseline(kind, train, horizon):
+    steps = np.arange(1, horizon + 1)
+    if kind == 'drift' and len(train) > 1:
+        return train[-1] + steps * (train[-1] - train[0]) / (len(train) - 1)
+    return np.repeat(train[-1], horizon)
+
+
+def _run_chunk(values, cutoffs, model, differencing_order, horizon, refit, window):
+    """Forecast from each origin in cutoffs (ascending); returns one row per fold."""
+    rows = []
+    fitted, previous = None, None
+    for cut in cutoffs:
+        lo = max(0, cut - window) if window else 0
+        train, actual = values[lo:cut], values[cut:cut + horizon]
+
+        if model[0] != 'arima':
+            predictions = _baseline(model[0], train, horizon)
+        else:
+            from statsmodels.tsa.arima.model import ARIMA
+
+            order = (model[1], differencing_order, model[2])
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                if fitted is None or refit == 'full':
+                    fitted = ARIMA(train, order=order).fit()
+                elif refit == 'warm':
+                    fitted = ARIMA(train, order=order).fit(start_params=fitted.params)
+                elif window:
+                    # Same parameters, filtered over the new window
+                    fitted = fitted.apply(train)
+                else:
+                    # Same parameters, Kalman filter extended with the bars since the last origin
+                    fitted = fitted.append(values[previous:cut])
+            predictions = np.asarray(fitted.forecast(horizon))
+
+        rows.append({'cutoff': cut, 'errors': predictions - actual, 'actual': actual})
+        previous = cut
+    return rows
+
+
+def _chunks(items, count):
+    size = math.ceil(len(items) / max(1, count))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _metrics(fold_rows, horizon):
+    errors = np.vstack([r['errors'] for r in fold_rows])
+    actual = np.vstack([r['actual'] for r in fold_rows])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ape = np.abs(errors) / np.abs(actual) * 100
+    return pd.DataFrame({
+        'horizon': np.arange(1, horizon + 1),
+        'rmse': np.sqrt(np.mean(errors ** 2, axis=0)),
+        'mae': np.mean(np.abs(errors), axis=0),
+        'mape': np.nanmean(np.where(np.isfinite(ape), ape, np.nan), axis=0),
+        'folds': len(fold_rows),
+    })
+
+
+@profiling.timed('backtest')
+def backtest_many(series, models=None, horizon=HORIZON, folds=FOLDS, step=None, min_train=None,
+                  window=None, refit='append', workers=None):
+    """Backtest every model on every series in one process pool.
+
+    series maps a name (e.g. ticker) to a 1-D price series. window=None grows
+    the training set (expanding window); an int keeps only the last `window`
+    observations (rolling window). Returns (metrics, folds): per-horizon
+    scores, and one row per (series, model, origin) with the mean abs error.
+    """
+    from pages.utils.model_train import get_differencing_order
+
+    models = models or DEFAULT_MODELS
+    min_train = min_train or 5 * horizon
+    jobs = []
+    for name, values in series.items():
+        values = np.asarray(values, dtype=np.float64).ravel()
+        cutoffs = _cutoffs(len(values), horizon, folds, step, min_train)
+        if not cutoffs:
+            continue
+        first = values[max(0, cutoffs[0] - window) if window else 0:cutoffs[0]]
+        d = get_differencing_order(pd.Series(first)) if any(m[0] == 'arima' for m in models.values()) else 0
+        for label, model in models.items():
+            jobs.append((name, label, values, cutoffs, model, d))
+
+    workers = workers or parallel.default_workers()
+    # Enough chunks per job to keep every worker busy, but no more: each chunk pays one full fit
+    per_job = max(1, math.ceil(workers / max(1, len(jobs))))
+    tasks = [(name, label, chunk, (values, chunk, model, d, horizon, refit, window))
+             for name, label, values, cutoffs, model, d in jobs
+             for chunk in _chunks(cutoffs, per_job)]
+
+    if workers > 1 and len(tasks) > 1:
+        with parallel.get_context().Pool(min(workers, len(tasks))) as pool:
+            outputs = pool.starmap(_run_chunk, [t[3] for t in tasks])
+    else:
+        outputs = [_run_chunk(*t[3]) for t in tasks]
+
+    collected = {}
+    for (name, label, _, _), rows in zip(tasks, outputs):
+        collected.setdefault((name, label), []).extend(rows)
+
+    metric_frames, fold_rows = [], []
+    for (name, label), rows in collected.items():
+        rows.sort(key=lambda r: r['cutoff'])
+        metric_frames.append(_metrics(rows, horizon).assign(series=name, model=label))
+        fold_rows += [{'series': name, 'model': label, 'cutoff': r['cutoff'],
+                       'mae': float(np.mean(np.abs(r['errors'])))} for r in rows]
+
+    columns = ['series', 'model', 'horizon', 'rmse', 'mae', 'mape', 'folds']
+    metrics = pd.concat(metric_frames, ignore_index=True)[columns] if metric_frames else pd.DataFrame(columns=columns)
+    return metrics, pd.DataFrame(fold_rows, columns=['series', 'model', 'cutoff', 'mae'])
+
+
+def backtest(values, models=None, **kwargs):
+    """backtest_many() for a single series; returns the same (metrics, folds) pair."""
+    return backtest_many({'series': values}, models, **kwargs)
+
+
+def backtest_watchlist(tickers, models=None, **kwargs):
+    """Backtest the prediction page's target (7-day rolling mean close) for each ticker."""
+    from pages.utils.model_train import get_data, get_rolling_mean
+
+    series = {}
+    for ticker in tickers:
+        close = get_data(ticker)
+        if not close.empty:
+            series[ticker] = get_rolling_mean(close)['Close'].to_numpy()
+    return backtest_many(series, models, **kwargs)
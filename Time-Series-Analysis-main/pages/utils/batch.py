@@ -0,0 +1,221 @@
+"""Headless batch run of the dashboard analytics over a universe of tickers.
+
+    time-series-batch universe.txt --tasks forecast,capm,indicators
+
+The universe file lists one ticker per line ('#' starts a comment) or is a
+CSV with a ticker/symbol column. Prices for the whole universe are refreshed
+with one batched download, then tickers are spread over a process pool. Every
+finished (task, ticker) is written straight away as a Parquet part under
+<output>/parts, so an interrupted run resumes where it stopped; at the end the
+parts are combined into <output>/<task>.parquet plus a manifest.json.
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import datetime
+import pandas as pd
+from pages.utils import parallel, profiling
+from pages.utils.data_store import DATA_DIR
+
+TASKS = ['forecast', 'capm', 'indicators']
+MARKET = '^GSPC'
+CAPM_YEARS = 5
+HOLDOUT = 30
+
+
+def read_universe(path):
+    if path.lower().endswith('.csv'):
+        frame = pd.read_csv(path)
+        column = next((c for c in frame.columns if str(c).lower() in ('ticker', 'symbol')), frame.columns[0])
+        tickers = frame[column].dropna().astype(str)
+    else:
+        with open(path) as f:
+            tickers = [line.split('#', 1)[0] for line in f]
+    return list(dict.fromkeys(t.strip().upper() for t in tickers if t.strip()))
+
+
+# --- TASKS ---
+def forecast(ticker, search_method='grid', search_budget=60):
+    """The Stock_Prediction pipeline: order search, holdout RMSE and 30-day forecast."""
+    from pages.utils import model_train
+    from pages.utils.order_search import cached_search
+
+    close_price = model_train.get_data(ticker)
+    rolling_price = model_train.get_rolling_mean(close_price)
+    differencing_order = model_train.get_differencing_order(rolling_price)
+    scaled_data, scaler = model_train.scaling(rolling_price)
+
+    # Already inside a pool worker, so the search runs its candidates serially
+    search = cached_search(scaled_data[:-HOLDOUT], differencing_order, ticker=ticker,
+                           dates=rolling_price.index[:-HOLDOUT], method=search_method,
+                           budget=search_budget, workers=1)
+    arma_order = search['order']
+    rmse = model_train.evaluate_model(scaled_data, differencing_order, ticker=ticker,
+                                      dates=rolling_price.index, arma_order=arma_order)
+    result = model_train.get_forecast(scaled_data, differencing_order, ticker=ticker,
+                                      dates=rolling_price.index, arma_order=arma_order)
+    result['Close'] = model_train.inverse_scaling(scaler, result['Close'])
+
+    result.index.name = 'Date'
+    return result.reset_index().assign(Ticker=ticker, p=arma_order[0], d=differencing_order, q=arma_order[1],
+                                       RMSE=rmse, **{'As Of': rolling_price.index[-1]})
+
+
+def capm(ticker, years=CAPM_YEARS):
+    """Beta, alpha and CAPM expected return against the S&P 500, as on CAPM_Beta."""
+    from pages.utils import capm_functions, data_store, price_panel
+
+    end = datetime.date.today()
+    start = datetime.date(end.year - years, end.month, end.day)
+    prices = price_panel.from_frame(data_store.get_close(ticker, start, end)).align(
+        price_panel.from_frame(data_store.get_close(MARKET, start, end, name='sp500')), how='inner')
+    returns = capm_functions.daily_return(prices)
+    stats = capm_functions.capm_stats(returns)
+    return stats.reset_index().rename(columns={'Stock': 'Ticker'}).assign(Observations=len(prices))
+
+
+def indicators(ticker):
+    """RSI, SMA 50 and MACD over the full stored history."""
+    from pages.utils import data_store, indicators as technical
+
+    close = data_store.get_history(ticker)['Close']
+    values = pd.concat([technical.compute(close, name) for name in technical.INDICATORS], axis=1)
+    return values.assign(Close=close).reset_index().assign(Ticker=ticker)
+
+
+def run_ticker(ticker, tasks, options):
+    """Run the pending tasks for one ticker; returns (ticker, {task: frame}, {task: error})."""
+    runners = {
+        'forecast': lambda: forecast(ticker, options['search_method'], options['search_budget']),
+        'capm': lambda: capm(ticker, options['years']),
+        'indicators': lambda: indicators(ticker),
+    }
+    results, errors = {}, {}
+    for task in tasks:
+        try:
+            results[task] = runners[task]()
+        except Exception as exc:
+            errors[task] = f'{type(exc).__name__}: {exc}'
+    return ticker, results, errors
+
+
+# --- CHECKPOINTS ---
+def _part_path(output, task, ticker):
+    return os.path.join(output, 'parts', task, re.sub(r'[^A-Za-z0-9._-]', '_', ticker) + '.parquet')
+
+
+def _write_part(path, frame):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    frame.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def pending(output, tickers, tasks):
+    """{ticker: [tasks without a checkpoint]} for the tickers that still have work."""
+    todo = {}
+    for ticker in tickers:
+        missing = [t for t in tasks if not os.path.exists(_part_path(output, t, ticker))]
+        if missing:
+            todo[ticker] = missing
+    return todo
+
+
+def combine(output, tickers, tasks):
+    """Concatenate the per-ticker parts of each task into <output>/<task>.parquet."""
+    written = {}
+    for task in tasks:
+        paths = [_part_path(output, task, t) for t in tickers if os.path.exists(_part_path(output, task, t))]
+        if paths:
+            frame = pd.concat([pd.read_parquet(p) for p in paths], ignore_index=True)
+            _write_part(os.path.join(output, f'{task}.parquet'), frame)
+            written[task] = len(paths)
+    return written
+
+
+def run(tickers, tasks=TASKS, output=None, workers=None, years=CAPM_YEARS,
+        search_method='grid', search_budget=60, log=print):
+    """Run tasks for every ticker, resuming from any checkpoints in output."""
+    from pages.utils import data_store
+
+    output = output or os.path.join(DATA_DIR, 'batch', datetime.date.today().isoformat())
+    options = {'years': years, 'search_method': search_method, 'search_budget': search_budget}
+    started = time.monotonic()
+
+    todo = pending(output, tickers, tasks)
+    log(f'{len(tickers)} tickers, {len(tickers) - len(todo)} already done, {len(todo)} to run -> {output}')
+    if todo:
+        # One batched download up front; the workers then read from the local store
+        refreshed = list(todo) + ([MARKET] if 'capm' in tasks else [])
+        prices = data_store.get_store()
+        prices.refresh_many(refreshed)
+        for ticker in refreshed:
+            if ticker in prices.errors:
+                log(f'{ticker}: price refresh failed, using stored bars ({prices.errors[ticker]})')
+
+    failures = {}
+    args = [(ticker, missing, options) for ticker, missing in todo.items()]
+    workers = workers or parallel.default_workers(len(args))
+    if workers > 1 and len(args) > 1:
+        pool = parallel.get_context().Pool(workers)
+        results = pool.imap_unordered(_run_ticker_args, args)
+    else:
+        pool = None
+        results = (run_ticker(*a) for a in args)
+    try:
+        for done, (ticker, frames, errors) in enumerate(results, 1):
+            for task, frame in frames.items():
+                _write_part(_part_path(output, task, ticker), frame)
+            if errors:
+                failures[ticker] = errors
+            log(f'[{done}/{len(args)}] {ticker}' + (f' failed: {errors}' if errors else ''))
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+    written = combine(output, tickers, tasks)
+    manifest = {'run_date': datetime.date.today().isoformat(), 'tasks': list(tasks), 'tickers': len(tickers),
+                'completed': written, 'failures': failures, 'seconds': round(time.monotonic() - started, 1)}
+    with open(os.path.join(output, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    profiling.write_prometheus()
+    return manifest
+
+
+def _run_ticker_args(args):
+    return run_ticker(*args)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='time-series-batch', description=__doc__.split('\n\n')[0])
+    parser.add_argument('universe', help='ticker list (one per line) or CSV with a ticker/symbol column')
+    parser.add_argument('--tasks', default=','.join(TASKS), help='comma-separated subset of ' + ','.join(TASKS))
+    parser.add_argument('--output', help='run directory (default: DATA_DIR/batch/<today>)')
+    parser.add_argument('--workers', type=int, help='worker processes (default: one per core)')
+    parser.add_argument('--years', type=int, default=CAPM_YEARS, help='CAPM look-back in years')
+    parser.add_argument('--search', default='grid', choices=['grid', 'stepwise'], help='ARIMA order search')
+    parser.add_argument('--budget', type=float, default=60, help='order search budget per ticker (seconds)')
+    parser.add_argument('--fresh', action='store_true', help='ignore checkpoints from an earlier run')
+    args = parser.parse_args(argv)
+
+    tasks = [t.strip() for t in args.tasks.split(',') if t.strip()]
+    unknown = set(tasks) - set(TASKS)
+    if unknown:
+        parser.error(f'unknown task(s): {", ".join(sorted(unknown))}')
+
+    output = args.output or os.path.join(DATA_DIR, 'batch', datetime.date.today().isoformat())
+    if args.fresh and os.path.isdir(os.path.join(output, 'parts')):
+        import shutil
+        shutil.rmtree(os.path.join(output, 'parts'))
+
+    manifest = run(read_universe(args.universe), tasks, output, args.workers, args.years, args.search, args.budget)
+    print(json.dumps({k: manifest[k] for k in ('completed', 'seconds')}))
+    return 1 if manifest['failures'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
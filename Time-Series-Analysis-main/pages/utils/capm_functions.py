@@ -1,8 +1,12 @@
-import plotly.express as px
 import numpy as np
 import pandas as pd
+from pages.utils import profiling
+from pages.utils.price_panel import PricePanel
 
 def interactive_plot(df):
+    # plotly.express is only needed for this chart; CAPM math and batch runs skip it
+    import plotly.express as px
+
     fig = px.line(df, x='Date', y=df.columns[1:], title="Performance Comparison")
     fig.update_layout(
         template="plotly_dark",
@@ -14,19 +18,73 @@ def interactive_plot(df):
     return fig
 
 def normalize(df):
+    if isinstance(df, PricePanel):
+        return df.with_values(df.values / df.values[:1])
     x = df.copy()
-    for i in x.columns[1:]:
-        x[i] = x[i] / x[i][0]
+    cols = x.columns[1:]
+    x[cols] = x[cols] / x[cols].iloc[0]
     return x
 
 def daily_return(df):
+    if isinstance(df, PricePanel):
+        values = df.values
+        returns = np.zeros_like(values)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns[1:] = (values[1:] / values[:-1] - 1) * 100
+        returns[np.isnan(returns)] = 0
+        return df.with_values(returns)
     df_daily_return = df.copy()
-    for i in df.columns[1:]:
-        df_daily_return[i] = df[i].pct_change() * 100
-        df_daily_return[i].fillna(0, inplace=True)
+    cols = df.columns[1:]
+    df_daily_return[cols] = (df[cols].pct_change() * 100).fillna(0)
     return df_daily_return
 
 def calculate_beta(stocks_daily_return, stock):
     rm = stocks_daily_return['sp500'].mean() * 252
     b, a = np.polyfit(stocks_daily_return['sp500'], stocks_daily_return[stock], 1)
-    return b, a
\ No newline at end of file
+    return b, a
+
+@profiling.timed('capm.stats')
+def capm_stats(stocks_daily_return, market='sp500', rf=0, periods=252):
+    """Beta, alpha, R², residual volatility and CAPM expected return for every asset.
+
+    Takes the daily_return() frame or PricePanel (a leading 'Date' column and
+    other non-numeric columns are ignored) and regresses all assets on the
+    market column in one pass, sharing the market variance. float32 panels
+    stay float32 in the matrix product; the moments are accumulated in float64.
+    """
+    if isinstance(stocks_daily_return, PricePanel):
+        assets = [c for c in stocks_daily_return.names if c != market]
+        x = stocks_daily_return.select(assets).values
+        m = stocks_daily_return[market].astype(np.float64)
+    else:
+        numeric = stocks_daily_return.select_dtypes(include='number')
+        assets = [c for c in numeric.columns if c != market]
+        x = numeric[assets].to_numpy()
+        if x.dtype not in (np.float32, np.float64):
+            x = x.astype(np.float64)
+        m = numeric[market].to_numpy(dtype=np.float64)
+    n = len(m)
+
+    m_mean = m.mean()
+    m_centered = m - m_mean
+    var_m = m_centered @ m_centered / n
+
+    x_mean = x.mean(axis=0, dtype=np.float64)
+    # m_centered sums to zero, so X needs no centering for the covariance
+    cov = (m_centered.astype(x.dtype) @ x).astype(np.float64) / n
+    var_x = np.einsum('ij,ij->j', x, x, dtype=np.float64) / n - x_mean ** 2
+
+    beta = cov / var_m
+    alpha = x_mean - beta * m_mean
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r2 = cov ** 2 / (var_m * var_x)
+    resid_var = np.clip(var_x - beta * cov, 0, None) * n / max(n - 2, 1)
+
+    rm = m_mean * periods
+    return pd.DataFrame({
+        'Beta': beta,
+        'Alpha': alpha,
+        'R2': r2,
+        'Residual Volatility': np.sqrt(resid_var * periods),
+        'Expected Return': rf + beta * (rm - rf),
+    }, index=pd.Index(assets, name='Stock'))
@@ -0,0 +1,433 @@
+"""Local OHLCV price store shared by every page.
+
+Daily bars are kept as one Parquet file per ticker. The first request for a
+ticker pulls its full history from the provider; later requests only ask the
+provider for bars newer than the last stored date, and skip the network
+entirely once the store has been checked after the most recent market close.
+"""
+import io
+import os
+import re
+import json
+import threading
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+import pandas as pd
+from pages.utils import fetch, frame_cache, profiling
+
+DATA_DIR = os.environ.get('TS_DATA_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'time_series'))
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# US equities settle around 16:00 New York time; 21:00 UTC covers daylight saving too.
+MARKET_CLOSE_UTC = datetime.time(21, 0)
+
+# A stored close that moves by more than this on top-up means the provider
+# re-adjusted history (split/dividend), so the whole series is refetched.
+ADJUSTMENT_TOLERANCE = 1e-4
+
+# Upper bound on concurrent single-ticker fetches when a provider has no batch call.
+MAX_FETCH_WORKERS = 8
+
+
+def normalize_bars(dataframe):
+    """Return bars as a flat, sorted, tz-naive frame with the standard columns."""
+    if dataframe is None or dataframe.empty:
+        return pd.DataFrame(columns=COLUMNS, index=pd.DatetimeIndex([], name='Date'), dtype='float64')
+
+    df = dataframe
+    if isinstance(df.columns, pd.MultiIndex):
+        # yf.download returns (Price, Ticker) columns even for a single ticker
+        df = df.droplevel(1, axis=1)
+    df = df.reindex(columns=COLUMNS).astype('float64')
+
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    df.index = index.normalize().rename('Date')
+
+    df = df[~df.index.duplicated(keep='last')].sort_index()
+    return df.dropna(subset=['Close'])
+
+
+# --- PROVIDERS ---
+class PriceProvider:
+    """Source of daily bars. Subclasses implement fetch()."""
+
+    name = 'base'
+
+    def fetch(self, ticker, start=None):
+        """Return bars dated on or after start, or the full history when start is None."""
+        raise NotImplementedError
+
+    def fetch_many(self, tickers, start=None):
+        """Return {ticker: bars} for every ticker, all fetched from the same start.
+
+        The default fans out to fetch() on a bounded thread pool; providers with
+        a native multi-ticker call override this.
+        """
+        tickers = list(tickers)
+        if not tickers:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(MAX_FETCH_WORKERS, len(tickers))) as pool:
+            results = pool.map(lambda t: self.fetch(t, start), tickers)
+            return dict(zip(tickers, results))
+
+
+class YahooProvider(PriceProvider):
+    """Yahoo Finance via yfinance, throttled, retried and coalesced by the fetch layer.
+
+    yfinance keeps one HTTP session per process, so connections are already pooled.
+    """
+
+    name = 'yahoo'
+
+    def fetch(self, ticker, start=None):
+        import yfinance as yf
+
+        def history():
+            ticker_obj = yf.Ticker(ticker)
+            if start is None:
+                return ticker_obj.history(period='max')
+            return ticker_obj.history(start=pd.Timestamp(start).strftime('%Y-%m-%d'))
+
+        return normalize_bars(fetch.call(('yahoo-history', ticker, str(start)), history))
+
+    def fetch_many(self, tickers, start=None):
+        import yfinance as yf
+
+        tickers = list(tickers)
+        if not tickers:
+            return {}
+
+        def download():
+            if start is None:
+                return yf.download(tickers, period='max', group_by='ticker', progress=False, threads=True)
+            return yf.download(tickers, start=pd.Timestamp(start).strftime('%Y-%m-%d'),
+                               group_by='ticker', progress=False, threads=True)
+
+        raw = fetch.call(('yahoo-download', tuple(tickers), str(start)), download)
+        result = {}
+        available = set(raw.columns.get_level_values(0)) if raw is not None and not raw.empty else set()
+        for ticker in tickers:
+            result[ticker] = normalize_bars(raw[ticker] if ticker in available else None)
+        return result
+
+
+class HttpProvider(PriceProvider):
+    """Bars served as CSV (Date index plus OHLCV) from ``<base_url>/<TICKER>.csv``.
+
+    Requests go through the shared session and fetch layer; ``?start=YYYY-MM-DD``
+    asks for a top-up, and the result is filtered locally as well in case the
+    server ignores it. A 404 means the ticker has no data.
+    """
+
+    name = 'http'
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def fetch(self, ticker, start=None):
+        url = f'{self.base_url}/{quote(ticker, safe="")}.csv'
+        params = {'start': pd.Timestamp(start).strftime('%Y-%m-%d')} if start is not None else None
+        try:
+            body = fetch.http_get(url, params)
+        except fetch.HTTPStatusError as exc:
+            if exc.status == 404:
+                return normalize_bars(None)
+            raise
+        df = normalize_bars(pd.read_csv(io.BytesIO(body), index_col=0, parse_dates=True))
+        return df[df.index >= pd.Timestamp(start)] if start is not None else df
+
+
+class FixtureProvider(PriceProvider):
+    """Serves canned bars from memory or from ``<TICKER>.csv`` files in a directory.
+
+    Every call is recorded in ``calls`` so tests can assert how much was fetched;
+    a fetch_many() is one entry with a tuple of tickers.
+    """
+
+    name = 'fixture'
+
+    def __init__(self, frames=None, directory=None):
+        self.frames = {t: normalize_bars(df) for t, df in (frames or {}).items()}
+        self.directory = directory
+        self.calls = []
+
+    def _load(self, ticker):
+        if ticker not in self.frames and self.directory:
+            path = os.path.join(self.directory, f'{ticker}.csv')
+            if os.path.exists(path):
+                self.frames[ticker] = normalize_bars(pd.read_csv(path, index_col=0, parse_dates=True))
+        return self.frames.get(ticker, normalize_bars(None))
+
+    def _serve(self, ticker, start):
+        df = self._load(ticker)
+        if start is not None:
+            df = df[df.index >= pd.Timestamp(start)]
+        return df.copy()
+
+    def fetch(self, ticker, start=None):
+        self.calls.append((ticker, start))
+        return self._serve(ticker, start)
+
+    def fetch_many(self, tickers, start=None):
+        tickers = list(tickers)
+        self.calls.append((tuple(tickers), start))
+        return {t: self._serve(t, start) for t in tickers}
+
+
+# --- STORE ---
+def _file_stem(ticker):
+    return re.sub(r'[^A-Za-z0-9._-]', '_', ticker)
+
+
+def last_market_close(now=None):
+    """UTC timestamp of the most recent weekday close at or before now."""
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    close = datetime.datetime.combine(now.date(), MARKET_CLOSE_UTC, tzinfo=datetime.timezone.utc)
+    if now < close:
+        close -= datetime.timedelta(days=1)
+    while close.weekday() >= 5:
+        close -= datetime.timedelta(days=1)
+    return close
+
+
+class PriceStore:
+    """Parquet-backed bars, served from the shared in-memory frame cache while fresh.
+
+    Frames handed out are frozen (see frame_cache); slice or copy them freely,
+    but write results into new columns or frames.
+    """
+
+    def __init__(self, root=None, provider=None):
+        self.root = root or os.path.join(DATA_DIR, 'prices')
+        self.provider = provider or YahooProvider()
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        # ticker -> meta of the frame last put in the frame cache
+        self._cached_meta = {}
+        # ticker -> why its last batched refresh fell back to the stored bars
+        self.errors = {}
+
+    def _lock(self, ticker):
+        with self._locks_guard:
+            return self._locks.setdefault(ticker, threading.Lock())
+
+    def _paths(self, ticker):
+        stem = os.path.join(self.root, _file_stem(ticker))
+        return stem + '.parquet', stem + '.json'
+
+    def _read(self, ticker):
+        data_path, meta_path = self._paths(ticker)
+        meta = {}
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+        if not os.path.exists(data_path):
+            # Only meta: the provider had no bars for ticker when it was last checked
+            return (normalize_bars(None) if meta.get('empty') else None), meta
+        return pd.read_parquet(data_path), meta
+
+    def _write(self, ticker, bars, meta):
+        os.makedirs(self.root, exist_ok=True)
+        data_path, meta_path = self._paths(ticker)
+        # Write-then-rename so a concurrent reader never sees a half-written file
+        if bars is not None:
+            tmp = f'{data_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            bars.to_parquet(tmp)
+            os.replace(tmp, data_path)
+        tmp = f'{meta_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, meta_path)
+
+    def _cache_key(self, ticker):
+        return (self.root, ticker)
+
+    def _remember(self, ticker, bars, meta):
+        if bars is None or bars.empty:
+            return bars
+        self._cached_meta[ticker] = meta
+        return frame_cache.get_cache().put(self._cache_key(ticker), bars)
+
+    def _cached(self, ticker, start=None, end=None):
+        """Bars from the frame cache if they were checked after the last close, else None."""
+        meta = self._cached_meta.get(ticker)
+        if meta is None or not self.is_fresh(meta):
+            return None
+        return frame_cache.get_cache().get(self._cache_key(ticker), start, end)
+
+    def is_fresh(self, meta, now=None):
+        checked_at = meta.get('checked_at')
+        if not checked_at or meta.get('provider') != self.provider.name:
+            return False
+        return datetime.datetime.fromisoformat(checked_at) >= last_market_close(now)
+
+    def _needs(self, bars, meta, force=False):
+        """'fresh', 'full' or the date a top-up fetch has to start from."""
+        if bars is None or force or meta.get('provider') != self.provider.name:
+            return 'full'
+        if self.is_fresh(meta):
+            return 'fresh'
+        if bars.empty:
+            return 'full'
+        # Refetch the last stored bar as well so an adjustment can be detected
+        return bars.index[-1]
+
+    def _merge(self, ticker, bars, new_bars):
+        last_date = bars.index[-1]
+        if last_date in new_bars.index and \
+                abs(new_bars.at[last_date, 'Close'] / bars.at[last_date, 'Close'] - 1) > ADJUSTMENT_TOLERANCE:
+            return self.provider.fetch(ticker)
+        merged = pd.concat([bars, new_bars])
+        return merged[~merged.index.duplicated(keep='last')].sort_index()
+
+    def _save(self, ticker, merged):
+        checked_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        if merged.empty:
+            # Delisted or mistyped: remember that until the next close instead of refetching
+            # on every visit. Bars already stored are kept, never replaced by nothing.
+            if not os.path.exists(self._paths(ticker)[0]):
+                self._write(ticker, None, {'provider': self.provider.name, 'checked_at': checked_at, 'empty': True})
+            return merged
+        meta = {
+            'provider': self.provider.name,
+            'checked_at': checked_at,
+            'first_date': merged.index[0].strftime('%Y-%m-%d'),
+            'last_date': merged.index[-1].strftime('%Y-%m-%d'),
+        }
+        self._write(ticker, merged, meta)
+        return self._remember(ticker, merged, meta)
+
+    @profiling.timed('data.refresh')
+    def refresh(self, ticker, force=False):
+        """Bring the stored bars for ticker up to date and return all of them."""
+        with self._lock(ticker):
+            cached = None if force else self._cached(ticker)
+            if cached is not None:
+                return cached
+            bars, meta = self._read(ticker)
+            need = self._needs(bars, meta, force)
+            if need == 'fresh':
+                return self._remember(ticker, bars, meta)
+            if need == 'full':
+                return self._save(ticker, self.provider.fetch(ticker))
+            try:
+                # _merge() refetches the full history when the provider re-adjusted it
+                merged = self._merge(ticker, bars, self.provider.fetch(ticker, start=need))
+            except Exception:
+                # Stale bars beat no bars when the provider is unreachable
+                return bars
+            return self._save(ticker, merged)
+
+    @profiling.timed('data.refresh_many')
+    def refresh_many(self, tickers):
+        """Refresh several tickers with at most two batched provider calls.
+
+        Tickers with nothing stored share one full-history request; stale ones
+        share one top-up request starting at the oldest last-stored date. When
+        a request fails its tickers keep whatever bars are stored (none for a
+        first fetch) and the error is kept in errors until they refresh again.
+        """
+        stored, full, topup = {}, [], []
+        for ticker in dict.fromkeys(tickers):
+            cached = self._cached(ticker)
+            if cached is not None:
+                stored[ticker] = cached
+                continue
+            bars, meta = self._read(ticker)
+            need = self._needs(bars, meta)
+            stored[ticker] = self._remember(ticker, bars, meta) if need == 'fresh' else bars
+            if need == 'full':
+                full.append(ticker)
+            elif need != 'fresh':
+                topup.append((ticker, need))
+
+        if full:
+            try:
+                fetched = self.provider.fetch_many(full)
+            except Exception as exc:
+                fetched = self._failed(full, exc)
+            for ticker, new_bars in fetched.items():
+                with self._lock(ticker):
+                    stored[ticker] = self._save(ticker, new_bars)
+                self.errors.pop(ticker, None)
+        if topup:
+            try:
+                fetched = self.provider.fetch_many([t for t, _ in topup], start=min(d for _, d in topup))
+            except Exception as exc:
+                # Stale bars beat no bars when the provider is unreachable
+                fetched = self._failed([t for t, _ in topup], exc)
+            for ticker, _ in topup:
+                if ticker in fetched:
+                    with self._lock(ticker):
+                        try:
+                            merged = self._merge(ticker, stored[ticker], fetched[ticker])
+                        except Exception as exc:
+                            self._failed([ticker], exc)
+                            continue
+                        stored[ticker] = self._save(ticker, merged)
+                    self.errors.pop(ticker, None)
+        return {t: bars for t, bars in stored.items() if bars is not None and not bars.empty}
+
+    def _failed(self, tickers, exc):
+        for ticker in tickers:
+            self.errors[ticker] = f'{type(exc).__name__}: {exc}'
+        return {}
+
+    def get_history(self, ticker, start=None, end=None):
+        """Daily bars for ticker with start <= Date < end (either bound optional)."""
+        cached = self._cached(ticker, start, end)
+        if cached is not None:
+            return cached
+        return _slice(self.refresh(ticker), start, end)
+
+    def get_panel(self, tickers, start=None, end=None, field='Close'):
+        """Wide frame of one field, one column per ticker, aligned on the union of dates.
+
+        Tickers without any data are left out, so the columns tell which were found.
+        """
+        bars = self.refresh_many(tickers)
+        columns = {t: _slice(bars[t], start, end)[field] for t in dict.fromkeys(tickers) if t in bars}
+        if not columns:
+            return pd.DataFrame(index=pd.DatetimeIndex([], name='Date'))
+        panel = pd.concat(columns, axis=1, join='outer').sort_index()
+        panel.index.name = 'Date'
+        return panel
+
+
+def _slice(bars, start=None, end=None):
+    index = bars.index
+    lo = index.searchsorted(pd.Timestamp(start)) if start is not None else 0
+    hi = index.searchsorted(pd.Timestamp(end)) if end is not None else len(index)
+    return bars.iloc[lo:hi]
+
+
+_store = PriceStore()
+
+
+def get_store():
+    return _store
+
+
+def set_store(store):
+    """Swap the module-wide store, e.g. for one backed by a FixtureProvider."""
+    global _store
+    _store = store
+    return store
+
+
+def get_history(ticker, start=None, end=None):
+    return _store.get_history(ticker, start, end)
+
+
+def get_close(ticker, start=None, end=None, name=None):
+    """Close prices as a single-column frame named after ``name`` (default: the ticker)."""
+    close = _store.get_history(ticker, start, end)[['Close']]
+    close.columns = [name or ticker]
+    return close
+
+
+def get_panel(tickers, start=None, end=None, field='Close'):
+    return _store.get_panel(tickers, start, end, field)
@@ -0,0 +1,124 @@
+"""Server-side reduction of chart data before it is handed to Plotly.
+
+Line traces longer than the point budget are thinned with
+Largest-Triangle-Three-Buckets, which keeps the visual peaks and troughs;
+candles are rolled up to the next coarser of 15-minute, hourly, 4-hour,
+daily, weekly and monthly bars until they fit the candle budget (intraday
+bars start at the first rule coarser than their own spacing).
+
+Reduced traces are cached per (ticker, timeframe, trace) and are
+invalidated when the visible data gains a bar or its first or last bar
+changes (the in-progress intraday bar ticking, a history re-adjusted for a
+split or dividend).
+"""
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+POINT_BUDGET = 1500
+# Candles become unreadable well before line traces do
+CANDLE_BUDGET = 400
+OHLC_RULES = ['15min', '1h', '4h', '1D', 'W-FRI', 'MS']
+MAX_CACHE_ENTRIES = 256
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _cached(key, compute):
+    if key is None:
+        return compute()
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    value = compute()
+    with _cache_lock:
+        _cache[key] = value
+        while len(_cache) > MAX_CACHE_ENTRIES:
+            _cache.popitem(last=False)
+    return value
+
+
+def _data_key(ticker, num_period, name, data):
+    if ticker is None or not len(data):
+        return None
+    # Raw bytes, so a NaN end value still matches itself
+    ends = data.iloc[[0, -1]].to_numpy(dtype=np.float64).tobytes()
+    return (ticker, num_period, name, len(data), data.index[0], data.index[-1], ends)
+
+
+def lttb_indices(x, y, threshold):
+    """Positions of the points LTTB keeps; x and y are float arrays of equal length."""
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (threshold - 2)
+    edges = (np.arange(threshold - 1) * every).astype(np.int64) + 1
+    edges[-1] = n - 1
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket; the last bucket looks ahead to the final point
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        kept[i + 1] = a
+    return kept
+
+
+def reduce_line(series, budget=POINT_BUDGET, ticker=None, num_period=None, name=None):
+    """(x, y) for one line trace, thinned to at most budget points."""
+    key = _data_key(ticker, num_period, name, series)
+
+    def compute():
+        finite = series[np.isfinite(series.to_numpy(dtype=np.float64))]
+        if len(finite) <= budget:
+            return finite.index, finite.to_numpy()
+        x = finite.index.asi8.astype(np.float64) if isinstance(finite.index, pd.DatetimeIndex) \
+            else np.arange(len(finite), dtype=np.float64)
+        y = finite.to_numpy(dtype=np.float64)
+        kept = lttb_indices(x, y, budget)
+        return finite.index[kept], y[kept]
+
+    return _cached(key, compute)
+
+
+def resample_ohlc(dataframe, rule):
+    agg = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last'}
+    if 'Volume' in dataframe.columns:
+        agg['Volume'] = 'sum'
+    return dataframe.resample(rule).agg(agg).dropna(subset=['Close'])
+
+
+def _coarser(rule, spacing):
+    # Weekly and monthly rules have no fixed length and are always coarser
+    try:
+        return pd.Timedelta(rule) > spacing
+    except ValueError:
+        return True
+
+
+def reduce_ohlc(dataframe, budget=CANDLE_BUDGET, ticker=None, num_period=None):
+    """Candles as-is when they fit the budget, else roll-ups to coarser bars."""
+    key = _data_key(ticker, num_period, 'ohlc', dataframe)
+
+    def compute():
+        bars = dataframe
+        if len(bars) <= budget:
+            return bars
+        spacing = pd.Series(dataframe.index[1:] - dataframe.index[:-1]).median()
+        for rule in OHLC_RULES:
+            if len(bars) <= budget:
+                break
+            if _coarser(rule, spacing):
+                bars = resample_ohlc(dataframe, rule)
+        return bars
+
+    return _cached(key, compute)
@@ -0,0 +1,215 @@
+"""Shared fetch layer for every network call the app makes.
+
+A Fetcher runs a call through four stages:
+
+- coalescing: concurrent callers asking for the same key (e.g. the same
+  ticker's history from two browser sessions) share one in-flight request;
+- a bounded number of concurrent requests;
+- a token bucket that caps the request rate across the whole process;
+- retries with exponential backoff and jitter (honouring Retry-After).
+
+Results handed to coalesced callers are the same object, so treat them as
+read-only. http_get() adds a shared, pooled requests session on top.
+"""
+import os
+import time
+import random
+import threading
+from concurrent.futures import Future
+from pages.utils import profiling
+
+MAX_CONCURRENCY = int(os.environ.get('TS_FETCH_CONCURRENCY', 8))
+RATE_PER_SECOND = float(os.environ.get('TS_FETCH_RATE', 5))
+BURST = int(os.environ.get('TS_FETCH_BURST', 10))
+RETRIES = 3
+BACKOFF_SECONDS = 0.5
+MAX_BACKOFF_SECONDS = 8.0
+TIMEOUT_SECONDS = 15
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Exception classes (matched by name anywhere in the MRO, so requests, curl_cffi
+# and yfinance are not imported here) that mean "try again later"
+TRANSIENT_ERRORS = {'ConnectionError', 'Timeout', 'TimeoutError', 'YFRateLimitError'}
+
+
+class HTTPStatusError(Exception):
+    def __init__(self, status, url, retry_after=None):
+        super().__init__(f'HTTP {status} for {url}')
+        self.status = status
+        self.url = url
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, bursts up to `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, self.rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class Coalescer:
+    """Runs one call per key at a time; callers that arrive meanwhile get its result."""
+
+    def __init__(self):
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def call(self, key, fn):
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+        if not owner:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+
+def backoff_delay(attempt, backoff=BACKOFF_SECONDS, max_backoff=MAX_BACKOFF_SECONDS):
+    # Half fixed, half random, so retrying sessions do not hit the server in lockstep
+    delay = min(max_backoff, backoff * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def transient(exc):
+    """Default retry rule: rate limits, 5xx, timeouts and dropped connections.
+
+    Anything else (a 404, a parse error, a bug) fails on the first attempt.
+    """
+    if isinstance(exc, HTTPStatusError):
+        return exc.status in RETRY_STATUSES
+    status = getattr(getattr(exc, 'response', None), 'status_code', None)
+    if isinstance(status, int):
+        return status in RETRY_STATUSES
+    return any(cls.__name__ in TRANSIENT_ERRORS for cls in type(exc).__mro__)
+
+
+def with_retries(fn, retries=RETRIES, backoff=BACKOFF_SECONDS, max_backoff=MAX_BACKOFF_SECONDS,
+                 retryable=transient, sleep=time.sleep):
+    """Call fn, retrying failures that retryable(exc) accepts (default: transient ones)."""
+    for attempt in range(retries + 1):
+        try:
+            return fn()
+        except Exception as exc:
+            if attempt == retries or not retryable(exc):
+                raise
+            delay = backoff_delay(attempt, backoff, max_backoff)
+            sleep(max(delay, getattr(exc, 'retry_after', None) or 0))
+
+
+class Fetcher:
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, rate=RATE_PER_SECOND, burst=BURST,
+                 retries=RETRIES, backoff=BACKOFF_SECONDS, max_backoff=MAX_BACKOFF_SECONDS):
+        self.max_concurrency = max_concurrency
+        self.retries, self.backoff, self.max_backoff = retries, backoff, max_backoff
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.coalescer = Coalescer()
+        self.stats = {'calls': 0, 'attempts': 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def _attempt(self, fn):
+        # The slot is held for one attempt only, never while backing off
+        with self._slots:
+            if self.bucket is not None:
+                self.bucket.acquire()
+            self._count('attempts')
+            return fn()
+
+    def call(self, key, fn, retryable=transient):
+        """Result of fn(), shared with concurrent calls for the same key."""
+        def run():
+            self._count('calls')
+            with profiling.span(f'fetch.{key[0]}'):
+                return with_retries(lambda: self._attempt(fn), self.retries, self.backoff,
+                                    self.max_backoff, retryable)
+        return self.coalescer.call(key, run)
+
+
+# --- HTTP ---
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Process-wide requests session with a connection pool sized to the fetcher."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=_fetcher.max_concurrency, pool_maxsize=_fetcher.max_concurrency)
+            _session.mount('http://', adapter)
+            _session.mount('https://', adapter)
+        return _session
+
+
+def _retry_after(response):
+    try:
+        return float(response.headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+
+def http_get(url, params=None, timeout=TIMEOUT_SECONDS):
+    """GET through the shared fetcher and session; returns the body as bytes.
+
+    Error statuses raise HTTPStatusError; 429 and 5xx are retried first.
+    """
+    def request():
+        response = get_session().get(url, params=params, timeout=timeout)
+        if response.status_code >= 400:
+            raise HTTPStatusError(response.status_code, url, _retry_after(response))
+        return response.content
+
+    key = ('GET', url, tuple(sorted((params or {}).items())))
+    return _fetcher.call(key, request)
+
+
+_fetcher = Fetcher()
+
+
+def get_fetcher():
+    return _fetcher
+
+
+def set_fetcher(fetcher):
+    """Swap the module-wide fetcher, e.g. one without rate limits for tests."""
+    global _fetcher
+    _fetcher = fetcher
+    return fetcher
+
+
+def call(key, fn, retryable=transient):
+    return _fetcher.call(key, fn, retryable)
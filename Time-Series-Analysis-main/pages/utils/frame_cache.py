@@ -0,0 +1,110 @@
+"""Process-wide cache of normalized price frames, shared by every page and session.
+
+Entries are evicted least-recently-used once their total size passes a byte
+budget. Each entry remembers the date range it covers (None = unbounded), and
+any request inside that range is answered by slicing, so a cached 15-year
+history also serves 3-year and 1-month requests.
+
+Cached frames are frozen: their arrays are read-only, and every get() hands
+out a new frame object over them, so a caller adding or replacing columns
+only changes its own copy, and writing into the values raises instead of
+corrupting what other pages see.
+"""
+import os
+import threading
+from collections import OrderedDict
+import pandas as pd
+
+MAX_BYTES = int(os.environ.get('TS_FRAME_CACHE_BYTES', 256 * 1024 * 1024))
+
+
+def freeze(frame):
+    """Copy of frame whose values are read-only (one float block for OHLCV bars)."""
+    if frame.empty or len(set(frame.dtypes)) != 1:
+        columns = {c: _readonly(frame[c].to_numpy(copy=True)) for c in frame.columns}
+        return pd.DataFrame(columns, index=frame.index, copy=False)
+    values = _readonly(frame.to_numpy(copy=True))
+    return pd.DataFrame(values, index=frame.index, columns=frame.columns, copy=False)
+
+
+def _readonly(values):
+    values.setflags(write=False)
+    return values
+
+
+def _covers(entry, start, end):
+    lo, hi = entry['start'], entry['end']
+    return (lo is None or (start is not None and pd.Timestamp(start) >= lo)) and \
+           (hi is None or (end is not None and pd.Timestamp(end) <= hi))
+
+
+def _slice(frame, start, end):
+    index = frame.index
+    lo = index.searchsorted(pd.Timestamp(start)) if start is not None else 0
+    hi = index.searchsorted(pd.Timestamp(end)) if end is not None else len(index)
+    return frame.iloc[lo:hi]
+
+
+class FrameCache:
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, start=None, end=None):
+        """Rows of key with start <= Date < end, or None unless a cached entry covers them."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not _covers(entry, start, end):
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+        # A new object every time: callers may add columns without touching the entry
+        return _slice(entry['frame'], start, end).copy(deep=False)
+
+    def put(self, key, frame, start=None, end=None):
+        """Cache frame as covering [start, end) and return a frozen view of it."""
+        frozen = freeze(frame)
+        size = int(frozen.memory_usage(index=True).sum())
+        entry = {'frame': frozen, 'bytes': size,
+                 'start': pd.Timestamp(start) if start is not None else None,
+                 'end': pd.Timestamp(end) if end is not None else None}
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old['bytes']
+            if size <= self.max_bytes:
+                self._entries[key] = entry
+                self.bytes += size
+                while self.bytes > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self.bytes -= evicted['bytes']
+                    self.stats['evictions'] += 1
+        return frozen.copy(deep=False)
+
+    def evict(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.bytes -= entry['bytes']
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+
+_cache = FrameCache()
+
+
+def get_cache():
+    return _cache
+
+
+def set_cache(cache):
+    global _cache
+    _cache = cache
+    return cache
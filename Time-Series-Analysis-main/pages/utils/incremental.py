@@ -0,0 +1,143 @@
+"""Incremental ARIMA forecasts: estimate once, then absorb new bars by Kalman filtering.
+
+Per (ticker, order) we keep the estimated parameters and the filter's last
+predicted state (mean and covariance). When the series grows, only the new
+bars are filtered, starting from that state with the parameters held fixed,
+which takes milliseconds instead of a full maximum-likelihood fit. This is
+what statsmodels' results.extend() does, but the state is small enough to
+keep in the model cache across reruns and processes.
+
+Parameters are re-estimated (warm-started from the old ones) every
+REFIT_EVERY new bars, or sooner when the one-step forecast errors of the new
+bars drift: a persistent bias or errors much larger than the model expects.
+A series whose history changed (e.g. re-adjusted prices) is refitted from
+scratch.
+"""
+import os
+import hashlib
+import warnings
+import numpy as np
+from pages.utils import model_cache, profiling
+from pages.utils.data_store import DATA_DIR
+
+HORIZON = 30
+# About one trading month
+REFIT_EVERY = 21
+DRIFT_WINDOW = 10
+MIN_DRIFT_BARS = 5
+# |mean z| * sqrt(k): bias of the standardized one-step errors
+DRIFT_Z = 3.0
+# RMS of the standardized errors; 1 when the model's error variance is right
+DRIFT_RMS = 2.0
+# Values of the previous series compared to check it is a prefix of the new one
+TAIL = 20
+
+
+def _tail(values, n):
+    return model_cache.fingerprint(values[max(0, n - TAIL):n])
+
+
+def _key(ticker, order):
+    return hashlib.sha1(f'incremental|{ticker}|{tuple(order)}'.encode()).hexdigest()
+
+
+def drift_reason(z):
+    """'bias', 'variance' or None for a list of recent standardized one-step errors."""
+    z = np.asarray(z, dtype=np.float64)
+    z = z[np.isfinite(z)]
+    if len(z) < MIN_DRIFT_BARS:
+        return None
+    if abs(z.mean()) * np.sqrt(len(z)) > DRIFT_Z:
+        return 'bias'
+    if np.sqrt(np.mean(z ** 2)) > DRIFT_RMS:
+        return 'variance'
+    return None
+
+
+class IncrementalForecaster:
+    def __init__(self, cache=None, refit_every=REFIT_EVERY):
+        self.cache = cache or model_cache.ModelCache(os.path.join(DATA_DIR, 'incremental'))
+        self.refit_every = refit_every
+
+    def _estimate(self, values, order, start_params=None):
+        from statsmodels.tsa.arima.model import ARIMA
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            return ARIMA(values, order=order).fit(start_params=start_params)
+
+    def _filter(self, new_values, order, state):
+        from statsmodels.tsa.arima.model import ARIMA
+
+        model = ARIMA(new_values, order=order)
+        model.ssm.initialize_known(state['state'], state['state_cov'])
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            return model.filter(state['params'])
+
+    def _record(self, results, values, horizon, state=None):
+        state = state or {'bars_since_fit': 0, 'z': []}
+        state.update({
+            'params': np.asarray(results.params),
+            'state': results.predicted_state[:, -1].copy(),
+            'state_cov': results.predicted_state_cov[:, :, -1].copy(),
+            'n': len(values),
+            'tail': _tail(values, len(values)),
+            'predictions': np.asarray(results.forecast(horizon)),
+        })
+        return state
+
+    @profiling.timed('model.incremental_update')
+    def update(self, ticker, values, order, horizon=HORIZON):
+        """Forecast horizon steps from the end of values; returns (predictions, action).
+
+        action is 'cached', 'append', 'fit', 'refit-schedule', 'refit-bias' or
+        'refit-variance'.
+        """
+        values = np.asarray(values, dtype=np.float64).ravel()
+        key = _key(ticker, order)
+        state = self.cache.get(key)
+        n = len(values)
+
+        extends = state is not None and state['n'] <= n and state['tail'] == _tail(values, state['n'])
+        if extends and state['n'] == n and len(state['predictions']) == horizon:
+            return state['predictions'], 'cached'
+
+        if not extends:
+            action = 'fit'
+            state = self._record(self._estimate(values, order), values, horizon)
+        else:
+            results = self._filter(values[state['n']:], order, state)
+            z = results.filter_results.standardized_forecasts_error[0]
+            state['z'] = (list(state['z']) + [float(x) for x in z])[-DRIFT_WINDOW:]
+            state['bars_since_fit'] += n - state['n']
+
+            reason = drift_reason(state['z'])
+            if reason is None and state['bars_since_fit'] >= self.refit_every:
+                reason = 'schedule'
+            if reason is None:
+                action = 'append'
+                state = self._record(results, values, horizon, state)
+            else:
+                action = f'refit-{reason}'
+                state = self._record(self._estimate(values, order, state['params']), values, horizon)
+
+        self.cache.put(key, state)
+        return state['predictions'], action
+
+    def update_many(self, series, order, horizon=HORIZON):
+        """update() for {ticker: values}; returns {ticker: (predictions, action)}."""
+        return {ticker: self.update(ticker, values, order, horizon) for ticker, values in series.items()}
+
+
+_forecaster = IncrementalForecaster()
+
+
+def get_forecaster():
+    return _forecaster
+
+
+def set_forecaster(forecaster):
+    global _forecaster
+    _forecaster = forecaster
+    return forecaster
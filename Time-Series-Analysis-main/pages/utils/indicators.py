@@ -0,0 +1,232 @@
+"""Technical indicators that never touch the caller's frame.
+
+Each indicator knows how many warm-up bars it needs, so a chart showing the
+last month only computes that month plus the warm-up instead of the whole
+history. With a ticker, IndicatorEngine keeps the indicator state (last
+averages, EMA values, SMA window) per ticker, and new bars appended to the
+history are folded in one at a time instead of recomputing everything.
+
+Values match pandas_ta_classic's rsi, sma and macd on the full history. RSI
+and the MACD EMAs are recursive, so on a warm-up slice they agree to about
+WARMUP_TOLERANCE (relative) rather than exactly; SMA is always exact. For
+MACD the bound is WARMUP_TOLERANCE * MACD_SCALE of the price level, which is
+WARMUP_TOLERANCE relative to MACD while |MACD| is at least 0.1% of the price
+(near a zero crossing only the absolute bound holds).
+"""
+import copy
+import math
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from pages.utils import profiling
+
+WARMUP_TOLERANCE = 1e-6
+# MACD is the small difference of two EMAs of the price, so its seeds are decayed
+# this much further (relative to the price level) to keep WARMUP_TOLERANCE
+# relative to MACD itself while |MACD| is at least 0.1% of the price
+MACD_SCALE = 1e-3
+MAX_TICKERS = 64
+
+
+def _decay_bars(alpha, tolerance=WARMUP_TOLERANCE):
+    # Bars until the seed's weight (1 - alpha)^k drops below the tolerance
+    return math.ceil(math.log(tolerance) / math.log(1 - alpha))
+
+
+def _seeded_ewm(values, alpha, seed_start, length):
+    """SMA-seeded recursive average as pandas_ta computes it (NaN before the seed)."""
+    out = np.full(len(values), np.nan)
+    seed_end = seed_start + length - 1
+    if seed_start < 0 or seed_end >= len(values):
+        return out
+    seeded = values.copy()
+    seeded[:seed_end] = np.nan
+    seeded[seed_end] = values[seed_start:seed_end + 1].mean()
+    out[seed_end:] = pd.Series(seeded[seed_end:]).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    return out
+
+
+class RSI:
+    def __init__(self, length=14):
+        self.length = length
+        self.alpha = 1.0 / length
+        self.columns = ['RSI']
+        self.warmup = length + _decay_bars(self.alpha)
+
+    def init(self, close):
+        diff = np.diff(close, prepend=np.nan)
+        gain = _seeded_ewm(np.clip(diff, 0, None), self.alpha, 1, self.length)
+        loss = _seeded_ewm(np.clip(-diff, 0, None), self.alpha, 1, self.length)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = 100 * gain / (gain + loss)
+        # No state until the averages are seeded; the engine rebuilds until then
+        state = {'prev': close[-1], 'gain': gain[-1], 'loss': loss[-1]} if len(close) and not np.isnan(gain[-1]) else None
+        return {'RSI': rsi}, state
+
+    def step(self, state, value):
+        change = value - state['prev']
+        state['gain'] += self.alpha * (max(change, 0.0) - state['gain'])
+        state['loss'] += self.alpha * (max(-change, 0.0) - state['loss'])
+        state['prev'] = value
+        total = state['gain'] + state['loss']
+        return {'RSI': 100 * state['gain'] / total if total else np.nan}
+
+
+class SMA:
+    def __init__(self, length=50):
+        self.length = length
+        self.columns = [f'SMA_{length}']
+        self.warmup = length - 1
+
+    def init(self, close):
+        sma = pd.Series(close).rolling(self.length).mean().to_numpy()
+        return {self.columns[0]: sma}, {'window': list(close[-self.length:])}
+
+    def step(self, state, value):
+        window = state['window']
+        window.append(value)
+        if len(window) > self.length:
+            window.pop(0)
+        return {self.columns[0]: sum(window) / self.length if len(window) == self.length else np.nan}
+
+
+class MACD:
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast, self.slow, self.signal = fast, slow, signal
+        self.k = {n: 2.0 / (n + 1) for n in (fast, slow, signal)}
+        self.columns = ['MACD', 'MACD Signal', 'MACD Hist']
+        self.warmup = slow + signal + _decay_bars(min(self.k.values()), WARMUP_TOLERANCE * MACD_SCALE)
+
+    def init(self, close):
+        fast = _seeded_ewm(close, self.k[self.fast], 0, self.fast)
+        slow = _seeded_ewm(close, self.k[self.slow], 0, self.slow)
+        macd = fast - slow
+        signal = _seeded_ewm(macd, self.k[self.signal], self.slow - 1, self.signal)
+        state = {'fast': fast[-1], 'slow': slow[-1], 'signal': signal[-1]} if len(close) and not np.isnan(signal[-1]) else None
+        return {'MACD': macd, 'MACD Signal': signal, 'MACD Hist': macd - signal}, state
+
+    def step(self, state, value):
+        state['fast'] += self.k[self.fast] * (value - state['fast'])
+        state['slow'] += self.k[self.slow] * (value - state['slow'])
+        macd = state['fast'] - state['slow']
+        state['signal'] += self.k[self.signal] * (macd - state['signal'])
+        return {'MACD': macd, 'MACD Signal': state['signal'], 'MACD Hist': macd - state['signal']}
+
+
+INDICATORS = {'RSI': RSI(), 'SMA_50': SMA(50), 'MACD': MACD()}
+
+
+def _close_values(close):
+    return np.asarray(close, dtype=np.float64).ravel()
+
+
+def compute(close, name):
+    """Indicator columns over the whole close series, as a new frame."""
+    outputs, _ = INDICATORS[name].init(_close_values(close))
+    return pd.DataFrame(outputs, index=close.index)
+
+
+class IndicatorEngine:
+    """Per-ticker indicator state, updated in O(new bars) when history grows."""
+
+    def __init__(self, max_tickers=MAX_TICKERS):
+        self.max_tickers = max_tickers
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _build(self, name, close):
+        values = _close_values(close)
+        outputs, state = INDICATORS[name].init(values)
+        return {'index': close.index, 'last_close': values[-1] if len(values) else None,
+                'outputs': outputs, 'state': state}
+
+    def _end(self, entry, close):
+        # Position in close of the last bar we processed, if it is still in place with
+        # the same close (O(log n)); None when the entry has to be rebuilt
+        if entry['state'] is None or not len(entry['index']):
+            return None
+        last = entry['index'][-1]
+        pos = close.index.searchsorted(last)
+        if pos < len(close) and close.index[pos] == last and close.iloc[pos] == entry['last_close']:
+            return pos
+        return None
+
+    def has(self, ticker, name):
+        with self._lock:
+            return (ticker, name) in self._entries
+
+    def seed(self, ticker, name, index, outputs, state, last_close):
+        """Install outputs and state computed elsewhere (see precompute) unless ticker already has an entry.
+
+        update() checks the seeded last bar against the history like any other
+        entry, so a seed that does not match the page's bars is simply rebuilt.
+        The state is copied: step() advances it in place, and the caller's copy
+        (e.g. the precompute store's cached one) has to stay at index[-1].
+        """
+        with self._lock:
+            key = (ticker, name)
+            if key not in self._entries:
+                self._entries[key] = {'index': index, 'last_close': last_close, 'outputs': outputs,
+                                      'state': copy.deepcopy(state)}
+                self._trim()
+
+    def _trim(self):
+        while len(self._entries) > self.max_tickers * len(INDICATORS):
+            self._entries.popitem(last=False)
+
+    def update(self, ticker, name, close, start=None):
+        """Bring ticker's state up to the end of close; returns the stored entry.
+
+        A new entry covers the bars from start (all of them when None) plus the
+        indicator's warm-up, as the stateless path does; asking for an earlier
+        start later rebuilds it from there.
+        """
+        indicator = INDICATORS[name]
+        lo = close.index.searchsorted(start) if start is not None else 0
+        warm_start = max(0, lo - indicator.warmup)
+        with self._lock:
+            key = (ticker, name)
+            entry = self._entries.get(key)
+            end = self._end(entry, close) if entry is not None else None
+            if end is None or entry['index'][0] > close.index[warm_start]:
+                entry = self._build(name, close.iloc[warm_start:])
+            elif end + 1 < len(close):
+                new = close.iloc[end + 1:]
+                rows = [indicator.step(entry['state'], v) for v in _close_values(new)]
+                entry['outputs'] = {c: np.concatenate([entry['outputs'][c], [r[c] for r in rows]])
+                                    for c in indicator.columns}
+                entry['index'] = entry['index'].append(new.index)
+                entry['last_close'] = float(new.iloc[-1])
+
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._trim()
+            return entry
+
+    def window(self, ticker, name, close, start=None):
+        entry = self.update(ticker, name, close, start)
+        lo = entry['index'].searchsorted(start) if start is not None else 0
+        return pd.DataFrame({c: v[lo:] for c, v in entry['outputs'].items()}, index=entry['index'][lo:])
+
+
+_engine = IndicatorEngine()
+
+
+def get_engine():
+    return _engine
+
+
+@profiling.timed('indicators.window')
+def window(close, name, start=None, ticker=None):
+    """Indicator columns for the bars of close dated at or after start.
+
+    Only the visible bars plus the indicator's warm-up are computed. With a
+    ticker the result is kept as per-ticker engine state, and later calls fold
+    in new bars instead of recomputing.
+    """
+    if ticker is not None:
+        return _engine.window(ticker, name, close, start)
+    lo = close.index.searchsorted(start) if start is not None else 0
+    warm_start = max(0, lo - INDICATORS[name].warmup)
+    return compute(close.iloc[warm_start:], name).iloc[lo - warm_start:]
@@ -0,0 +1,238 @@
+"""Append-only, memory-mapped store of 1-minute OHLCV bars, resampled on demand.
+
+Each ticker is one flat file of fixed-width records (UTC epoch seconds plus
+OHLCV as float64, 48 bytes a bar) under DATA_DIR/intraday. New bars are only
+ever appended after the last stored one, so a year of minutes for a watchlist
+builds up from repeated short downloads, and bulk history from any source can
+be loaded with append().
+
+Reads go through np.memmap: the requested time range is found by binary
+search on the time column and only that range is touched. Coarser
+resolutions (5m, 15m, 1h, 1d) are aggregated from it in fixed-size chunks, in
+exchange-local time so hourly and daily bars follow the trading calendar
+across DST changes. A call returns at most MAX_BARS bars, the most recent
+of the range, and only reads the stored minutes those can cover, so memory
+stays flat however long the history or the range asked for ('max' at 1m
+included); mapped pages belong to the OS file cache, not the process.
+"""
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from pages.utils import fetch, profiling, timeframe
+from pages.utils.data_store import DATA_DIR, COLUMNS
+
+BAR_DTYPE = np.dtype([('time', '<i8'), ('Open', '<f8'), ('High', '<f8'), ('Low', '<f8'),
+                      ('Close', '<f8'), ('Volume', '<f8')])
+RESOLUTIONS = {'1m': 60, '5m': 300, '15m': 900, '1h': 3600, '1d': 86400}
+TIMEZONE = 'America/New_York'
+# Bars aggregated per pass (~12 MB of records)
+CHUNK_ROWS = 1 << 18
+# Bars one bars() call returns at most (~5 MB; about a year of 1-minute bars)
+MAX_BARS = 100_000
+# Extra bars before the visible range so indicators are warmed up at its start
+WARMUP_BARS = 300
+MAX_CACHE_ENTRIES = 64
+REFRESH_SECONDS = 60
+# Yahoo serves 1-minute bars for the last 7 days per request
+YAHOO_PERIOD = '7d'
+
+
+def yahoo_minutes(ticker):
+    import yfinance as yf
+
+    return fetch.call(('yahoo-intraday', ticker),
+                      lambda: yf.Ticker(ticker).history(period=YAHOO_PERIOD, interval='1m', auto_adjust=False))
+
+
+def to_records(bars):
+    """Structured BAR_DTYPE array of an OHLCV frame with a DatetimeIndex, sorted by time."""
+    index = pd.DatetimeIndex(bars.index)
+    if index.tz is None:
+        index = index.tz_localize('UTC')
+    records = np.empty(len(bars), dtype=BAR_DTYPE)
+    records['time'] = index.tz_convert('UTC').as_unit('s').asi8
+    for column in COLUMNS:
+        records[column] = bars[column].to_numpy(dtype=np.float64) if column in bars.columns else np.nan
+    records = records[np.isfinite(records['Close'])]
+    return records[np.argsort(records['time'], kind='stable')]
+
+
+def _local_seconds(times, tz):
+    utc = pd.DatetimeIndex(times.astype('datetime64[s]')).tz_localize('UTC')
+    return utc.tz_convert(tz).tz_localize(None).as_unit('s').asi8
+
+
+def _aggregate(chunk, step, tz):
+    """One row per step-sized local-time bucket of a sorted chunk of records."""
+    local = _local_seconds(chunk['time'], tz)
+    bucket = local // step
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(chunk)] - 1
+    out = np.empty(len(starts), dtype=BAR_DTYPE)
+    # Label each bucket by its local start, expressed in UTC
+    out['time'] = bucket[starts] * step - (local[starts] - chunk['time'][starts])
+    out['Open'] = chunk['Open'][starts]
+    out['High'] = np.maximum.reduceat(chunk['High'], starts)
+    out['Low'] = np.minimum.reduceat(chunk['Low'], starts)
+    out['Close'] = chunk['Close'][ends]
+    out['Volume'] = np.add.reduceat(chunk['Volume'], starts)
+    return out, bucket[starts]
+
+
+def resample(records, step, tz=TIMEZONE, chunk_rows=CHUNK_ROWS):
+    """Aggregate sorted 1-minute records to step seconds, chunk_rows at a time."""
+    parts, last_bucket = [], None
+    for lo in range(0, len(records), chunk_rows):
+        out, buckets = _aggregate(records[lo:lo + chunk_rows], step, tz)
+        if parts and len(out) and buckets[0] == last_bucket:
+            # The previous chunk ended inside this bucket
+            prev = parts[-1][-1:]
+            out['Open'][0], out['time'][0] = prev['Open'][0], prev['time'][0]
+            out['High'][0] = max(out['High'][0], prev['High'][0])
+            out['Low'][0] = min(out['Low'][0], prev['Low'][0])
+            out['Volume'][0] += prev['Volume'][0]
+            parts[-1] = parts[-1][:-1]
+        parts.append(out)
+        last_bucket = buckets[-1] if len(buckets) else last_bucket
+    return np.concatenate(parts) if parts else np.empty(0, dtype=BAR_DTYPE)
+
+
+def to_frame(records, tz=TIMEZONE):
+    index = pd.DatetimeIndex(records['time'].astype('datetime64[s]'), name='Date').tz_localize('UTC').tz_convert(tz)
+    return pd.DataFrame({c: records[c] for c in COLUMNS}, index=index)
+
+
+class IntradayStore:
+    def __init__(self, root=None, source=yahoo_minutes, tz=TIMEZONE):
+        self.root = root or os.path.join(DATA_DIR, 'intraday')
+        self.source = source
+        self.tz = tz
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._refreshed = {}
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def _lock(self, ticker):
+        with self._locks_guard:
+            return self._locks.setdefault(ticker, threading.Lock())
+
+    def _path(self, ticker):
+        return os.path.join(self.root, re.sub(r'[^A-Za-z0-9._-]', '_', ticker.upper()) + '.bars')
+
+    def records(self, ticker):
+        """Read-only memmap of every stored 1-minute bar (empty array when there are none)."""
+        path = self._path(ticker)
+        rows = os.path.getsize(path) // BAR_DTYPE.itemsize if os.path.exists(path) else 0
+        if not rows:
+            return np.empty(0, dtype=BAR_DTYPE)
+        # A torn trailing record from an interrupted append is left out
+        return np.memmap(path, dtype=BAR_DTYPE, mode='r', shape=(rows,))
+
+    def last_time(self, ticker):
+        records = self.records(ticker)
+        return pd.Timestamp(int(records['time'][-1]), unit='s', tz='UTC') if len(records) else None
+
+    @profiling.timed('intraday.append')
+    def append(self, ticker, bars):
+        """Append the bars newer than the last stored one; returns how many were written."""
+        new = to_records(bars)
+        with self._lock(ticker):
+            path = self._path(ticker)
+            os.makedirs(self.root, exist_ok=True)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            stored = self.records(ticker)
+            if len(stored):
+                new = new[new['time'] > stored['time'][-1]]
+            if len(new):
+                # Keep the last of duplicate timestamps
+                new = new[np.r_[new['time'][1:] != new['time'][:-1], True]]
+            with open(path, 'r+b' if size else 'wb') as f:
+                f.truncate(size - size % BAR_DTYPE.itemsize)
+                f.seek(0, os.SEEK_END)
+                f.write(new.tobytes())
+        return len(new)
+
+    def refresh(self, ticker, force=False):
+        """Append the source's latest bars, at most once per REFRESH_SECONDS per ticker."""
+        if not force and time.monotonic() - self._refreshed.get(ticker, -np.inf) < REFRESH_SECONDS:
+            return 0
+        bars = self.source(ticker)
+        self._refreshed[ticker] = time.monotonic()
+        return self.append(ticker, bars) if bars is not None and len(bars) else 0
+
+    def refresh_many(self, tickers, force=False):
+        return {t: self.refresh(t, force) for t in tickers}
+
+    @profiling.timed('intraday.bars')
+    def bars(self, ticker, resolution='1m', start=None, end=None):
+        """OHLCV frame at resolution for start <= time < end, indexed in the store's timezone.
+
+        Longer ranges are cut to their last MAX_BARS bars; attrs['clipped'] tells.
+        """
+        step = RESOLUTIONS[resolution]
+        records = self.records(ticker)
+        times = records['time']
+        lo = int(times.searchsorted(_epoch(start))) if start is not None else 0
+        hi = int(times.searchsorted(_epoch(end))) if end is not None else len(records)
+        # Enough stored minutes for MAX_BARS bars at this resolution, however long the range
+        clipped = hi - lo > MAX_BARS * step // 60
+        if clipped:
+            lo = hi - MAX_BARS * step // 60
+        key = (self._path(ticker), resolution, lo, hi)
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key].copy(deep=False)
+
+        visible = records[lo:hi]
+        if step == 60:
+            out = np.array(visible)
+        else:
+            out = resample(visible, step, self.tz)
+            # A clipped range starts part-way into its first bucket
+            out = out[1:] if clipped else out
+        frame = to_frame(out[-MAX_BARS:], self.tz)
+        frame.attrs['clipped'] = clipped or len(out) > MAX_BARS
+        with self._cache_lock:
+            self._cache[key] = frame
+            while len(self._cache) > MAX_CACHE_ENTRIES:
+                self._cache.popitem(last=False)
+        return frame.copy(deep=False)
+
+    def bars_for_period(self, ticker, resolution, num_period, warmup=WARMUP_BARS):
+        """bars() covering a chart timeframe ('5d', '1mo', 'max', ...) plus indicator warm-up."""
+        last = self.last_time(ticker)
+        if last is None:
+            return self.bars(ticker, resolution)
+        start = timeframe.period_start(pd.DatetimeIndex([last.tz_convert(self.tz)]), num_period)
+        if start is None:
+            return self.bars(ticker, resolution)
+        # Warm-up counted in stored minutes, so nights and weekends do not eat into it
+        times = self.records(ticker)['time']
+        lo = int(times.searchsorted(_epoch(start))) - warmup * RESOLUTIONS[resolution] // 60
+        return self.bars(ticker, resolution, pd.Timestamp(int(times[max(lo, 0)]), unit='s', tz='UTC'))
+
+
+def _epoch(value):
+    stamp = pd.Timestamp(value)
+    if stamp.tz is None:
+        stamp = stamp.tz_localize('UTC')
+    return int(stamp.timestamp())
+
+
+_store = IntradayStore()
+
+
+def get_store():
+    return _store
+
+
+def set_store(store):
+    global _store
+    _store = store
+    return store
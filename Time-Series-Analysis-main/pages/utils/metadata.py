@@ -0,0 +1,167 @@
+"""Company metadata (name, sector, headline metrics) with a TTL cache.
+
+yf.Ticker(t).info is a slow HTTP call, so pages read metadata from here
+instead: recently used tickers sit in an in-process LRU and every record is
+also written to disk as JSON. A record older than the TTL is still returned
+immediately, and a background thread refreshes it (stale-while-revalidate).
+Only a ticker that has never been fetched blocks on the network.
+"""
+import os
+import re
+import json
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pages.utils import fetch, profiling
+from pages.utils.data_store import DATA_DIR
+
+TTL_SECONDS = float(os.environ.get('TS_METADATA_TTL', 24 * 3600))
+# After a failed fetch the ticker is not retried for this long
+RETRY_SECONDS = 300
+MAX_MEMORY_ENTRIES = 256
+MAX_REFRESH_WORKERS = 4
+
+# The only fields the pages read; the rest of .info is not worth storing
+FIELDS = ['longName', 'shortName', 'sector', 'industry', 'country', 'longBusinessSummary',
+          'currentPrice', 'regularMarketPrice', 'marketCap', 'fiftyTwoWeekHigh', 'beta']
+
+
+def yahoo_info(ticker):
+    import yfinance as yf
+
+    return fetch.call(('yahoo-info', ticker), lambda: yf.Ticker(ticker).info or {})
+
+
+class MetadataService:
+    def __init__(self, root=None, fetch=None, ttl=TTL_SECONDS, max_memory_entries=MAX_MEMORY_ENTRIES):
+        self.root = root or os.path.join(DATA_DIR, 'metadata')
+        self.fetch = fetch or yahoo_info
+        self.ttl = ttl
+        self.max_memory_entries = max_memory_entries
+        self._memory = OrderedDict()
+        self._failed = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(MAX_REFRESH_WORKERS, thread_name_prefix='metadata')
+
+    def _path(self, ticker):
+        return os.path.join(self.root, re.sub(r'[^A-Za-z0-9._-]', '_', ticker) + '.json')
+
+    def _remember(self, ticker, record):
+        with self._lock:
+            self._memory[ticker] = record
+            self._memory.move_to_end(ticker)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def peek(self, ticker):
+        """Cached record {'info', 'fetched_at'} or None, without touching the network."""
+        with self._lock:
+            record = self._memory.get(ticker)
+            if record is not None:
+                self._memory.move_to_end(ticker)
+                return record
+        try:
+            with open(self._path(ticker)) as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self._remember(ticker, record)
+        return record
+
+    def is_fresh(self, record, now=None):
+        return (now or time.time()) - record['fetched_at'] < self.ttl
+
+    def refresh(self, ticker):
+        """Fetch and store ticker's metadata now; returns the new record, or None on failure."""
+        try:
+            info = self.fetch(ticker)
+        except Exception:
+            info = None
+        # Yahoo answers unknown symbols with a near-empty dict; keep any older record instead
+        if not info or len(info) < 2:
+            with self._lock:
+                self._failed[ticker] = time.time()
+            return None
+
+        record = {'info': {k: info[k] for k in FIELDS if info.get(k) is not None}, 'fetched_at': time.time()}
+        os.makedirs(self.root, exist_ok=True)
+        path = self._path(ticker)
+        tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(record, f)
+        os.replace(tmp, path)
+        with self._lock:
+            self._failed.pop(ticker, None)
+        self._remember(ticker, record)
+        return record
+
+    def _recently_failed(self, ticker):
+        with self._lock:
+            failed_at = self._failed.get(ticker)
+        return failed_at is not None and time.time() - failed_at < RETRY_SECONDS
+
+    def refresh_async(self, ticker):
+        """Schedule a background refresh; concurrent requests for a ticker share one fetch."""
+        with self._lock:
+            future = self._pending.get(ticker)
+            if future is None:
+                future = self._executor.submit(self._refresh_pending, ticker)
+                self._pending[ticker] = future
+        return future
+
+    def _refresh_pending(self, ticker):
+        try:
+            return self.refresh(ticker)
+        finally:
+            with self._lock:
+                self._pending.pop(ticker, None)
+
+    @profiling.timed('metadata.get')
+    def get(self, ticker, block=True):
+        """Metadata dict for ticker ({} when unknown).
+
+        Stale records are returned as-is while a background refresh runs. A
+        ticker with no record at all is fetched inline unless block=False.
+        """
+        record = self.peek(ticker)
+        if record is not None:
+            if not self.is_fresh(record) and not self._recently_failed(ticker):
+                self.refresh_async(ticker)
+            return record['info']
+        if not block or self._recently_failed(ticker):
+            return {}
+        record = self.refresh_async(ticker).result()
+        return record['info'] if record else {}
+
+    def prefetch(self, tickers):
+        """Refresh every missing or stale ticker in the background; returns the futures."""
+        futures = {}
+        for ticker in dict.fromkeys(tickers):
+            record = self.peek(ticker)
+            if (record is None or not self.is_fresh(record)) and not self._recently_failed(ticker):
+                futures[ticker] = self.refresh_async(ticker)
+        return futures
+
+
+_service = MetadataService()
+
+
+def get_service():
+    return _service
+
+
+def set_service(service):
+    """Swap the module-wide service, e.g. for one with a fixture fetch function."""
+    global _service
+    _service = service
+    return service
+
+
+def get_info(ticker, block=True):
+    return _service.get(ticker, block)
+
+
+def prefetch(tickers):
+    return _service.prefetch(tickers)
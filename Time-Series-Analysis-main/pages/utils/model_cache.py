@@ -0,0 +1,174 @@
+"""Cache of fitted forecasting models, in memory and on disk.
+
+Entries are small records (fitted parameters plus the forecast they produced)
+keyed by ticker, a fingerprint of the training data, the model order and the
+date range. Recently used entries stay in an in-process LRU; every entry is
+also pickled to disk, where the least recently used files are evicted once the
+directory grows past its entry or byte budget. The directory is only scanned
+when a running count of this process's writes says a budget was crossed,
+and each pass trims to EVICT_FRACTION of the budgets, so scans stay rare.
+"""
+import os
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from pages.utils.data_store import DATA_DIR
+
+MAX_MEMORY_ENTRIES = 32
+MAX_DISK_ENTRIES = 500
+MAX_DISK_BYTES = 256 * 1024 * 1024
+EVICT_FRACTION = 0.9
+
+
+def fingerprint(data):
+    """Stable hash of a series' values (and index, when it has one)."""
+    digest = hashlib.sha1()
+    values = np.ascontiguousarray(np.asarray(data, dtype=np.float64))
+    digest.update(str(values.shape).encode())
+    digest.update(values.tobytes())
+    if isinstance(data, (pd.Series, pd.DataFrame)):
+        digest.update(np.asarray(data.index.asi8 if isinstance(data.index, pd.DatetimeIndex) else data.index).tobytes())
+    return digest.hexdigest()
+
+
+def make_key(ticker, data, order, date_range=None):
+    start, end = date_range if date_range is not None else (None, None)
+    parts = [str(ticker), fingerprint(data), str(tuple(order)), str(start), str(end)]
+    return hashlib.sha1('|'.join(parts).encode()).hexdigest()
+
+
+class ModelCache:
+    def __init__(self, root=None, max_memory_entries=MAX_MEMORY_ENTRIES,
+                 max_disk_entries=MAX_DISK_ENTRIES, max_disk_bytes=MAX_DISK_BYTES):
+        self.root = root or os.path.join(DATA_DIR, 'models')
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        # [files, bytes] on disk as of the last scan plus our writes since (None: not scanned yet)
+        self._usage = None
+
+    def _path(self, key):
+        return os.path.join(self.root, f'{key}.pkl')
+
+    def _remember(self, key, record):
+        with self._lock:
+            self._memory[key] = record
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                record = pickle.load(f)
+            os.utime(path)  # mtime doubles as the on-disk LRU clock
+        except Exception:
+            # Missing, truncated, or pickled by other library versions (AttributeError,
+            # ImportError, TypeError, ...): all of them are a miss
+            return None
+        self._remember(key, record)
+        return record
+
+    def _store(self, key, record):
+        self._remember(key, record)
+        os.makedirs(self.root, exist_ok=True)
+        path = self._path(key)
+        tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(record, f, protocol=pickle.HIGHEST_PROTOCOL)
+            size = f.tell()
+        try:
+            replaced = os.path.getsize(path)
+        except OSError:
+            replaced = None
+        os.replace(tmp, path)
+        with self._lock:
+            if self._usage is not None:
+                self._usage[0] += replaced is None
+                self._usage[1] += size - (replaced or 0)
+
+    def _over_budget(self):
+        with self._lock:
+            usage = self._usage
+        return usage is None or usage[0] > self.max_disk_entries or usage[1] > self.max_disk_bytes
+
+    def put(self, key, record):
+        self._store(key, record)
+        if self._over_budget():
+            self.evict()
+
+    def put_many(self, records):
+        """put() for a dict of entries, with at most one eviction pass at the end."""
+        for key, record in records.items():
+            self._store(key, record)
+        if records and self._over_budget():
+            self.evict()
+
+    def evict(self):
+        """Scan the directory and, if a disk budget is exceeded, drop least recently used files.
+
+        Files written by other processes are only counted here, so a shared
+        directory can overshoot its budgets until one of them scans.
+        """
+        try:
+            entries = [e for e in os.scandir(self.root) if e.name.endswith('.pkl')]
+        except FileNotFoundError:
+            entries = []
+        stats = []
+        for entry in entries:
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            stats.append((stat.st_mtime, stat.st_size, entry.path))
+        stats.sort(reverse=True)
+        total = sum(size for _, size, _ in stats)
+        if len(stats) > self.max_disk_entries or total > self.max_disk_bytes:
+            max_entries = int(self.max_disk_entries * EVICT_FRACTION)
+            max_bytes = self.max_disk_bytes * EVICT_FRACTION
+        else:
+            max_entries, max_bytes = len(stats), total
+        total, kept = 0, 0
+        for _, size, path in stats:
+            if kept < max_entries and total + size <= max_bytes:
+                total += size
+                kept += 1
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            self._usage = [kept, total]
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._usage = None
+        for entry in os.scandir(self.root) if os.path.isdir(self.root) else []:
+            if entry.name.endswith('.pkl'):
+                os.remove(entry.path)
+
+
+_cache = ModelCache()
+
+
+def get_cache():
+    return _cache
+
+
+def set_cache(cache):
+    global _cache
+    _cache = cache
+    return cache
@@ -1,68 +1,122 @@
-import yfinance as yf
-import matplotlib.pyplot as plt
-from statsmodels.tsa.stattools import adfuller
-from sklearn.metrics import mean_squared_error, r2_score
-from statsmodels.tsa.arima.model import ARIMA
+# statsmodels and scikit-learn take seconds to import, so they are loaded by
+# the functions that use them rather than whenever a page imports this module
 import numpy as np
-from sklearn.preprocessing import StandardScaler
 from datetime import datetime, timedelta
 import pandas as pd 
+from pages.utils import data_store, model_cache, profiling, stationarity
 
 def get_data(ticker):
-    stock_data = yf.download(ticker, start='2024-01-01')
+    stock_data = data_store.get_history(ticker, start='2024-01-01')
     return stock_data[['Close']]
 
 def stationary_check(close_price):
-    adf_test = adfuller(close_price)
-    p_value = round(adf_test[1],3)
+    p_value = round(stationarity.pvalue(close_price),3)
     return p_value
 
+def get_panel_data(tickers):
+    # Close prices of a whole watchlist, one column per ticker
+    return data_store.get_panel(tickers, start='2024-01-01')
+
 def get_rolling_mean(close_price):
     rolling_price = close_price.rolling(window=7).mean().dropna()
     return rolling_price
+
+def get_panel_rolling_mean(panel):
+    # Each ticker rolls over its own trading days, as get_rolling_mean does; rolling the
+    # outer-joined panel directly would turn every date a ticker lacks into 7 NaNs
+    return panel.apply(lambda column: column.dropna().rolling(window=7).mean()).reindex(panel.index)
     
 def get_differencing_order(close_price):
-    
-    p_value = stationary_check(close_price)
-    d = 0
-    while True:
-        if p_value > 0.05:
-            d += 1
-            close_price = close_price.diff().dropna()
-            p_value = stationary_check(close_price)
-        else:
-            break
-    return d
-
-def fit_model(data, differencing_order):
-    model = ARIMA(data, order=(30,differencing_order,30))
-    model_fit = model.fit()
+    # ADF results are memoized per series and differencing level
+    return stationarity.differencing_order(close_price)
+
+# (p, q) used when no order search has been run; see order_search
+DEFAULT_ARMA_ORDER = (30, 30)
+
+def _order(differencing_order, arma_order=None):
+    p, q = arma_order or DEFAULT_ARMA_ORDER
+    return (p, differencing_order, q)
+
+@profiling.timed('model.fit')
+def _fit(data, differencing_order, start_params=None, arma_order=None):
+    from statsmodels.tsa.arima.model import ARIMA
+
+    model = ARIMA(data, order=_order(differencing_order, arma_order))
+    model_fit = model.fit(start_params=start_params)
 
     forecast_steps = 30
     forecast = model_fit.get_forecast(steps=forecast_steps)
 
     predictions = forecast.predicted_mean
+    return predictions, model_fit.params
+
+def fit_model(data, differencing_order, arma_order=None):
+    predictions, _ = _fit(data, differencing_order, arma_order=arma_order)
     return predictions
+
+def _date_range(dates):
+    return (dates[0], dates[-1]) if dates is not None and len(dates) else None
+
+@profiling.timed('model.cached_fit')
+def cached_fit(data, differencing_order, ticker=None, dates=None, warm_start_key=None, arma_order=None):
+    # Fitted parameters and predictions are reused across reruns and sessions;
+    # a miss can warm-start from another cached fit (e.g. the holdout model)
+    cache = model_cache.get_cache()
+    key = model_cache.make_key(ticker, data, _order(differencing_order, arma_order), _date_range(dates))
+    record = cache.get(key)
+    if record is None:
+        warm = cache.get(warm_start_key) if warm_start_key else None
+        predictions, params = _fit(data, differencing_order, warm['params'] if warm else None, arma_order)
+        record = {'params': np.asarray(params), 'predictions': np.asarray(predictions)}
+        cache.put(key, record)
+    return record['predictions'], key
     
-def evaluate_model(original_price, differencing_order):
+def evaluate_model(original_price, differencing_order, ticker=None, dates=None, arma_order=None):
+    from sklearn.metrics import mean_squared_error
+
     train_data, test_data = original_price[:-30], original_price[-30:]
-    predictions = fit_model(train_data,differencing_order)
+    predictions, _ = cached_fit(train_data, differencing_order, ticker,
+                                dates[:-30] if dates is not None else None, arma_order=arma_order)
     rmse = np.sqrt(mean_squared_error(test_data, predictions))
     return round(rmse,2)
 
 def scaling(close_price):
+    from sklearn.preprocessing import StandardScaler
+
     scaler = StandardScaler()
     scaled_data = scaler.fit_transform(np.array(close_price).reshape(-1,1))
     return scaled_data, scaler
 
-def get_forecast(original_price, differencing_order):
-    predictions = fit_model(original_price, differencing_order)
+def get_forecast(original_price, differencing_order, ticker=None, dates=None, arma_order=None):
+    holdout_key = model_cache.make_key(ticker, original_price[:-30], _order(differencing_order, arma_order),
+                                       _date_range(dates[:-30] if dates is not None else None))
+    predictions, _ = cached_fit(original_price, differencing_order, ticker, dates,
+                                warm_start_key=holdout_key, arma_order=arma_order)
+    return _forecast_frame(predictions)
+
+def _forecast_frame(predictions):
     start_date = datetime.now().strftime('%Y-%m-%d')
     end_date = (datetime.now() + timedelta(days = 29)).strftime('%Y-%m-%d')
     forecast_index = pd.date_range(start=start_date, end=end_date, freq='D')
     forecast_df = pd.DataFrame(predictions, index = forecast_index, columns = ['Close'])
     return forecast_df
 
+def get_fast_forecast(close_price, method='ar'):
+    # Batched NumPy engine: every column of close_price is fitted in one pass
+    from pages.utils import panel_forecast
+
+    predictions = panel_forecast.forecast(close_price, method)
+    return {name: _forecast_frame(predictions[name].to_numpy()) for name in predictions.columns}
+
+def get_incremental_forecast(close_price, differencing_order, ticker=None, arma_order=None):
+    # Unscaled prices: a StandardScaler refitted on every new bar would change
+    # the whole history, and the stored filter state could never be reused
+    from pages.utils import incremental
+
+    predictions, action = incremental.get_forecaster().update(
+        ticker, close_price, _order(differencing_order, arma_order))
+    return _forecast_frame(predictions), action
+
 def inverse_scaling(scaler, scaled_data):
     close_price = scaler.inverse_transform(np.array(scaled_data).reshape(-1,1))
     return close_price
\ No newline at end of file
@@ -0,0 +1,179 @@
+"""Automatic ARIMA (p, q) selection by information criterion.
+
+Candidates are fitted on a process pool. The grid search first runs every
+candidate for a few optimizer iterations, then fully fits them best-first in
+waves, skipping any whose partial score is already worse than the best full
+fit by more than PRUNE_MARGIN. The stepwise search walks from a few small
+models to neighbouring orders while the criterion keeps improving. Both stop
+at the wall-clock budget and return whatever has been scored so far.
+"""
+import time
+import warnings
+import multiprocessing
+import numpy as np
+import pandas as pd
+from pages.utils import model_cache, parallel, profiling
+
+P_VALUES = range(0, 6)
+Q_VALUES = range(0, 6)
+CRITERION = 'aic'
+BUDGET_SECONDS = 60
+PARTIAL_ITERATIONS = 15
+PRUNE_MARGIN = 10.0
+FALLBACK_ORDER = (0, 0)
+STEPWISE_START = [(2, 2), (0, 0), (1, 0), (0, 1)]
+
+
+def _fit_candidate(data, differencing_order, p, q, maxiter=None):
+    from statsmodels.tsa.arima.model import ARIMA
+
+    started = time.perf_counter()
+    row = {'p': p, 'q': q, 'aic': np.inf, 'bic': np.inf, 'llf': -np.inf, 'converged': False, 'error': None}
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            method_kwargs = {'maxiter': maxiter} if maxiter else None
+            fitted = ARIMA(data, order=(p, differencing_order, q)).fit(method_kwargs=method_kwargs)
+        row.update(aic=fitted.aic, bic=fitted.bic, llf=fitted.llf,
+                   converged=bool(fitted.mle_retvals.get('converged', True)) if fitted.mle_retvals else True)
+    except Exception as e:
+        row['error'] = str(e)
+    row['seconds'] = time.perf_counter() - started
+    return row
+
+
+class _Runner:
+    """Runs candidate batches on a pool until the deadline, then kills the workers."""
+
+    def __init__(self, data, differencing_order, workers, deadline):
+        self.data = np.asarray(data, dtype=np.float64).ravel()
+        self.differencing_order = differencing_order
+        self.deadline = deadline
+        self.workers = workers
+        self.pool = parallel.get_context().Pool(workers) if workers > 1 else None
+        self.timed_out = False
+
+    def run(self, candidates, maxiter=None):
+        rows = []
+        if self.pool is None:
+            for p, q in candidates:
+                if time.monotonic() >= self.deadline:
+                    self.timed_out = True
+                    break
+                rows.append(_fit_candidate(self.data, self.differencing_order, p, q, maxiter))
+            return rows
+
+        pending = [self.pool.apply_async(_fit_candidate, (self.data, self.differencing_order, p, q, maxiter))
+                   for p, q in candidates]
+        for result in pending:
+            try:
+                rows.append(result.get(timeout=max(0.0, self.deadline - time.monotonic())))
+            except multiprocessing.TimeoutError:
+                self.timed_out = True
+                break
+        return rows
+
+    def close(self):
+        if self.pool is not None:
+            # terminate() rather than close(): fits still running past the budget are abandoned
+            self.pool.terminate()
+            self.pool.join()
+
+
+def _grid(runner, p_values, q_values, criterion, partial_iterations, prune_margin):
+    trace, queue = [], []
+    best = np.inf
+    for row in runner.run([(p, q) for p in p_values for q in q_values], maxiter=partial_iterations):
+        # Candidates that already converged in the partial pass need no refit
+        if row['converged'] and np.isfinite(row[criterion]):
+            trace.append(dict(row, stage='final'))
+            best = min(best, row[criterion])
+        else:
+            trace.append(dict(row, stage='partial'))
+            if not row['error']:
+                queue.append(row)
+    queue.sort(key=lambda r: r[criterion])
+
+    while queue and not runner.timed_out:
+        survivors = []
+        for row in queue:
+            if row[criterion] <= best + prune_margin:
+                survivors.append(row)
+            else:
+                trace.append({'p': row['p'], 'q': row['q'], 'stage': 'pruned', 'seconds': 0.0})
+        wave, queue = survivors[:runner.workers], survivors[runner.workers:]
+        for row in runner.run([(r['p'], r['q']) for r in wave]):
+            trace.append(dict(row, stage='final'))
+            if np.isfinite(row[criterion]):
+                best = min(best, row[criterion])
+    return trace
+
+
+def _stepwise(runner, p_values, q_values, criterion):
+    trace, scored = [], {}
+    p_range, q_range = (min(p_values), max(p_values)), (min(q_values), max(q_values))
+
+    def inside(p, q):
+        return p_range[0] <= p <= p_range[1] and q_range[0] <= q <= q_range[1]
+
+    batch = [c for c in STEPWISE_START if inside(*c)] or [(p_range[0], q_range[0])]
+    best_order, best = None, np.inf
+    while batch and not runner.timed_out:
+        for row in runner.run(batch):
+            trace.append(dict(row, stage='final'))
+            scored[(row['p'], row['q'])] = row[criterion]
+        order, score = min(scored.items(), key=lambda item: item[1])
+        if score >= best:
+            break
+        best_order, best = order, score
+        p, q = best_order
+        batch = [(p + dp, q + dq) for dp in (-1, 0, 1) for dq in (-1, 0, 1)
+                 if (dp or dq) and inside(p + dp, q + dq) and (p + dp, q + dq) not in scored]
+    return trace
+
+
+def search_order(data, differencing_order, p_values=P_VALUES, q_values=Q_VALUES, criterion=CRITERION,
+                 method='grid', budget=BUDGET_SECONDS, workers=None,
+                 partial_iterations=PARTIAL_ITERATIONS, prune_margin=PRUNE_MARGIN):
+    """Pick the (p, q) with the lowest AIC/BIC for an ARIMA(p, d, q) on data.
+
+    Returns a dict with the chosen 'order', the search 'trace' (one row per fit
+    or pruned candidate), the elapsed 'seconds' and whether the budget ran out.
+    """
+    started = time.monotonic()
+    candidates = len(p_values) * len(q_values)
+    workers = workers or parallel.default_workers(candidates)
+    runner = _Runner(data, differencing_order, workers, started + budget)
+    try:
+        if method == 'stepwise':
+            trace = _stepwise(runner, p_values, q_values, criterion)
+        else:
+            trace = _grid(runner, p_values, q_values, criterion, partial_iterations, prune_margin)
+    finally:
+        runner.close()
+
+    trace = pd.DataFrame(trace, columns=['p', 'q', 'stage', 'aic', 'bic', 'llf', 'converged', 'seconds', 'error'])
+    final = trace[(trace['stage'] == 'final') & np.isfinite(trace[criterion].astype(float))]
+    if final.empty:
+        order = FALLBACK_ORDER
+    else:
+        best = final.loc[final[criterion].astype(float).idxmin()]
+        order = (int(best['p']), int(best['q']))
+    return {'order': order, 'criterion': criterion, 'trace': trace,
+            'seconds': time.monotonic() - started, 'timed_out': runner.timed_out}
+
+
+@profiling.timed('model.order_search')
+def cached_search(data, differencing_order, ticker=None, dates=None, **kwargs):
+    """search_order() memoized in the model cache alongside the fitted models."""
+    spec = ('order-search', differencing_order, tuple(sorted((k, str(v)) for k, v in kwargs.items())))
+    date_range = (dates[0], dates[-1]) if dates is not None and len(dates) else None
+    key = model_cache.make_key(ticker, data, spec, date_range)
+    cache = model_cache.get_cache()
+    result = cache.get(key)
+    if result is None:
+        result = search_order(data, differencing_order, **kwargs)
+        # A search cut short by the budget is not worth remembering
+        if not result['timed_out']:
+            cache.put(key, result)
+    return result
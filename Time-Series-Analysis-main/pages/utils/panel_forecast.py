@@ -0,0 +1,147 @@
+"""Fast forecasts for a whole panel of series at once, in batched NumPy.
+
+The panel is one (series x time) matrix, right-aligned so every row ends at
+the latest date; shorter histories are padded at the start. Each method fits
+all rows together:
+
+- 'ar': AR(p) with intercept on first differences (an ARIMA(p, 1, 0) with
+  drift), estimated by ridge-stabilized least squares: one batched
+  (p+1)x(p+1) normal-equation solve per series;
+- 'holt': damped Holt linear-trend smoothing, with alpha, beta and phi picked
+  per series from a grid by one-step squared error (beta = 0 is simple
+  exponential smoothing); every grid point runs in the same time loop;
+- 'drift' and 'naive': the usual baselines.
+
+There is no per-series Python loop, so a thousand tickers take about as many
+loop iterations as one.
+"""
+import numpy as np
+import pandas as pd
+
+HORIZON = 30
+METHODS = ['ar', 'holt', 'drift', 'naive']
+AR_LAGS = 5
+RIDGE = 1e-6
+HOLT_ALPHAS = np.linspace(0.1, 0.9, 9)
+HOLT_BETAS = np.array([0.0, 0.05, 0.1, 0.2])
+HOLT_PHIS = np.array([0.9, 0.98])
+
+
+def to_matrix(prices):
+    """(names, values) from a wide frame (dates x tickers) or a {name: 1-D series} dict.
+
+    Gaps are forward-filled; rows are right-aligned and NaN before their first value.
+    """
+    if isinstance(prices, pd.DataFrame):
+        frame = prices.ffill()
+        return list(frame.columns), frame.to_numpy(dtype=np.float64).T
+
+    names = list(prices)
+    arrays = [pd.Series(np.asarray(prices[n], dtype=np.float64).ravel()).ffill().to_numpy() for n in names]
+    width = max((len(a) for a in arrays), default=0)
+    values = np.full((len(arrays), width), np.nan)
+    for row, a in zip(values, arrays):
+        if len(a):
+            row[width - len(a):] = a
+    return names, values
+
+
+def _first_valid(values):
+    valid = np.isfinite(values)
+    return np.where(valid.any(axis=1), valid.argmax(axis=1), values.shape[1])
+
+
+def _backfill_start(values):
+    # Repeat each row's first value over its padding: a flat prefix adds no
+    # one-step error to the smoothers and no signal to the differences
+    first = _first_valid(values)
+    rows = np.arange(len(values))
+    start = values[rows, np.minimum(first, values.shape[1] - 1)]
+    return np.where(np.arange(values.shape[1]) < first[:, None], start[:, None], values)
+
+
+# --- METHODS ---
+def naive(values, horizon=HORIZON):
+    return np.repeat(values[:, -1:], horizon, axis=1)
+
+
+def drift(values, horizon=HORIZON):
+    first = _first_valid(values)
+    rows = np.arange(len(values))
+    span = values.shape[1] - 1 - first
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = np.where(span > 0, (values[:, -1] - values[rows, np.minimum(first, values.shape[1] - 1)]) / span, 0.0)
+    return values[:, -1:] + slope[:, None] * np.arange(1, horizon + 1)
+
+
+def ar(values, horizon=HORIZON, lags=AR_LAGS):
+    diffs = np.diff(values, axis=1)
+    count, width = diffs.shape
+    if width <= lags:
+        return drift(values, horizon)
+
+    # Design rows t = lags..width-1: [1, d[t-1], ..., d[t-lags]] -> d[t]
+    columns = [np.ones((count, width - lags))] + [diffs[:, lags - k:width - k] for k in range(1, lags + 1)]
+    x = np.stack(columns, axis=2)
+    y = diffs[:, lags:]
+    mask = np.isfinite(y) & np.isfinite(x).all(axis=2)
+    x = np.where(mask[:, :, None], x, 0.0)
+    y = np.where(mask, y, 0.0)
+
+    xtx = np.einsum('stk,stl->skl', x, x) + RIDGE * np.eye(lags + 1)
+    xty = np.einsum('stk,st->sk', x, y)
+    coef = np.linalg.solve(xtx, xty[:, :, None])[:, :, 0]
+
+    # Too few complete rows to trust the fit: fall back to drift
+    enough = mask.sum(axis=1) >= 3 * (lags + 1)
+    recent = diffs[:, -lags:][:, ::-1].copy()
+    steps = np.empty((count, horizon))
+    for h in range(horizon):
+        step = coef[:, 0] + np.einsum('sk,sk->s', coef[:, 1:], recent)
+        steps[:, h] = step
+        recent = np.concatenate([step[:, None], recent[:, :-1]], axis=1)
+    forecast = values[:, -1:] + np.cumsum(steps, axis=1)
+    return np.where(enough[:, None], forecast, drift(values, horizon))
+
+
+def holt(values, horizon=HORIZON, alphas=HOLT_ALPHAS, betas=HOLT_BETAS, phis=HOLT_PHIS):
+    y = _backfill_start(values)
+    grid = np.array([(a, b, p) for a in alphas for b in betas for p in phis])
+    alpha, beta, phi = (grid[:, i][None, :] for i in range(3))
+
+    # State per (series, grid point); every grid point advances in the same loop
+    level = np.repeat(y[:, :1], len(grid), axis=1)
+    trend = np.zeros_like(level)
+    sse = np.zeros_like(level)
+    for t in range(1, y.shape[1]):
+        predicted = level + phi * trend
+        error = y[:, t:t + 1] - predicted
+        sse += error * error
+        new_level = predicted + alpha * error
+        trend = phi * trend + alpha * beta * error
+        level = new_level
+
+    best = np.argmin(sse, axis=1)
+    rows = np.arange(len(y))
+    damping = np.cumsum(grid[best, 2][:, None] ** np.arange(1, horizon + 1), axis=1)
+    return level[rows, best][:, None] + trend[rows, best][:, None] * damping
+
+
+_METHODS = {'ar': ar, 'holt': holt, 'drift': drift, 'naive': naive}
+
+
+def forecast(prices, method='ar', horizon=HORIZON):
+    """Forecasts for every series: a frame with one row per step ahead, one column per series."""
+    names, values = to_matrix(prices)
+    predictions = _METHODS[method](values, horizon) if len(names) else np.empty((0, horizon))
+    return pd.DataFrame(predictions.T, index=pd.RangeIndex(1, horizon + 1, name='Step'), columns=names)
+
+
+def holdout_rmse(prices, method='ar', horizon=HORIZON):
+    """RMSE per series of forecasting the last horizon values from the ones before."""
+    names, values = to_matrix(prices)
+    if not len(names):
+        return pd.Series(dtype=np.float64, name='RMSE')
+    predictions = _METHODS[method](values[:, :-horizon], horizon)
+    errors = predictions - values[:, -horizon:]
+    return pd.Series(np.sqrt(np.nanmean(errors ** 2, axis=1)), index=names, name='RMSE')
@@ -0,0 +1,19 @@
+"""Process-pool settings shared by the modules that fan work out to CPU workers."""
+import os
+import multiprocessing
+
+# Streamlit runs page scripts on worker threads, and forking a threaded process
+# can deadlock on locks held by other threads, so workers are spawned by default.
+START_METHOD = os.environ.get('TS_MP_START_METHOD', 'spawn')
+
+
+def get_context():
+    return multiprocessing.get_context(START_METHOD)
+
+
+def default_workers(limit=None):
+    """One worker per core, capped at limit (e.g. the number of tasks)."""
+    workers = os.cpu_count() or 1
+    if limit is not None:
+        workers = min(workers, limit)
+    return max(1, workers)
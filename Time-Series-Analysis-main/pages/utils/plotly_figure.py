@@ -1,8 +1,6 @@
 import plotly.graph_objects as go
-import dateutil.relativedelta
-import pandas_ta_classic as pta # USING THE CORRECT IMPORT
-import datetime
 import pandas as pd
+from pages.utils import downsample, indicators, profiling, timeframe
 
 # --- COMMON CHART STYLE ---
 def apply_dark_theme(fig):
@@ -36,34 +34,29 @@ def plotly_table(dataframe):
     return fig
 
 def filter_data(dataframe, num_period):
-    # TIMEZONE FIX
-    if dataframe.index.tz is not None:
-        dataframe.index = dataframe.index.tz_localize(None)
-        
-    if num_period == '1mo':
-        date = dataframe.index[-1] + dateutil.relativedelta.relativedelta(months=-1)
-    elif num_period == '5d':
-        date = dataframe.index[-1] + dateutil.relativedelta.relativedelta(days=-5)
-    elif num_period == '6mo':
-        date = dataframe.index[-1] + dateutil.relativedelta.relativedelta(months=-6)
-    elif num_period == '1y':
-        date = dataframe.index[-1] + dateutil.relativedelta.relativedelta(years=-1)
-    elif num_period == '5y':
-        date = dataframe.index[-1] + dateutil.relativedelta.relativedelta(years=-5)
-    elif num_period == 'ytd':
-        date = datetime.datetime(dataframe.index[-1].year, 1, 1)
-    else:
-        date = dataframe.index[0]
-    
-    df_reset = dataframe.reset_index()
-    return df_reset[df_reset['Date'] > date]
+    # Binary search on the sorted Date index; returns a view of the caller's
+    # frame (Date stays the index) and leaves its timezone alone
+    return timeframe.slice_period(dataframe, num_period)
+
+def with_indicator(dataframe, num_period, name, ticker=None):
+    # Visible rows and their indicator values; the caller's frame is left untouched
+    visible = filter_data(dataframe, num_period)
+    if visible.empty:
+        return visible, pd.DataFrame(index=visible.index, columns=indicators.INDICATORS[name].columns)
+    return visible, indicators.window(dataframe['Close'], name, start=visible.index[0], ticker=ticker)
+
+def _line(series, num_period, ticker, name):
+    # Thinned (x, y) for a line trace; long ranges are cut down to the point budget
+    return downsample.reduce_line(series, ticker=ticker, num_period=num_period, name=name)
 
-def close_chart(dataframe, num_period=False):
+@profiling.timed('figure.close_chart')
+def close_chart(dataframe, num_period=False, ticker=None):
     if num_period:
         dataframe = filter_data(dataframe, num_period)
+    x, y = _line(dataframe['Close'], num_period, ticker, 'Close')
     
     fig = go.Figure()
-    fig.add_trace(go.Scatter(x=dataframe['Date'], y=dataframe['Close'], 
+    fig.add_trace(go.Scatter(x=x, y=y, 
                              mode='lines', name='Close', 
                              line=dict(width=2, color='#00e676'), fill='tozeroy', fillcolor='rgba(0, 230, 118, 0.1)'))
     
@@ -71,10 +64,12 @@ def close_chart(dataframe, num_period=False):
     fig.update_layout(height=500)
     return fig
 
-def candlestick(dataframe, num_period):
-    dataframe = filter_data(dataframe, num_period)
+@profiling.timed('figure.candlestick')
+def candlestick(dataframe, num_period, ticker=None):
+    # Long ranges are rolled up to weekly/monthly candles
+    dataframe = downsample.reduce_ohlc(filter_data(dataframe, num_period), ticker=ticker, num_period=num_period)
     fig = go.Figure()
-    fig.add_trace(go.Candlestick(x=dataframe['Date'],
+    fig.add_trace(go.Candlestick(x=dataframe.index,
                     open=dataframe['Open'], high=dataframe['High'],
                     low=dataframe['Low'], close=dataframe['Close'],
                     increasing_line_color='#00e676', decreasing_line_color='#ff1744'))
@@ -83,47 +78,52 @@ def candlestick(dataframe, num_period):
     fig.update_layout(showlegend=False, height=500)
     return fig
 
-def RSI(dataframe, num_period):
-    dataframe['RSI'] = pta.rsi(dataframe['Close'])
-    dataframe = filter_data(dataframe, num_period)
+@profiling.timed('figure.RSI')
+def RSI(dataframe, num_period, ticker=None):
+    dataframe, values = with_indicator(dataframe, num_period, 'RSI', ticker)
+    x, y = _line(values['RSI'], num_period, ticker, 'RSI')
     
     fig = go.Figure()
-    fig.add_trace(go.Scatter(x=dataframe['Date'], y=dataframe.RSI, name='RSI', line=dict(width=2, color='#ff9100')))
-    fig.add_trace(go.Scatter(x=dataframe['Date'], y=[70]*len(dataframe), name='Overbought', line=dict(color='#ff1744', dash='dash')))
-    fig.add_trace(go.Scatter(x=dataframe['Date'], y=[30]*len(dataframe), name='Oversold', line=dict(color='#00e676', dash='dash')))
+    fig.add_trace(go.Scatter(x=x, y=y, name='RSI', line=dict(width=2, color='#ff9100')))
+    fig.add_hline(y=70, line=dict(color='#ff1744', dash='dash'), annotation_text='Overbought')
+    fig.add_hline(y=30, line=dict(color='#00e676', dash='dash'), annotation_text='Oversold')
 
     fig = apply_dark_theme(fig)
     fig.update_layout(yaxis_range=[0, 100], height=250)
     return fig
 
-def Moving_average(dataframe, num_period):
-    dataframe['SMA_50'] = pta.sma(dataframe['Close'], 50)
-    dataframe = filter_data(dataframe, num_period)
+@profiling.timed('figure.Moving_average')
+def Moving_average(dataframe, num_period, ticker=None):
+    dataframe, values = with_indicator(dataframe, num_period, 'SMA_50', ticker)
+    close_x, close_y = _line(dataframe['Close'], num_period, ticker, 'Close')
+    sma_x, sma_y = _line(values['SMA_50'], num_period, ticker, 'SMA_50')
     
     fig = go.Figure()
-    fig.add_trace(go.Scatter(x=dataframe['Date'], y=dataframe['Close'], mode='lines', name='Close', line=dict(color='#00e676')))
-    fig.add_trace(go.Scatter(x=dataframe['Date'], y=dataframe['SMA_50'], mode='lines', name='SMA 50', line=dict(color='#d500f9', width=2)))
+    fig.add_trace(go.Scatter(x=close_x, y=close_y, mode='lines', name='Close', line=dict(color='#00e676')))
+    fig.add_trace(go.Scatter(x=sma_x, y=sma_y, mode='lines', name='SMA 50', line=dict(color='#d500f9', width=2)))
     
     fig = apply_dark_theme(fig)
     fig.update_layout(height=500)
     return fig
 
-def MACD(dataframe, num_period):
-    macd = pta.macd(dataframe['Close'])
-    dataframe['MACD'] = macd.iloc[:, 0]
-    dataframe['MACD Signal'] = macd.iloc[:, 1]
-    dataframe['MACD Hist'] = macd.iloc[:, 2]
-    dataframe = filter_data(dataframe, num_period)
+@profiling.timed('figure.MACD')
+def MACD(dataframe, num_period, ticker=None):
+    dataframe, values = with_indicator(dataframe, num_period, 'MACD', ticker)
+    # MACD, signal and histogram are selected by column name
     
     fig = go.Figure()
-    fig.add_trace(go.Bar(x=dataframe['Date'], y=dataframe['MACD Hist'], name='Hist', marker_color='#2979ff'))
-    fig.add_trace(go.Scatter(x=dataframe['Date'], y=dataframe['MACD'], name='MACD', line=dict(color='#ff9100')))
-    fig.add_trace(go.Scatter(x=dataframe['Date'], y=dataframe['MACD Signal'], name='Signal', line=dict(color='#00e676')))
+    hist_x, hist_y = _line(values['MACD Hist'], num_period, ticker, 'MACD Hist')
+    macd_x, macd_y = _line(values['MACD'], num_period, ticker, 'MACD')
+    signal_x, signal_y = _line(values['MACD Signal'], num_period, ticker, 'MACD Signal')
+    fig.add_trace(go.Bar(x=hist_x, y=hist_y, name='Hist', marker_color='#2979ff'))
+    fig.add_trace(go.Scatter(x=macd_x, y=macd_y, name='MACD', line=dict(color='#ff9100')))
+    fig.add_trace(go.Scatter(x=signal_x, y=signal_y, name='Signal', line=dict(color='#00e676')))
     
     fig = apply_dark_theme(fig)
     fig.update_layout(height=250)
     return fig
 
+@profiling.timed('figure.Moving_average_forecast')
 def Moving_average_forecast(forecast):
     fig = go.Figure()
     fig.add_trace(go.Scatter(x=forecast.index[:-30], y=forecast['Close'].iloc[:-30], mode='lines', name='Historical', line=dict(color='#888')))
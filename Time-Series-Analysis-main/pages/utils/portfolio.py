@@ -0,0 +1,149 @@
+"""Mean-variance portfolios on the CAPM pages' daily return panel.
+
+simulate() scores random long-only weight vectors in chunks: each chunk is one
+(chunk x assets) weight matrix, and returns and variances for the whole chunk
+come from two matrix products. The chunk size follows a memory budget, so
+500k portfolios over 50 assets never hold more than ~MEMORY_BUDGET of
+weights at once; only per-portfolio return, volatility and Sharpe ratio are
+kept.
+
+min_variance(), max_sharpe() and frontier() solve the same problem directly:
+in closed form when short positions are allowed, with SLSQP when long-only.
+All figures are annualized decimals (0.12 = 12%).
+"""
+import numpy as np
+import pandas as pd
+from pages.utils.price_panel import PricePanel
+
+PERIODS = 252
+MEMORY_BUDGET = 64 * 1024 * 1024
+FRONTIER_POINTS = 40
+
+
+def moments(stocks_daily_return, market='sp500', periods=PERIODS):
+    """Annualized mean returns and covariance of every asset column except the market.
+
+    Takes the daily_return() frame or PricePanel, whose returns are in percent.
+    """
+    if isinstance(stocks_daily_return, PricePanel):
+        stocks_daily_return = stocks_daily_return.to_frame(date_column=False)
+    numeric = stocks_daily_return.select_dtypes(include='number')
+    returns = numeric[[c for c in numeric.columns if c != market]] / 100
+    return returns.mean() * periods, returns.cov() * periods
+
+
+def _chunk_size(assets, budget=MEMORY_BUDGET):
+    # Weights, weights @ cov and one scratch copy, all float64
+    return max(1, budget // (3 * 8 * assets))
+
+
+def simulate(mu, cov, portfolios=100_000, rf=0.0, seed=0, memory_budget=MEMORY_BUDGET):
+    """Score random long-only portfolios (uniform on the weight simplex).
+
+    Returns a frame with Return, Volatility and Sharpe per portfolio; the
+    optimal weights come from min_variance() and max_sharpe().
+    """
+    m = np.asarray(mu, dtype=np.float64)
+    c = np.asarray(cov, dtype=np.float64)
+    assets = len(m)
+    rng = np.random.default_rng(seed)
+    chunk = _chunk_size(assets, memory_budget)
+
+    ret = np.empty(portfolios)
+    vol = np.empty(portfolios)
+    for lo in range(0, portfolios, chunk):
+        n = min(chunk, portfolios - lo)
+        # Normalized exponentials are Dirichlet(1): uniform over long-only weights
+        w = rng.standard_exponential((n, assets))
+        w /= w.sum(axis=1, keepdims=True)
+        r = w @ m
+        v = np.sqrt(np.einsum('ij,ij->i', w @ c, w))
+        ret[lo:lo + n], vol[lo:lo + n] = r, v
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return pd.DataFrame({'Return': ret, 'Volatility': vol, 'Sharpe': (ret - rf) / vol})
+
+
+# --- DIRECT SOLUTIONS ---
+def _solve(cov, rhs):
+    try:
+        return np.linalg.solve(cov, rhs)
+    except np.linalg.LinAlgError:
+        return np.linalg.pinv(cov) @ rhs
+
+
+def _slsqp(objective, gradient, assets, constraints):
+    from scipy.optimize import minimize
+
+    result = minimize(objective, np.full(assets, 1.0 / assets), jac=gradient, method='SLSQP',
+                      bounds=[(0.0, 1.0)] * assets,
+                      constraints=[{'type': 'eq', 'fun': lambda w: w.sum() - 1.0}] + constraints)
+    w = np.clip(result.x, 0.0, None)
+    return w / w.sum()
+
+
+def _weights(w, mu):
+    return pd.Series(w, index=getattr(mu, 'index', None), name='Weight')
+
+
+def min_variance(mu, cov, long_only=True):
+    c = np.asarray(cov, dtype=np.float64)
+    assets = len(c)
+    if long_only:
+        w = _slsqp(lambda w: w @ c @ w, lambda w: 2 * c @ w, assets, [])
+    else:
+        w = _solve(c, np.ones(assets))
+        w = w / w.sum()
+    return _weights(w, mu)
+
+
+def max_sharpe(mu, cov, rf=0.0, long_only=True):
+    m = np.asarray(mu, dtype=np.float64)
+    c = np.asarray(cov, dtype=np.float64)
+    if long_only:
+        def negative_sharpe(w):
+            return -(w @ m - rf) / np.sqrt(w @ c @ w)
+
+        def gradient(w):
+            var = w @ c @ w
+            excess = w @ m - rf
+            return -(m * var - excess * (c @ w)) / var ** 1.5
+
+        w = _slsqp(negative_sharpe, gradient, len(m), [])
+    else:
+        # Tangency portfolio; only meaningful when some asset beats the risk-free rate
+        w = _solve(c, m - rf)
+        w = w / w.sum()
+    return _weights(w, mu)
+
+
+def performance(weights, mu, cov, rf=0.0):
+    w = np.asarray(weights, dtype=np.float64)
+    ret = float(w @ np.asarray(mu))
+    vol = float(np.sqrt(w @ np.asarray(cov) @ w))
+    return {'Return': ret, 'Volatility': vol, 'Sharpe': (ret - rf) / vol if vol else np.nan}
+
+
+def frontier(mu, cov, points=FRONTIER_POINTS, long_only=True):
+    """Minimum volatility for evenly spaced target returns, from the min-variance
+    portfolio up to the best single asset (long-only) or 1.5x that (with shorts)."""
+    m = np.asarray(mu, dtype=np.float64)
+    c = np.asarray(cov, dtype=np.float64)
+    low = performance(min_variance(mu, cov, long_only), m, c)['Return']
+    high = m.max() if long_only else max(m.max(), low) * 1.5
+    targets = np.linspace(low, high, points)
+
+    if not long_only:
+        # Two-fund closed form: var(t) = (A t^2 - 2 B t + C) / (A C - B^2)
+        ones = np.ones(len(m))
+        inv_1, inv_m = _solve(c, ones), _solve(c, m)
+        a, b, cc = ones @ inv_1, ones @ inv_m, m @ inv_m
+        var = (a * targets ** 2 - 2 * b * targets + cc) / (a * cc - b ** 2)
+        return pd.DataFrame({'Return': targets, 'Volatility': np.sqrt(np.clip(var, 0, None))})
+
+    vols = []
+    for target in targets:
+        w = _slsqp(lambda w: w @ c @ w, lambda w: 2 * c @ w, len(m),
+                   [{'type': 'eq', 'fun': lambda w, t=target: w @ m - t}])
+        vols.append(np.sqrt(w @ c @ w))
+    return pd.DataFrame({'Return': targets, 'Volatility': vols})
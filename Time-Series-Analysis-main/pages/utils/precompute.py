@@ -0,0 +1,460 @@
+"""Post-close precompute of watchlist forecasts and indicators, read first by the pages.
+
+    time-series-precompute watchlist.txt            # a pass after every close, until stopped
+    time-series-precompute watchlist.txt --once     # one pass now (e.g. from cron)
+
+SETTLE_MINUTES after each weekday close the scheduler refreshes the
+watchlist's prices and queues one job per (task, ticker) on a process pool:
+
+- 'forecast': the Stock_Prediction pipeline (get_differencing_order, order
+  search, evaluate_model, get_forecast), as batch.forecast() runs it;
+- 'indicators': RSI, SMA 50 and MACD over the full history, plus the state
+  the indicator engine needs to extend them bar by bar.
+
+A job is keyed by task, ticker and the date of the last bar it will see. A
+key that is already queued or running is not submitted again, and one whose
+result is already published is skipped, so re-running a pass (or starting the
+service late) only computes what is missing. A job that has not returned
+within its timeout (hung, or its worker was killed) is recorded as failed,
+and the pool is replaced before the next pass.
+
+Results go to a versioned store under DATA_DIR/precompute. Each pass writes a
+new version directory and publishes it by atomically replacing the CURRENT
+pointer, so readers never see a half-written pass; results the pass did not
+recompute (skipped or failed) are carried over from the previous version. The
+last KEEP_VERSIONS versions are kept.
+
+The pages call get_forecast() / load_indicators() before computing anything.
+A result is used only when it was computed from the same last bar as the
+page's data; otherwise the page computes on demand as before.
+"""
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import argparse
+import datetime
+import threading
+import multiprocessing
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from pages.utils import parallel, profiling
+from pages.utils.data_store import DATA_DIR
+
+TASKS = ['forecast', 'indicators']
+# Tickers of the Stock Analysis quick-select buttons
+DEFAULT_WATCHLIST = ['AAPL', 'TSLA', 'GOOGL', 'MSFT', 'AMZN']
+# Minutes after the close before the day's bar is reliably available
+SETTLE_MINUTES = 30
+KEEP_VERSIONS = 3
+MAX_MEMORY_ENTRIES = 64
+# Seconds a job may take: a fixed allowance plus this many order-search budgets
+# (the search itself, then the holdout and final fits)
+JOB_GRACE_SECONDS = 120
+JOB_BUDGET_FACTOR = 3
+
+
+def default_watchlist():
+    tickers = os.environ.get('TS_WATCHLIST')
+    return [t.strip().upper() for t in tickers.split(',') if t.strip()] if tickers else list(DEFAULT_WATCHLIST)
+
+
+# --- JOBS ---
+def forecast_job(ticker, options):
+    from pages.utils import batch
+
+    return batch.forecast(ticker, options['search_method'], options['search_budget']), {}
+
+
+def indicators_job(ticker, options):
+    from pages.utils import data_store
+
+    return indicator_result(data_store.get_history(ticker)['Close'])
+
+
+def indicator_result(close):
+    """(frame, meta) of every indicator over close, with the engine state at its last bar."""
+    from pages.utils import indicators as technical
+
+    values = close.to_numpy(dtype=np.float64)
+    columns, states = {}, {}
+    for name, indicator in technical.INDICATORS.items():
+        outputs, states[name] = indicator.init(values)
+        columns.update(outputs)
+    frame = pd.DataFrame(columns, index=close.index).reset_index()
+    return frame, {'states': _plain(states), 'last_close': float(values[-1])}
+
+
+def _plain(value):
+    # numpy scalars inside the indicator state, as JSON-friendly floats
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_plain(v) for v in value]
+    return float(value) if isinstance(value, (np.floating, np.integer)) else value
+
+
+JOBS = {'forecast': forecast_job, 'indicators': indicators_job}
+
+
+def run_job(task, ticker, options):
+    """Run one job; returns (task, ticker, frame, meta, error)."""
+    try:
+        frame, meta = JOBS[task](ticker, options)
+        return task, ticker, frame, meta, None
+    except Exception as exc:
+        return task, ticker, None, None, f'{type(exc).__name__}: {exc}'
+
+
+# --- RESULTS ---
+def _stem(ticker):
+    return re.sub(r'[^A-Za-z0-9._-]', '_', ticker)
+
+
+class ResultStore:
+    """Versioned results: <root>/versions/<version>/<task>/<ticker>.parquet (+ .json meta)."""
+
+    def __init__(self, root=None, keep_versions=KEEP_VERSIONS, max_memory_entries=MAX_MEMORY_ENTRIES):
+        self.root = root or os.path.join(DATA_DIR, 'precompute')
+        self.keep_versions = keep_versions
+        self.max_memory_entries = max_memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _dir(self, version):
+        return os.path.join(self.root, 'versions', version)
+
+    def _paths(self, version, task, ticker):
+        base = os.path.join(self._dir(version), task, _stem(ticker))
+        return base + '.parquet', base + '.json'
+
+    def current(self):
+        """The published version, or None before the first pass."""
+        try:
+            with open(os.path.join(self.root, 'CURRENT')) as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def manifest(self, version=None):
+        version = version or self.current()
+        if version is None:
+            return None
+        with open(os.path.join(self._dir(version), 'manifest.json')) as f:
+            return json.load(f)
+
+    def published(self, task, ticker):
+        """Meta of ticker's result in the published version (no frame read), or None."""
+        manifest = self.manifest()
+        return manifest['results'].get(task, {}).get(ticker) if manifest else None
+
+    @profiling.timed('precompute.get')
+    def get(self, task, ticker):
+        """(frame, meta) of ticker's result in the published version, or None."""
+        version = self.current()
+        if version is None:
+            return None
+        key = (version, task, ticker)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+        frame_path, meta_path = self._paths(version, task, ticker)
+        try:
+            frame = pd.read_parquet(frame_path)
+            with open(meta_path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            self._memory[key] = (frame, meta)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+        return frame, meta
+
+    def versions(self):
+        """Every version on disk, oldest first."""
+        folder = os.path.join(self.root, 'versions')
+        return sorted(os.listdir(folder)) if os.path.isdir(folder) else []
+
+    def begin(self):
+        """Create and return a new, unpublished version ('<sequence>-<UTC time>', so names sort by age)."""
+        versions = self.versions()
+        sequence = int(versions[-1].split('-', 1)[0]) + 1 if versions else 1
+        version = f"{sequence:06d}-{datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%dT%H%M%S')}"
+        os.makedirs(self._dir(version))
+        return version
+
+    def put(self, version, task, ticker, frame, meta):
+        frame_path, meta_path = self._paths(version, task, ticker)
+        os.makedirs(os.path.dirname(frame_path), exist_ok=True)
+        frame.to_parquet(frame_path + '.tmp', index=False)
+        os.replace(frame_path + '.tmp', frame_path)
+        with open(meta_path, 'w') as f:
+            json.dump(meta, f)
+
+    def publish(self, version, results, info=None):
+        """Make version current; results is {task: {ticker: meta}} of what it computed."""
+        previous = self.manifest()
+        if previous is not None:
+            # Carry over whatever this pass did not recompute
+            for task, entries in previous['results'].items():
+                for ticker, meta in entries.items():
+                    if ticker not in results.get(task, {}):
+                        for src, dst in zip(self._paths(previous['version'], task, ticker),
+                                            self._paths(version, task, ticker)):
+                            os.makedirs(os.path.dirname(dst), exist_ok=True)
+                            shutil.copy2(src, dst)
+                        results.setdefault(task, {})[ticker] = meta
+        manifest = {'version': version, 'published_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                    'results': results, **(info or {})}
+        with open(os.path.join(self._dir(version), 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        pointer = os.path.join(self.root, 'CURRENT')
+        with open(pointer + '.tmp', 'w') as f:
+            f.write(version)
+        os.replace(pointer + '.tmp', pointer)
+        self.prune()
+        return manifest
+
+    def prune(self):
+        versions, current = self.versions(), self.current()
+        for version in versions[:-self.keep_versions] if self.keep_versions else []:
+            if version != current:
+                shutil.rmtree(self._dir(version), ignore_errors=True)
+
+
+# --- SCHEDULER ---
+def next_run(now=None, settle_minutes=SETTLE_MINUTES):
+    """UTC time of the next pass: settle_minutes after the next weekday close."""
+    from pages.utils import data_store
+
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    settle, day = datetime.timedelta(minutes=settle_minutes), now
+    while True:
+        run = data_store.last_market_close(day) + settle
+        if run > now:
+            return run
+        day += datetime.timedelta(days=1)
+
+
+class Precompute:
+    """A worker pool running precompute passes over a watchlist.
+
+        with Precompute(tickers) as service:
+            service.run_once()      # or service.run_forever()
+    """
+
+    def __init__(self, tickers=None, tasks=TASKS, store=None, workers=None,
+                 search_method='grid', search_budget=60, job_timeout=None, log=print):
+        self.tickers = list(dict.fromkeys(tickers or default_watchlist()))
+        self.tasks = list(tasks)
+        self.store = store or get_store()
+        self.options = {'search_method': search_method, 'search_budget': search_budget}
+        self.workers = workers or parallel.default_workers(len(self.tickers) * len(self.tasks))
+        self.job_timeout = job_timeout or JOB_GRACE_SECONDS + JOB_BUDGET_FACTOR * search_budget
+        self.log = log
+        self._pool = None
+        self._inflight = {}
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def close(self):
+        self._stop.set()
+        self._terminate()
+
+    def _terminate(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+    def stop(self):
+        """Wake run_forever() and make it return."""
+        self._stop.set()
+
+    def _as_of(self, ticker):
+        from pages.utils import data_store
+
+        history = data_store.get_history(ticker)
+        return str(history.index[-1]) if len(history) else None
+
+    def due(self):
+        """Job keys (task, ticker, as_of) whose result is neither published nor in flight."""
+        keys = []
+        for ticker in self.tickers:
+            as_of = self._as_of(ticker)
+            if as_of is None:
+                continue
+            for task in self.tasks:
+                published = self.store.published(task, ticker)
+                key = (task, ticker, as_of)
+                if key not in self._inflight and not (published and published.get('as_of') == as_of):
+                    keys.append(key)
+        return keys
+
+    def submit(self, key):
+        """Queue one job on the pool; a key already in flight returns its pending result."""
+        if key not in self._inflight:
+            if self._pool is None:
+                self._pool = parallel.get_context().Pool(self.workers)
+            task, ticker, _ = key
+            self._inflight[key] = self._pool.apply_async(run_job, (task, ticker, self.options))
+        return self._inflight[key]
+
+    def run_once(self):
+        """Refresh prices, run every due job and publish a version; returns its manifest (None if nothing was due)."""
+        from pages.utils import data_store
+
+        started = time.monotonic()
+        prices = data_store.get_store()
+        prices.refresh_many(self.tickers)
+        for ticker in self.tickers:
+            if ticker in prices.errors:
+                self.log(f'{ticker}: price refresh failed, using stored bars ({prices.errors[ticker]})')
+        keys = self.due()
+        self.log(f'{len(self.tickers)} tickers x {len(self.tasks)} tasks, {len(keys)} due')
+        if not keys:
+            profiling.write_prometheus()
+            return None
+
+        version = self.store.begin()
+        pending = {key: self.submit(key) for key in keys}
+        # Queued jobs have not started yet, so the pass as a whole gets one job_timeout per round of workers
+        deadline = time.monotonic() + -(-len(keys) // self.workers) * self.job_timeout
+        results, failures, expired = {}, {}, False
+        for done, (key, pending_result) in enumerate(pending.items(), 1):
+            task, ticker, as_of = key
+            try:
+                _, _, frame, meta, error = pending_result.get(max(0.0, deadline - time.monotonic()))
+            except multiprocessing.TimeoutError:
+                frame, meta, error = None, None, f'no result within {self.job_timeout:g}s'
+                expired = True
+            finally:
+                self._inflight.pop(key, None)
+            if error:
+                failures.setdefault(ticker, {})[task] = error
+            else:
+                meta = {**meta, 'as_of': as_of, 'options': self.options}
+                self.store.put(version, task, ticker, frame, meta)
+                results.setdefault(task, {})[ticker] = meta
+            self.log(f'[{done}/{len(keys)}] {task} {ticker}' + (f' failed: {error}' if error else ''))
+
+        if expired:
+            # A hung job, or a worker the OOM killer took, never reports back: start over with a fresh pool
+            self._terminate()
+        manifest = self.store.publish(version, results, {'failures': failures,
+                                                         'seconds': round(time.monotonic() - started, 1)})
+        self.log(f'published {version}')
+        profiling.write_prometheus()
+        return manifest
+
+    def run_forever(self, settle_minutes=SETTLE_MINUTES):
+        """A pass now (to catch up on a missed close), then one after every close until stop()."""
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as exc:
+                self.log(f'pass failed: {type(exc).__name__}: {exc}')
+            run = next_run(settle_minutes=settle_minutes)
+            self.log(f'next pass at {run.isoformat()}')
+            self._stop.wait((run - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
+
+# --- READERS ---
+def describe(options):
+    return f"{options['search_method']} search, {options['search_budget']:g}s budget"
+
+
+def get_forecast(ticker, as_of, options=None):
+    """Published batch.forecast() frame for ticker, or None.
+
+    Only a result computed from bars up to as_of, and with the same options
+    (search_method, search_budget) when they are given, counts.
+    """
+    result = _store.get('forecast', ticker)
+    if result is None or result[1]['as_of'] != str(pd.Timestamp(as_of)):
+        return None
+    if options is not None and result[1].get('options') != options:
+        return None
+    return result[0]
+
+
+def load_indicators(ticker):
+    """Seed the indicator engine with ticker's published indicators; True if it has them now."""
+    from pages.utils import indicators as technical
+
+    engine = technical.get_engine()
+    if all(engine.has(ticker, name) for name in technical.INDICATORS):
+        return True
+    result = _store.get('indicators', ticker)
+    if result is None:
+        return False
+    frame, meta = result
+    index = pd.DatetimeIndex(frame['Date'], name='Date')
+    for name, indicator in technical.INDICATORS.items():
+        engine.seed(ticker, name, index, {c: frame[c].to_numpy(dtype=np.float64) for c in indicator.columns},
+                    meta['states'][name], meta['last_close'])
+    return True
+
+
+_store = ResultStore()
+
+
+def get_store():
+    return _store
+
+
+def set_store(store):
+    global _store
+    _store = store
+    return store
+
+
+def main(argv=None):
+    from pages.utils import batch
+
+    parser = argparse.ArgumentParser(prog='time-series-precompute', description=__doc__.split('\n\n')[0])
+    parser.add_argument('universe', nargs='?',
+                        help='ticker list or CSV, as for time-series-batch (default: $TS_WATCHLIST or '
+                             + ','.join(DEFAULT_WATCHLIST) + ')')
+    parser.add_argument('--tasks', default=','.join(TASKS), help='comma-separated subset of ' + ','.join(TASKS))
+    parser.add_argument('--workers', type=int, help='worker processes (default: one per core)')
+    parser.add_argument('--search', default='grid', choices=['grid', 'stepwise'], help='ARIMA order search')
+    parser.add_argument('--budget', type=float, default=60, help='order search budget per ticker (seconds)')
+    parser.add_argument('--job-timeout', type=float,
+                        help=f'seconds per job (default: {JOB_GRACE_SECONDS} + {JOB_BUDGET_FACTOR} x budget)')
+    parser.add_argument('--settle', type=float, default=SETTLE_MINUTES, help='minutes to wait after the close')
+    parser.add_argument('--once', action='store_true', help='run one pass and exit')
+    args = parser.parse_args(argv)
+
+    tasks = [t.strip() for t in args.tasks.split(',') if t.strip()]
+    unknown = set(tasks) - set(TASKS)
+    if unknown:
+        parser.error(f'unknown task(s): {", ".join(sorted(unknown))}')
+
+    tickers = batch.read_universe(args.universe) if args.universe else default_watchlist()
+    with Precompute(tickers, tasks, workers=args.workers, search_method=args.search,
+                    search_budget=args.budget, job_timeout=args.job_timeout) as service:
+        if args.once:
+            manifest = service.run_once()
+            return 1 if manifest and manifest['failures'] else 0
+        try:
+            service.run_forever(args.settle)
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
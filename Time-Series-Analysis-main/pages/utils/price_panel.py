@@ -0,0 +1,168 @@
+"""Compact price panel: one int64 trading-day index shared by a float value matrix.
+
+    panel = price_panel.from_frame(data_store.get_panel(tickers, start, end))
+    market = price_panel.from_frame(data_store.get_close('^GSPC', start, end, name='sp500'))
+    merged = panel.align(market, how='inner')
+
+Days are counted from 1970-01-01, so aligning two panels is integer set
+arithmetic plus one gather per side instead of a merge on Python date
+objects. Values are one C-contiguous (days x tickers) matrix, float64 or
+float32, with NaN where a ticker has no bar.
+
+capm_functions, rolling_stats and portfolio accept a PricePanel wherever they
+take a Date-plus-prices frame; to_frame() gives that frame back for charts.
+"""
+import numpy as np
+import pandas as pd
+
+ALIGN = ['inner', 'outer', 'ffill']
+
+
+def to_days(dates):
+    """int64 day numbers of dates (tz-aware dates count by their local calendar day)."""
+    index = pd.DatetimeIndex(dates)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.to_numpy().astype('datetime64[D]').astype(np.int64)
+
+
+def _gather(values, rows):
+    # rows == -1 marks a day with no bar; it becomes a NaN row
+    out = values[np.maximum(rows, 0)]
+    out[rows < 0] = np.nan
+    return out
+
+
+class PricePanel:
+    __slots__ = ('days', 'names', 'values')
+
+    def __init__(self, days, names, values):
+        self.days = np.asarray(days, dtype=np.int64)
+        self.names = list(names)
+        values = np.ascontiguousarray(values)
+        if values.dtype not in (np.float32, np.float64):
+            values = values.astype(np.float64)
+        self.values = values.reshape(len(self.days), len(self.names))
+
+    def __len__(self):
+        return len(self.days)
+
+    def __repr__(self):
+        return f'PricePanel({len(self.days)} days x {len(self.names)} tickers, {self.values.dtype})'
+
+    def __getitem__(self, name):
+        """Values of one ticker as a 1-D array."""
+        return self.values[:, self.names.index(name)]
+
+    @property
+    def empty(self):
+        return self.values.size == 0
+
+    @property
+    def nbytes(self):
+        return self.days.nbytes + self.values.nbytes
+
+    @property
+    def index(self):
+        return pd.DatetimeIndex(self.days.astype('datetime64[D]'), name='Date')
+
+    def with_values(self, values):
+        return PricePanel(self.days, self.names, values)
+
+    def select(self, names):
+        return PricePanel(self.days, names, self.values[:, [self.names.index(n) for n in names]])
+
+    def rename(self, mapping):
+        return PricePanel(self.days, [mapping.get(n, n) for n in self.names], self.values)
+
+    def astype(self, dtype):
+        return self.with_values(self.values.astype(dtype))
+
+    def dropna(self, how='any'):
+        """Drop days where any (or all) tickers lack a value."""
+        missing = np.isnan(self.values)
+        drop = missing.any(axis=1) if how == 'any' else missing.all(axis=1)
+        return PricePanel(self.days[~drop], self.names, self.values[~drop])
+
+    def ffill(self):
+        """Carry each ticker's last value over its gaps."""
+        valid = ~np.isnan(self.values)
+        rows = np.where(valid, np.arange(len(self.days))[:, None], -1)
+        np.maximum.accumulate(rows, axis=0, out=rows)
+        values = np.take_along_axis(self.values, np.maximum(rows, 0), axis=0)
+        # Leading gaps have nothing to carry forward
+        values[rows < 0] = np.nan
+        return self.with_values(values)
+
+    def slice(self, start=None, end=None):
+        """Days with start <= day < end (either bound optional)."""
+        lo = np.searchsorted(self.days, to_days([start])[0]) if start is not None else 0
+        hi = np.searchsorted(self.days, to_days([end])[0]) if end is not None else len(self.days)
+        return PricePanel(self.days[lo:hi], self.names, self.values[lo:hi])
+
+    def align(self, other, how='inner'):
+        """Join the tickers of two panels on a common calendar.
+
+        'inner' keeps days both have, 'outer' every day either has (NaN where
+        missing) and 'ffill' keeps this panel's calendar and gives other's
+        tickers their last valid value on or before each day (an as-of join, e.g.
+        stocks on the market's trading days).
+        """
+        if how == 'inner':
+            days, left, right = np.intersect1d(self.days, other.days, assume_unique=True, return_indices=True)
+        elif how == 'outer':
+            days = np.union1d(self.days, other.days)
+            left, right = _positions(self.days, days), _positions(other.days, days)
+        elif how == 'ffill':
+            days, left = self.days, np.arange(len(self.days))
+            right = np.searchsorted(other.days, days, side='right') - 1
+            other = other.ffill()
+        else:
+            raise ValueError(f'how must be one of {ALIGN}, not {how!r}')
+        dtype = np.result_type(self.values, other.values)
+        values = np.hstack([_gather(self.values.astype(dtype, copy=False), left),
+                            _gather(other.values.astype(dtype, copy=False), right)])
+        return PricePanel(days, self.names + other.names, values)
+
+    def to_frame(self, date_column=True):
+        """DataFrame with a leading 'Date' column (or a DatetimeIndex), one column per ticker."""
+        frame = pd.DataFrame(self.values, columns=self.names, copy=False)
+        if date_column:
+            frame.insert(0, 'Date', self.index)
+        else:
+            frame.index = self.index
+        return frame
+
+
+def _positions(days, target):
+    """Row of each target day in days, -1 where days lacks it."""
+    rows = np.searchsorted(days, target)
+    found = rows < len(days)
+    found[found] = days[rows[found]] == target[found]
+    return np.where(found, rows, -1)
+
+
+def from_frame(frame, dtype=np.float64):
+    """Panel of the numeric columns of frame, dated by its 'Date' column or its index."""
+    if 'Date' in frame.columns:
+        dates, frame = frame['Date'], frame.drop(columns='Date')
+    else:
+        dates = frame.index
+    numeric = frame.select_dtypes(include='number')
+    days = to_days(dates)
+    values = numeric.to_numpy(dtype=dtype, na_value=np.nan)
+    if len(days) and np.any(np.diff(days) <= 0):
+        # Sorted, one row per day (the last row wins)
+        order = np.argsort(days, kind='stable')
+        days, values = days[order], values[order]
+        keep = np.append(days[1:] != days[:-1], True)
+        days, values = days[keep], values[keep]
+    return PricePanel(days, numeric.columns, values)
+
+
+def join(panels, how='inner'):
+    """align() a list of panels left to right."""
+    result = panels[0]
+    for panel in panels[1:]:
+        result = result.align(panel, how)
+    return result
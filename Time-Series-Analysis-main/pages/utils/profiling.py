@@ -0,0 +1,270 @@
+"""Per-stage timings: spans grouped into one trace per page rerun.
+
+    with profiling.span('model.fit', order=str(order)):
+        ...
+
+    @profiling.timed('stationarity.differencing_order')
+    def differencing_order(...): ...
+
+Profiling is off unless TS_PROFILE=1 (or enable() is called). While off,
+span() hands back a shared no-op object and timed() wrappers make a single
+flag check, so instrumented code pays next to nothing.
+
+While on, each page starts a trace with start_trace() and finishes it with
+render_panel(), which draws the rerun as a waterfall in the sidebar. Every
+span also feeds a process-wide latency histogram, exported with
+prometheus_text(); finished traces are appended as JSON lines to
+TS_PROFILE_JSONL when that is set. Spans outside a trace (background
+threads, the batch CLI) only reach the histograms.
+
+With TS_PROFILE_PROM set, the histograms are also written to that file
+(atomically, for node_exporter's textfile collector) after every trace and
+at the end of each batch or precompute pass.
+"""
+import os
+import json
+import time
+import uuid
+import threading
+import functools
+import contextvars
+from collections import deque
+
+JSONL_PATH = os.environ.get('TS_PROFILE_JSONL')
+PROM_PATH = os.environ.get('TS_PROFILE_PROM')
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+MAX_TRACES = 50
+
+_enabled = os.environ.get('TS_PROFILE', '').lower() not in ('', '0', 'false')
+_current = contextvars.ContextVar('profiling_trace', default=None)
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+# --- SPANS ---
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    __slots__ = ('name', 'labels', 'trace', 'depth', 'start', 'duration')
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+        self.trace = None
+        self.depth = 0
+        self.start = self.duration = 0.0
+
+    def __enter__(self):
+        self.trace = _current.get()
+        if self.trace is not None:
+            self.depth = self.trace.depth
+            self.trace.depth += 1
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        if exc_type is not None:
+            self.labels['error'] = exc_type.__name__
+        if self.trace is not None:
+            self.trace.depth -= 1
+            self.trace.spans.append(self)
+        _histograms.observe(self.name, self.duration)
+        return False
+
+
+def span(name, **labels):
+    """Context manager timing one stage; a shared no-op when profiling is off."""
+    if not _enabled:
+        return _NULL_SPAN
+    return Span(name, labels)
+
+
+def timed(name=None):
+    """Decorator: run the function inside span(name or its qualified name)."""
+    def decorate(fn):
+        span_name = name or f'{fn.__module__.rsplit(".", 1)[-1]}.{fn.__qualname__}'
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with Span(span_name, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# --- TRACES ---
+class Trace:
+    def __init__(self, page):
+        self.id = uuid.uuid4().hex[:12]
+        self.page = page
+        self.timestamp = time.time()
+        self.started = time.perf_counter()
+        self.finished = None
+        self.spans = []
+        self.depth = 0
+
+    @property
+    def seconds(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    def records(self):
+        """One dict per span, in start order, with times in ms from the trace start."""
+        return [{'trace': self.id, 'page': self.page, 'timestamp': self.timestamp, 'span': s.name,
+                 'depth': s.depth, 'start_ms': (s.start - self.started) * 1e3,
+                 'duration_ms': s.duration * 1e3, 'labels': s.labels}
+                for s in sorted(self.spans, key=lambda s: s.start)]
+
+
+_recent = deque(maxlen=MAX_TRACES)
+_recent_lock = threading.Lock()
+
+
+def start_trace(page):
+    """Begin the trace for this rerun of page (None when profiling is off)."""
+    if not _enabled:
+        return None
+    trace = Trace(page)
+    _current.set(trace)
+    return trace
+
+
+def finish_trace():
+    """End the current trace, keep it in recent_traces() and write it to the JSONL file."""
+    trace = _current.get()
+    if trace is None:
+        return None
+    _current.set(None)
+    trace.finished = time.perf_counter()
+    _histograms.observe(f'page.{trace.page}', trace.seconds)
+    with _recent_lock:
+        _recent.append(trace)
+    if JSONL_PATH:
+        with open(JSONL_PATH, 'a') as f:
+            f.write(jsonl([trace]))
+    write_prometheus()
+    return trace
+
+
+def recent_traces():
+    with _recent_lock:
+        return list(_recent)
+
+
+def jsonl(traces=None):
+    """Spans of traces (default: the recent ones) as JSON lines."""
+    traces = recent_traces() if traces is None else traces
+    return ''.join(json.dumps(record, default=str) + '\n' for t in traces for record in t.records())
+
+
+# --- PROMETHEUS ---
+class Histograms:
+    """Cumulative latency histograms per span name, in Prometheus' layout."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds):
+        with self._lock:
+            series = self._series.get(name)
+            if series is None:
+                series = self._series[name] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0}
+            i = 0
+            while i < len(self.buckets) and seconds > self.buckets[i]:
+                i += 1
+            series['counts'][i] += 1
+            series['sum'] += seconds
+
+    def text(self, metric='ts_span_duration_seconds'):
+        lines = [f'# HELP {metric} Duration of instrumented stages.', f'# TYPE {metric} histogram']
+        with self._lock:
+            for name, series in sorted(self._series.items()):
+                label = name.replace('\\', '\\\\').replace('"', '\\"')
+                cumulative = 0
+                for bound, count in zip([*map(str, self.buckets), '+Inf'], series['counts']):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{span="{label}",le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_sum{{span="{label}"}} {series["sum"]:.6f}')
+                lines.append(f'{metric}_count{{span="{label}"}} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+
+_histograms = Histograms()
+
+
+def prometheus_text():
+    return _histograms.text()
+
+
+def write_prometheus(path=None):
+    """Write prometheus_text() to path (default TS_PROFILE_PROM); no-op when profiling is off or no path is set."""
+    path = path or PROM_PATH
+    if not (_enabled and path):
+        return None
+    # Written beside the target and renamed over it, so a scrape never reads half a file
+    tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp, 'w') as f:
+        f.write(prometheus_text())
+    os.replace(tmp, path)
+    return path
+
+
+# --- PANEL ---
+def waterfall(trace):
+    import plotly.graph_objects as go
+    from pages.utils.plotly_figure import apply_dark_theme
+
+    records = trace.records()
+    labels = [f"{'  ' * r['depth']}{r['span']}" for r in records]
+    fig = go.Figure(go.Bar(
+        y=labels, x=[r['duration_ms'] for r in records], base=[r['start_ms'] for r in records],
+        orientation='h', marker_color=['#ff1744' if 'error' in r['labels'] else '#00e676' for r in records],
+        hovertemplate='%{y}<br>%{x:.1f} ms<extra></extra>',
+    ))
+    fig = apply_dark_theme(fig)
+    fig.update_yaxes(autorange='reversed', showgrid=False)
+    fig.update_layout(height=max(200, 22 * len(records) + 60), xaxis_title='ms since rerun start')
+    return fig
+
+
+def render_panel():
+    """Finish the current trace and show it in the sidebar (no-op when profiling is off)."""
+    trace = finish_trace()
+    if trace is None:
+        return
+    import streamlit as st
+
+    with st.sidebar.expander(f'⏱️ Performance: {trace.seconds * 1e3:.0f} ms', expanded=False):
+        if trace.spans:
+            st.plotly_chart(waterfall(trace), use_container_width=True)
+        else:
+            st.caption('No instrumented stages ran.')
+        st.download_button('Timings (JSON lines)', jsonl(), file_name='timings.jsonl')
+        st.download_button('Metrics (Prometheus)', prometheus_text(), file_name='metrics.prom')
@@ -0,0 +1,177 @@
+"""Rolling risk statistics for a whole return panel and several windows at once.
+
+Every function takes the daily_return() frame or PricePanel from
+capm_functions (percent returns, optional leading 'Date' column) and returns
+a frame indexed by date with (Window, Stock) columns. Window sums and
+drawdown peaks are both computed in blocks of the window length (prefix and
+suffix sums, or maxima, within each block), so the cost is linear in series
+length whatever the window size, and rounding does not grow with it.
+"""
+import numpy as np
+import pandas as pd
+from pages.utils.price_panel import PricePanel
+
+DEFAULT_WINDOWS = (63, 126, 252)
+
+
+def _split(stocks_daily_return, market=None):
+    df = stocks_daily_return
+    if isinstance(df, PricePanel):
+        assets = [c for c in df.names if c != market]
+        m = df[market].astype(np.float64) if market else None
+        return df.index, assets, df.select(assets).values.astype(np.float64), m
+    index = pd.Index(df['Date']) if 'Date' in df.columns else df.index
+    numeric = df.select_dtypes(include='number')
+    assets = [c for c in numeric.columns if c != market]
+    x = numeric[assets].to_numpy(dtype=np.float64)
+    m = numeric[market].to_numpy(dtype=np.float64) if market else None
+    return index, assets, x, m
+
+
+def _blocks(a, window, fill=0.0):
+    # Rows padded to whole blocks, as (blocks, window, columns)
+    pad = (-len(a)) % window
+    return np.vstack([a, np.full((pad, a.shape[1]), fill)]).reshape(-1, window, a.shape[1])
+
+
+def _anchored(a, window):
+    """(own, prev): every row minus the first row of its own block, and of the block before.
+
+    A trailing window covers the end of one block and the start of the next,
+    so its rows from own plus its rows from prev all share one anchor, the
+    first row of the block it starts in. Sums of squares and products then
+    stay near the window's own spread, however high or drifting the series.
+    """
+    block = np.arange(len(a)) // window
+    first = a[::window]
+    return a - first[block], a - first[np.maximum(block - 1, 0)]
+
+
+def _anchor(a, window):
+    # The anchor _window_sums() used for the window ending at each row
+    return a[np.maximum(np.arange(len(a)) // window - 1, 0) * window]
+
+
+def _window_sums(own, prev, window):
+    """Sum of the trailing `window` rows at every row; NaN until the window fills.
+
+    Rows of the block where the window starts come from own (a suffix sum),
+    rows of the block where it ends from prev (a prefix sum), so every
+    partial sum spans at most `window` rows.
+    """
+    n, cols = own.shape
+    out = np.full(own.shape, np.nan)
+    if window > n:
+        return out
+    suffix = np.cumsum(_blocks(own, window)[:, ::-1], axis=1)[:, ::-1].reshape(-1, cols)
+    prefix = np.cumsum(_blocks(prev, window), axis=1).reshape(-1, cols)
+    end = np.arange(window - 1, n)
+    # A window that is exactly one block is all prefix
+    whole = (end % window == window - 1)[:, None]
+    out[window - 1:] = np.where(whole, prefix[end], suffix[end - window + 1] + prefix[end])
+    return out
+
+
+def _sliding_max(a, window):
+    """Trailing-window maximum per column (van Herk/Gil-Werman, O(n) for any window)."""
+    n, cols = a.shape
+    out = np.full(a.shape, np.nan)
+    if window > n:
+        return out
+    blocks = _blocks(a, window, -np.inf)
+    prefix = np.maximum.accumulate(blocks, axis=1).reshape(-1, cols)
+    suffix = np.maximum.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].reshape(-1, cols)
+    end = np.arange(window - 1, n)
+    out[window - 1:] = np.maximum(suffix[end - window + 1], prefix[end])
+    return out
+
+
+def _frame(index, assets, results):
+    columns = pd.MultiIndex.from_tuples(
+        [(w, a) for w in results for a in assets], names=['Window', 'Stock'])
+    data = np.hstack([results[w] for w in results]) if results else np.empty((len(index), 0))
+    return pd.DataFrame(data, index=index, columns=columns)
+
+
+def _moments(x, window):
+    """Trailing-window mean and (population) variance of every column."""
+    own, prev = _anchored(x, window)
+    shifted = _window_sums(own, prev, window) / window
+    var = _window_sums(own * own, prev * prev, window) / window - shifted ** 2
+    return shifted + _anchor(x, window), np.clip(var, 0, None)
+
+
+def _covariance(x, m, window):
+    """Trailing-window (population) covariance of every column of x with m."""
+    x_own, x_prev = _anchored(x, window)
+    m_own, m_prev = _anchored(m, window)
+    return (_window_sums(x_own * m_own, x_prev * m_prev, window) / window
+            - _window_sums(x_own, x_prev, window) / window * _window_sums(m_own, m_prev, window) / window)
+
+
+def rolling_beta(stocks_daily_return, windows=DEFAULT_WINDOWS, market='sp500'):
+    index, assets, x, m = _split(stocks_daily_return, market)
+    m = m[:, None]
+    results = {}
+    for w in windows:
+        _, m_var = _moments(m, w)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            results[w] = _covariance(x, m, w) / m_var
+    return _frame(index, assets, results)
+
+
+def rolling_correlation(stocks_daily_return, windows=DEFAULT_WINDOWS, market='sp500'):
+    index, assets, x, m = _split(stocks_daily_return, market)
+    m = m[:, None]
+    results = {}
+    for w in windows:
+        _, m_var = _moments(m, w)
+        _, x_var = _moments(x, w)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            results[w] = _covariance(x, m, w) / np.sqrt(m_var * x_var)
+    return _frame(index, assets, results)
+
+
+def rolling_volatility(stocks_daily_return, windows=DEFAULT_WINDOWS, periods=252):
+    """Annualized volatility in the same percent units as the returns."""
+    index, assets, x, _ = _split(stocks_daily_return)
+    results = {}
+    for w in windows:
+        _, var = _moments(x, w)
+        results[w] = np.sqrt(var * w / max(w - 1, 1) * periods)
+    return _frame(index, assets, results)
+
+
+def rolling_sharpe(stocks_daily_return, windows=DEFAULT_WINDOWS, rf=0, periods=252):
+    """Annualized Sharpe ratio; rf is an annual rate in percent, like the returns."""
+    index, assets, x, _ = _split(stocks_daily_return)
+    excess = x - rf / periods
+    results = {}
+    for w in windows:
+        mean, var = _moments(excess, w)
+        std = np.sqrt(var * w / max(w - 1, 1))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            results[w] = mean / std * np.sqrt(periods)
+    return _frame(index, assets, results)
+
+
+def _wealth(x):
+    return np.cumprod(1 + x / 100, axis=0)
+
+
+def drawdown(stocks_daily_return):
+    """Drawdown from the running peak, as a fraction (e.g. -0.25 for 25% below peak)."""
+    index, assets, x, _ = _split(stocks_daily_return)
+    wealth = _wealth(x)
+    return pd.DataFrame(wealth / np.maximum.accumulate(wealth, axis=0) - 1, index=index, columns=assets)
+
+
+def max_drawdown(stocks_daily_return):
+    return drawdown(stocks_daily_return).min().rename('Max Drawdown')
+
+
+def rolling_drawdown(stocks_daily_return, windows=DEFAULT_WINDOWS):
+    """Drawdown from the highest value inside each trailing window."""
+    index, assets, x, _ = _split(stocks_daily_return)
+    wealth = _wealth(x)
+    return _frame(index, assets, {w: wealth / _sliding_max(wealth, w) - 1 for w in windows})
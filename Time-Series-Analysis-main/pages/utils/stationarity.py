@@ -0,0 +1,206 @@
+"""Memoized stationarity tests and differencing-order selection.
+
+ADF and KPSS p-values are remembered per series fingerprint, one record
+holding both tests at every differencing order computed so far, so a history
+that has been tested once is never re-tested. The records live in memory and
+in one append-only JSON-lines file. differencing_orders() answers a whole
+panel at once and sends only the cache misses to a process pool.
+"""
+import os
+import json
+import threading
+import warnings
+import numpy as np
+import pandas as pd
+from pages.utils import model_cache, parallel, profiling
+from pages.utils.data_store import DATA_DIR
+
+ALPHA = 0.05
+# The original loop had no bound; real price series never need more than 2
+MAX_DIFFERENCING = 5
+MAX_SERIES = 10000
+
+
+class PValueLog:
+    """{fingerprint: {test: {order: p-value}}}, kept in memory and appended to one file.
+
+    Each line adds p-values for one series. The file is replayed on first use
+    and rewritten with the newest max_series series once it holds twice that
+    many lines; a write racing that rewrite can be lost, which only costs a
+    recomputation.
+    """
+
+    def __init__(self, path, max_series=MAX_SERIES):
+        self.path = path
+        self.max_series = max_series
+        self._records = None
+        self._lines = 0
+        self._lock = threading.Lock()
+
+    def _replay(self):
+        records, lines = {}, 0
+        try:
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        fingerprint, tests = json.loads(line)
+                    except ValueError:
+                        continue  # torn by an interrupted write
+                    lines += 1
+                    _merge(records, fingerprint, {t: {int(o): p for o, p in v.items()} for t, v in tests.items()})
+        except FileNotFoundError:
+            pass
+        return records, lines
+
+    def _loaded(self):
+        if self._records is None:
+            self._records, self._lines = self._replay()
+        return self._records
+
+    def get(self, fingerprint, test):
+        """{order: p-value} of test known for the series."""
+        with self._lock:
+            return dict(self._loaded().get(fingerprint, {}).get(test, {}))
+
+    def add(self, entries):
+        """Remember {fingerprint: {test: {order: p-value}}}."""
+        entries = {fp: tests for fp, tests in entries.items() if any(tests.values())}
+        if not entries:
+            return
+        with self._lock:
+            records = self._loaded()
+            for fingerprint, tests in entries.items():
+                _merge(records, fingerprint, tests)
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, 'a') as f:
+                f.write(''.join(json.dumps([fp, tests]) + '\n' for fp, tests in entries.items()))
+            self._lines += len(entries)
+            if self._lines > 2 * self.max_series:
+                self._compact()
+
+    def _compact(self):
+        # Replay first to keep what other processes appended since we loaded
+        records, _ = self._replay()
+        records = dict(list(records.items())[-self.max_series:])
+        tmp = f'{self.path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp, 'w') as f:
+            f.write(''.join(json.dumps([fp, tests]) + '\n' for fp, tests in records.items()))
+        os.replace(tmp, self.path)
+        self._records, self._lines = records, len(records)
+
+    def clear(self):
+        with self._lock:
+            self._records, self._lines = {}, 0
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+
+def _merge(records, fingerprint, tests):
+    # Re-inserted, so the most recently written series come last
+    record = records.pop(fingerprint, {})
+    for test, values in tests.items():
+        record.setdefault(test, {}).update(values)
+    records[fingerprint] = record
+
+
+_log = PValueLog(os.path.join(DATA_DIR, 'stationarity.jsonl'))
+
+
+def _values(series):
+    values = np.asarray(series, dtype=np.float64).ravel()
+    return values[~np.isnan(values)]
+
+
+def _pvalue(values, test):
+    from statsmodels.tsa.stattools import adfuller, kpss
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        if test == 'kpss':
+            return kpss(values, regression='c', nlags='auto')[1]
+        return adfuller(values)[1]
+
+
+def _is_stationary(p_value, test, alpha):
+    # ADF's null is a unit root, KPSS's null is stationarity
+    return p_value >= alpha if test == 'kpss' else p_value <= alpha
+
+
+def pvalue(series, order=0, test='adf'):
+    """p-value of `test` on the series differenced `order` times (cached)."""
+    values = _values(series)
+    fingerprint = model_cache.fingerprint(values)
+    known = _log.get(fingerprint, test)
+    if order not in known:
+        known[order] = _pvalue(np.diff(values, n=order), test)
+        _log.add({fingerprint: {test: {order: known[order]}}})
+    return known[order]
+
+
+def _search(values, test, alpha, max_order, known):
+    """Differencing order plus every p-value computed on the way (order -> p-value)."""
+    computed = {}
+    for order in range(max_order + 1):
+        p_value = known.get(order)
+        if p_value is None:
+            p_value = computed[order] = _pvalue(np.diff(values, n=order), test)
+        # p-values are rounded like model_train.stationary_check always did
+        if _is_stationary(round(p_value, 3), test, alpha):
+            return order, computed
+    return max_order, computed
+
+
+def _known(fingerprint, test, max_order):
+    # Only the orders from 0 up without a gap can settle the search
+    stored, known = _log.get(fingerprint, test), {}
+    for order in range(max_order + 1):
+        if order not in stored:
+            break
+        known[order] = stored[order]
+    return known
+
+
+@profiling.timed('stationarity.differencing_order')
+def differencing_order(series, test='adf', alpha=ALPHA, max_order=MAX_DIFFERENCING):
+    """Smallest number of differences after which `test` calls the series stationary."""
+    values = _values(series)
+    fingerprint = model_cache.fingerprint(values)
+    order, computed = _search(values, test, alpha, max_order, _known(fingerprint, test, max_order))
+    _log.add({fingerprint: {test: computed}})
+    return order
+
+
+@profiling.timed('stationarity.differencing_orders')
+def differencing_orders(panel, test='adf', alpha=ALPHA, max_order=MAX_DIFFERENCING, workers=None):
+    """Differencing order for every column of a wide price panel, as a Series.
+
+    Columns are tested on their own non-missing values; only histories that
+    are not fully answered by the cache are sent to the worker pool.
+    """
+    results, misses = {}, []
+    for column in panel.columns:
+        values = _values(panel[column])
+        fingerprint = model_cache.fingerprint(values)
+        known = _known(fingerprint, test, max_order)
+        hit = next((o for o, p in known.items() if _is_stationary(round(p, 3), test, alpha)), None)
+        if hit is not None:
+            results[column] = hit
+        else:
+            misses.append((column, values, fingerprint, known))
+
+    workers = workers or parallel.default_workers(len(misses))
+    args = [(values, test, alpha, max_order, known) for _, values, _, known in misses]
+    if workers > 1 and len(misses) > 1:
+        with parallel.get_context().Pool(workers) as pool:
+            outputs = pool.starmap(_search, args)
+    else:
+        outputs = [_search(*a) for a in args]
+
+    new_entries = {}
+    for (column, _, fingerprint, _), (order, computed) in zip(misses, outputs):
+        results[column] = order
+        new_entries[fingerprint] = {test: computed}
+    _log.add(new_entries)
+    return pd.Series(results, name='differencing_order').reindex(panel.columns)
@@ -0,0 +1,45 @@
+"""Timeframe slicing for the chart buttons, by binary search on a sorted index.
+
+slice_period() returns a positional slice of the caller's frame (a view, not
+a copy) and never modifies its index, timezone included.
+"""
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+# Same look-back as the page buttons; 'ytd' and 'max' are handled separately
+PERIODS = {
+    '1d': relativedelta(days=1),
+    '5d': relativedelta(days=5),
+    '1mo': relativedelta(months=1),
+    '3mo': relativedelta(months=3),
+    '6mo': relativedelta(months=6),
+    '1y': relativedelta(years=1),
+    '2y': relativedelta(years=2),
+    '5y': relativedelta(years=5),
+    '10y': relativedelta(years=10),
+}
+
+
+def period_start(index, num_period):
+    """Exclusive lower bound of the timeframe: bars strictly after it are shown.
+
+    Returns None for 'max' and unknown periods (the whole index).
+    """
+    if not len(index):
+        return None
+    last = index[-1]
+    if num_period in PERIODS:
+        return last - PERIODS[num_period]
+    if num_period == 'ytd':
+        return pd.Timestamp(year=last.year, month=1, day=1, tz=getattr(index, 'tz', None))
+    return None
+
+
+def period_position(index, num_period):
+    """Position of the first bar inside the timeframe."""
+    start = period_start(index, num_period)
+    return 0 if start is None else int(index.searchsorted(start, side='right'))
+
+
+def slice_period(dataframe, num_period):
+    return dataframe.iloc[period_position(dataframe.index, num_period):]
@@ -0,0 +1,129 @@
+"""Forecast a watchlist on worker processes, reporting each ticker as it finishes.
+
+    with Watchlist(['AAPL', 'MSFT'], timeout=120) as run:
+        for event in run.events():
+            ...
+
+Every worker is a long-lived process with its own pipe, fed one ticker at a
+time, so a ticker that overruns its timeout is stopped by terminating just
+that worker (a fresh one takes its place) without touching the others.
+Leaving the with-block, e.g. when Streamlit interrupts the script because the
+input changed, terminates every worker.
+
+events() yields dicts with 'event' set to:
+
+- 'progress': nothing finished during the last poll ('running', 'done', 'total');
+- 'done': 'ticker' and 'forecast' (the batch.forecast() frame);
+- 'failed': 'ticker' and 'error';
+- 'timeout': 'ticker', stopped after the timeout.
+
+Progress events keep a Streamlit page calling into st while it waits, which
+is what lets it notice a rerun request and stop.
+"""
+import time
+from collections import deque
+from multiprocessing.connection import wait
+from pages.utils import parallel
+
+TIMEOUT_SECONDS = 180
+POLL_SECONDS = 0.5
+
+
+def _serve(conn):
+    from pages.utils import batch
+
+    for ticker, options in iter(conn.recv, None):
+        try:
+            frame = batch.forecast(ticker, options['search_method'], options['search_budget'])
+            conn.send((ticker, frame, None))
+        except Exception as exc:
+            conn.send((ticker, None, f'{type(exc).__name__}: {exc}'))
+
+
+class _Worker:
+    def __init__(self, context):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_serve, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+        self.ticker = None
+        self.started = None
+
+    def submit(self, ticker, options):
+        self.ticker, self.started = ticker, time.monotonic()
+        self.conn.send((ticker, options))
+
+    def stop(self):
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join()
+        self.conn.close()
+
+
+class Watchlist:
+    def __init__(self, tickers, search_method='grid', search_budget=60, workers=None, timeout=TIMEOUT_SECONDS):
+        self.tickers = list(dict.fromkeys(tickers))
+        self.options = {'search_method': search_method, 'search_budget': search_budget}
+        self.workers = workers or parallel.default_workers(len(self.tickers))
+        self.timeout = timeout
+        self._context = parallel.get_context()
+        self._active = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cancel()
+        return False
+
+    def cancel(self):
+        """Stop every worker; tickers still running are abandoned."""
+        while self._active:
+            self._active.pop().stop()
+
+    def events(self):
+        queue = deque(self.tickers)
+        idle, done = [], 0
+        try:
+            while queue or any(w.ticker for w in self._active):
+                while queue and (idle or len(self._active) < self.workers):
+                    if not idle:
+                        worker = _Worker(self._context)
+                        self._active.append(worker)
+                        idle.append(worker)
+                    idle.pop().submit(queue.popleft(), self.options)
+
+                busy = [w for w in self._active if w.ticker]
+                ready = wait([w.conn for w in busy], timeout=POLL_SECONDS)
+                finished = []
+                for worker in busy:
+                    if worker.conn in ready:
+                        try:
+                            ticker, frame, error = worker.conn.recv()
+                        except EOFError:
+                            ticker, frame, error = worker.ticker, None, 'worker process exited'
+                            self._replace(worker)
+                        else:
+                            idle.append(worker)
+                        finished.append({'event': 'failed', 'ticker': ticker, 'error': error} if error else
+                                        {'event': 'done', 'ticker': ticker, 'forecast': frame})
+                    elif time.monotonic() - worker.started > self.timeout:
+                        finished.append({'event': 'timeout', 'ticker': worker.ticker})
+                        self._replace(worker)
+                    else:
+                        continue
+                    worker.ticker = None
+
+                for event in finished:
+                    done += 1
+                    yield event
+                if not finished:
+                    yield {'event': 'progress', 'running': [w.ticker for w in self._active if w.ticker],
+                           'done': done, 'total': len(self.tickers)}
+        finally:
+            self.cancel()
+
+    def _replace(self, worker):
+        # The worker is dropped; the next submit starts a new one if there is work left
+        worker.stop()
+        self._active.remove(worker)
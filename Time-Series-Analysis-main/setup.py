@@ -1,22 +1,21 @@
-from setuptools import find_packages,setup
-from typing import List
+from setuptools import setup
 
-def get_requirements()->List[str]:
-    """
-    This function will return list of requirements
-    """
-    requirement_list:List[str] = []
-
-    """
-    Write a code to read requirements.txt file and append each requirements in requirement_list variable.
-    """
-    return requirement_list
+# What the batch and precompute CLIs import; the Streamlit app's own list is in requirements.txt
+INSTALL_REQUIRES = [
+    'pandas', 'numpy', 'scipy', 'statsmodels', 'scikit-learn', 'yfinance', 'requests',
+    'pyarrow', 'plotly', 'python-dateutil',
+]
 
 setup(
     name="time_series",
     version="0.0.1",
     author="ayushi",
     author_email="techclasses0810@gmail.com",
-    packages = find_packages(),
-    install_requires=get_requirements(),
+    # Only the helpers the CLIs need: the Streamlit pages themselves are not importable modules
+    packages = ['pages.utils'],
+    install_requires=INSTALL_REQUIRES,
+    entry_points={
+        'console_scripts': ['time-series-batch=pages.utils.batch:main',
+                            'time-series-precompute=pages.utils.precompute:main'],
+    },
 )
\ No newline at end of file
@@ -0,0 +1,8 @@
+import os
+import sys
+import tempfile
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+# Stores default to DATA_DIR at import time; keep the tests away from the user's cache
+os.environ.setdefault('TS_DATA_DIR', tempfile.mkdtemp(prefix='time-series-tests-'))
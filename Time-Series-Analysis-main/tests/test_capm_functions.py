@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pages.utils import capm_functions, price_panel
+
+STOCKS = ['AAA', 'BBB', 'CCC']
+
+
+@pytest.fixture
+def prices():
+    rng = np.random.default_rng(0)
+    n = 500
+    market = rng.normal(0.0004, 0.01, n)
+    frame = {'Date': pd.bdate_range('2022-01-03', periods=n)}
+    for beta, stock in zip([0.5, 1.0, 1.8], STOCKS):
+        frame[stock] = 50 * np.cumprod(1 + beta * market + rng.normal(0, 0.01, n))
+    frame['sp500'] = 4000 * np.cumprod(1 + market)
+    return pd.DataFrame(frame)
+
+
+def per_stock(returns):
+    rows = {}
+    for stock in STOCKS:
+        beta, alpha = capm_functions.calculate_beta(returns, stock)
+        fit_beta, fit_alpha = np.polyfit(returns['sp500'], returns[stock], 1)
+        assert (beta, alpha) == (fit_beta, fit_alpha)
+        r2 = np.corrcoef(returns['sp500'], returns[stock])[0, 1] ** 2
+        rows[stock] = {'Beta': beta, 'Alpha': alpha, 'R2': r2,
+                       'Expected Return': beta * returns['sp500'].mean() * 252}
+    return pd.DataFrame.from_dict(rows, orient='index')
+
+
+def test_frame_matches_per_stock_regressions(prices):
+    returns = capm_functions.daily_return(prices)
+    stats = capm_functions.capm_stats(returns)
+    expected = per_stock(returns)
+    assert stats.index.tolist() == STOCKS
+    np.testing.assert_allclose(stats[expected.columns].to_numpy(), expected.to_numpy(), rtol=1e-9, atol=1e-12)
+
+
+@pytest.mark.parametrize('dtype, rtol', [(np.float64, 1e-9), (np.float32, 1e-4)])
+def test_panel_matches_per_stock_regressions(prices, dtype, rtol):
+    panel = price_panel.from_frame(prices, dtype=dtype)
+    stats = capm_functions.capm_stats(capm_functions.daily_return(panel))
+    expected = per_stock(capm_functions.daily_return(prices))
+    assert stats.index.tolist() == STOCKS
+    np.testing.assert_allclose(stats[expected.columns].to_numpy(), expected.to_numpy(), rtol=rtol, atol=1e-6)
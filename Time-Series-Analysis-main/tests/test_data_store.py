@@ -0,0 +1,166 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from pages.utils import data_store
+
+
+def make_bars(periods, start='2023-01-02', seed=0):
+    index = pd.bdate_range(start, periods=periods, name='Date')
+    close = 100 + np.cumsum(np.random.default_rng(seed).normal(size=periods))
+    return pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close,
+                         'Volume': np.full(periods, 1e6)}, index=index)
+
+
+def make_stale(store, ticker):
+    """Pretend the stored bars were last checked long before the latest close."""
+    _, meta_path = store._paths(ticker)
+    with open(meta_path) as f:
+        meta = json.load(f)
+    meta['checked_at'] = '2000-01-03T00:00:00+00:00'
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f)
+
+
+@pytest.fixture
+def history():
+    return make_bars(300)
+
+
+def new_store(tmp_path, provider):
+    # A fresh PriceStore starts without in-memory metadata, so it reads the files again
+    return data_store.PriceStore(str(tmp_path), provider)
+
+
+def test_first_request_fetches_full_history(tmp_path, history):
+    provider = data_store.FixtureProvider({'AAA': history})
+    bars = new_store(tmp_path, provider).get_history('AAA')
+    assert provider.calls == [('AAA', None)]
+    pd.testing.assert_frame_equal(bars, data_store.normalize_bars(history), check_freq=False)
+
+
+def test_fresh_store_skips_the_provider(tmp_path, history):
+    provider = data_store.FixtureProvider({'AAA': history})
+    new_store(tmp_path, provider).refresh('AAA')
+    new_store(tmp_path, provider).refresh('AAA')
+    assert provider.calls == [('AAA', None)]
+
+
+def test_stale_store_tops_up_only_new_bars(tmp_path, history):
+    provider = data_store.FixtureProvider({'AAA': history.iloc[:-10]})
+    new_store(tmp_path, provider).refresh('AAA')
+    make_stale(new_store(tmp_path, provider), 'AAA')
+
+    provider.frames['AAA'] = data_store.normalize_bars(history)
+    bars = new_store(tmp_path, provider).refresh('AAA')
+    # The last stored bar is asked for again, to detect adjustments
+    assert provider.calls == [('AAA', None), ('AAA', history.index[-11])]
+    assert len(bars) == len(history)
+    assert bars.index[-1] == history.index[-1]
+
+
+def test_adjusted_last_bar_triggers_full_refetch(tmp_path, history):
+    provider = data_store.FixtureProvider({'AAA': history.iloc[:-10]})
+    new_store(tmp_path, provider).refresh('AAA')
+    make_stale(new_store(tmp_path, provider), 'AAA')
+
+    # A 2:1 split re-adjusts every bar, including the stored ones
+    adjusted = history.copy()
+    adjusted[['Open', 'High', 'Low', 'Close']] /= 2
+    provider.frames['AAA'] = data_store.normalize_bars(adjusted)
+    bars = new_store(tmp_path, provider).refresh('AAA')
+    assert provider.calls == [('AAA', None), ('AAA', history.index[-11]), ('AAA', None)]
+    np.testing.assert_allclose(bars['Close'].to_numpy(), adjusted['Close'].to_numpy())
+
+
+def test_refresh_many_uses_at_most_two_provider_calls(tmp_path):
+    frames = {t: make_bars(200, seed=i) for i, t in enumerate(['AAA', 'BBB', 'CCC', 'DDD', 'EEE'])}
+    provider = data_store.FixtureProvider({t: frames[t].iloc[:-5] for t in ['AAA', 'BBB']})
+    new_store(tmp_path, provider).refresh_many(['AAA', 'BBB'])
+    for t in ['AAA', 'BBB']:
+        make_stale(new_store(tmp_path, provider), t)
+    provider.frames = {t: data_store.normalize_bars(f) for t, f in frames.items()}
+    provider.calls.clear()
+
+    bars = new_store(tmp_path, provider).refresh_many(list(frames))
+    assert len(provider.calls) == 2
+    assert (('CCC', 'DDD', 'EEE'), None) in provider.calls
+    assert sorted(bars) == sorted(frames)
+    assert all(len(bars[t]) == 200 for t in frames)
+
+
+class Unreachable(data_store.FixtureProvider):
+    def __init__(self, frames):
+        super().__init__(frames)
+        self.down = False
+
+    def fetch_many(self, tickers, start=None):
+        if self.down:
+            self.calls.append((tuple(tickers), start))
+            raise ConnectionError('provider unreachable')
+        return super().fetch_many(tickers, start)
+
+
+def test_refresh_many_falls_back_when_the_provider_fails(tmp_path, history):
+    provider = Unreachable({'AAA': history.iloc[:-10]})
+    new_store(tmp_path, provider).refresh_many(['AAA'])
+    make_stale(new_store(tmp_path, provider), 'AAA')
+    provider.frames['BBB'] = data_store.normalize_bars(history)
+
+    provider.down = True
+    store = new_store(tmp_path, provider)
+    bars = store.refresh_many(['AAA', 'BBB'])
+    # Both the first fetch of BBB and the top-up of AAA failed
+    assert len(provider.calls) == 3
+    assert sorted(bars) == ['AAA']
+    assert len(bars['AAA']) == len(history) - 10
+    assert sorted(store.errors) == ['AAA', 'BBB']
+    assert store.errors['BBB'] == 'ConnectionError: provider unreachable'
+
+    provider.down = False
+    bars = store.refresh_many(['AAA', 'BBB'])
+    assert sorted(bars) == ['AAA', 'BBB']
+    assert store.errors == {}
+
+
+class FailingRefetch(data_store.FixtureProvider):
+    """Tops up fine, but the full refetch after an adjustment fails."""
+
+    def fetch(self, ticker, start=None):
+        if start is None and self.calls:
+            self.calls.append((ticker, start))
+            raise ConnectionError('provider unreachable')
+        return super().fetch(ticker, start)
+
+
+def test_failed_adjustment_refetch_keeps_stored_bars(tmp_path, history):
+    provider = FailingRefetch({'AAA': history.iloc[:-10], 'BBB': history.iloc[:-10]})
+    new_store(tmp_path, provider).refresh_many(['AAA', 'BBB'])
+    for t in ['AAA', 'BBB']:
+        make_stale(new_store(tmp_path, provider), t)
+    # AAA was split 2:1, BBB only gained bars
+    adjusted = history.copy()
+    adjusted[['Open', 'High', 'Low', 'Close']] /= 2
+    provider.frames = {'AAA': data_store.normalize_bars(adjusted), 'BBB': data_store.normalize_bars(history)}
+
+    store = new_store(tmp_path, provider)
+    bars = store.refresh_many(['AAA', 'BBB'])
+    assert len(bars['AAA']) == len(history) - 10
+    assert len(bars['BBB']) == len(history)
+    assert list(store.errors) == ['AAA']
+
+    make_stale(new_store(tmp_path, provider), 'AAA')
+    assert len(new_store(tmp_path, provider).refresh('AAA')) == len(history) - 10
+
+
+def test_ticker_without_bars_is_not_refetched_until_stale(tmp_path, history):
+    provider = data_store.FixtureProvider({'AAA': history})
+    assert new_store(tmp_path, provider).refresh('NOPE').empty
+    assert new_store(tmp_path, provider).refresh('NOPE').empty
+    assert new_store(tmp_path, provider).refresh_many(['NOPE']) == {}
+    assert provider.calls == [('NOPE', None)]
+
+    make_stale(new_store(tmp_path, provider), 'NOPE')
+    provider.frames['NOPE'] = data_store.normalize_bars(history)
+    assert len(new_store(tmp_path, provider).refresh('NOPE')) == len(history)
+    assert provider.calls == [('NOPE', None), ('NOPE', None)]
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+from pages.utils import downsample
+
+
+def make_candles(periods=1000):
+    index = pd.date_range('2024-01-02 09:30', periods=periods, freq='1min')
+    close = 100 + np.cumsum(np.random.default_rng(0).normal(size=periods))
+    return pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close,
+                         'Volume': np.full(periods, 1e3)}, index=index)
+
+
+def test_in_progress_bar_updates_cached_candles():
+    bars = make_candles()
+    first = downsample.reduce_ohlc(bars, ticker='AAA', num_period='1d')
+
+    ticked = bars.copy()
+    ticked.iloc[-1, ticked.columns.get_loc('Close')] += 5
+    second = downsample.reduce_ohlc(ticked, ticker='AAA', num_period='1d')
+
+    assert second['Close'].iloc[-1] == first['Close'].iloc[-1] + 5
+
+
+def test_readjusted_history_updates_cached_line():
+    close = make_candles(3000)['Close']
+    first = downsample.reduce_line(close, ticker='AAA', num_period='max', name='Close')
+
+    # A split adjusts every bar before it, but not the latest one
+    adjusted = close.copy()
+    adjusted.iloc[:-1] /= 2
+    _, y = downsample.reduce_line(adjusted, ticker='AAA', num_period='max', name='Close')
+
+    assert y[0] == first[1][0] / 2
+    assert y[-1] == first[1][-1]
+
+
+def test_nan_ends_still_hit_the_cache():
+    close = make_candles(3000)['Close']
+    close.iloc[0] = np.nan
+    assert downsample.reduce_line(close, ticker='AAA', num_period='max', name='SMA') is \
+        downsample.reduce_line(close.copy(), ticker='AAA', num_period='max', name='SMA')
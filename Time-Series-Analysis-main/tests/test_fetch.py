@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from pages.utils import data_store, fetch
+
+CSV = b'Date,Open,High,Low,Close,Volume\n2024-01-02,1,2,0.5,1.5,100\n2024-01-03,1.5,2.5,1,2,200\n'
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """/<mode>/<TICKER>.csv, where mode picks the behaviour; every hit is counted per path."""
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        server = self.server
+        with server.lock:
+            server.hits[path] += 1
+            hits = server.hits[path]
+            server.times.append(time.monotonic())
+        mode = path.split('/')[1]
+        if mode == 'slow':
+            time.sleep(0.3)
+        if mode == 'missing' or (mode == 'flaky' and hits <= 2) or mode in ('broken', 'bad'):
+            status = {'missing': 404, 'bad': 400}.get(mode, 503)
+            self.send_response(status)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/csv')
+        self.send_header('Content-Length', str(len(CSV)))
+        self.end_headers()
+        self.wfile.write(CSV)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), StandIn)
+    httpd.hits, httpd.times, httpd.lock = Counter(), [], threading.Lock()
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    httpd.url = f'http://127.0.0.1:{httpd.server_address[1]}'
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def fetcher():
+    """A module-wide fetcher with short backoffs and no rate limit unless a test sets one."""
+    previous = fetch.get_fetcher()
+    yield lambda **kwargs: fetch.set_fetcher(fetch.Fetcher(**{'rate': 0, 'backoff': 0.01, 'max_backoff': 0.02,
+                                                             **kwargs}))
+    fetch.set_fetcher(previous)
+
+
+def test_token_bucket_paces_requests(server, fetcher):
+    fetcher(rate=10, burst=1)
+    started = time.monotonic()
+    for i in range(6):
+        fetch.http_get(f'{server.url}/ok/T{i}.csv')
+    # One token up front, then one every 0.1s
+    assert time.monotonic() - started >= 0.45
+    assert len(server.times) == 6
+
+
+def test_concurrent_identical_requests_are_coalesced(server, fetcher):
+    fetcher()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(fetch.http_get(f'{server.url}/slow/AAA.csv')))
+               for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == [CSV] * 5
+    assert server.hits['/slow/AAA.csv'] == 1
+
+
+def test_5xx_is_retried(server, fetcher):
+    fetcher(retries=3)
+    bars = data_store.HttpProvider(server.url + '/flaky').fetch('AAA')
+    assert len(bars) == 2
+    assert server.hits['/flaky/AAA.csv'] == 3
+
+
+def test_5xx_gives_up_after_retries(server, fetcher):
+    fetcher(retries=2)
+    with pytest.raises(fetch.HTTPStatusError) as info:
+        fetch.http_get(f'{server.url}/broken/AAA.csv')
+    assert info.value.status == 503
+    assert server.hits['/broken/AAA.csv'] == 3
+
+
+def test_4xx_is_not_retried(server, fetcher):
+    fetcher(retries=3)
+    with pytest.raises(fetch.HTTPStatusError):
+        fetch.http_get(f'{server.url}/bad/AAA.csv')
+    assert server.hits['/bad/AAA.csv'] == 1
+
+    # A 404 means no data for the ticker, after a single request
+    assert data_store.HttpProvider(server.url + '/missing').fetch('AAA').empty
+    assert server.hits['/missing/AAA.csv'] == 1
+
+
+def test_programming_errors_are_not_retried(fetcher):
+    fetcher(retries=3)
+    attempts = []
+
+    def broken():
+        attempts.append(1)
+        raise KeyError('Close')
+
+    with pytest.raises(KeyError):
+        fetch.call(('test', 'broken'), broken)
+    assert len(attempts) == 1
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pages.utils import indicators
+
+
+@pytest.fixture
+def close():
+    returns = np.random.default_rng(3).normal(0.0003, 0.015, 2500)
+    return pd.Series(100 * np.exp(np.cumsum(returns)), index=pd.bdate_range('2012-01-02', periods=2500, name='Date'))
+
+
+@pytest.mark.parametrize('name', list(indicators.INDICATORS))
+def test_warmup_slice_within_tolerance(close, name):
+    full = indicators.compute(close, name)
+    for lo in range(800, len(close), 250):
+        values = indicators.window(close, name, start=close.index[lo])
+        expected = full.loc[values.index]
+        error = (values - expected).abs().to_numpy()
+        scale = np.abs(expected.to_numpy())
+        if name == 'MACD':
+            # Relative to MACD while it is at least 0.1% of the price, else to the price level
+            price = close.loc[values.index].to_numpy()[:, None]
+            scale = np.maximum(scale, 1e-3 * price)
+        assert np.nanmax(error / scale) <= indicators.WARMUP_TOLERANCE
+
+
+@pytest.mark.parametrize('name', list(indicators.INDICATORS))
+def test_engine_builds_from_the_warmup_start(close, name):
+    engine = indicators.IndicatorEngine()
+    history, start = close.iloc[:-20], close.index[-260]
+    values = engine.window('AAA', name, history, start)
+    entry = engine.update('AAA', name, history, start)
+    # Only the visible bars plus the warm-up were computed, as on the stateless path
+    assert len(entry['index']) == 240 + indicators.INDICATORS[name].warmup
+    pd.testing.assert_frame_equal(values, indicators.window(history, name, start=start))
+
+    # New bars are folded in, still starting from the same warm-up bar
+    values = engine.window('AAA', name, close, start)
+    assert engine.update('AAA', name, close, start)['index'][0] == entry['index'][0]
+    np.testing.assert_allclose(values.to_numpy(), indicators.window(close, name, start=start).to_numpy(),
+                               rtol=1e-9, equal_nan=True)
+
+    # An earlier start needs more history: rebuilt from there
+    earlier = close.index[-1000]
+    values = engine.window('AAA', name, close, earlier)
+    assert values.index[0] == earlier
+    pd.testing.assert_frame_equal(values, indicators.window(close, name, start=earlier))
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pages.utils import intraday
+
+
+def make_minutes(days=6, start='2024-03-07'):
+    """Regular-session 1-minute bars on business days, across the March DST change."""
+    stamps = [pd.date_range(f'{day.date()} 09:30', f'{day.date()} 15:59', freq='1min', tz=intraday.TIMEZONE)
+              for day in pd.bdate_range(start, periods=days)]
+    index = stamps[0].append(stamps[1:]).as_unit('s')
+    close = 100 + np.cumsum(np.random.default_rng(0).normal(scale=0.05, size=len(index)))
+    return pd.DataFrame({'Open': close, 'High': close + 0.1, 'Low': close - 0.1, 'Close': close,
+                         'Volume': np.full(len(index), 100.0)}, index=index)
+
+
+def pandas_resample(minutes, rule):
+    agg = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+    return minutes.resample(rule).agg(agg).dropna(subset=['Close'])
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = intraday.IntradayStore(str(tmp_path), source=None)
+    store.append('AAA', make_minutes())
+    return store
+
+
+@pytest.mark.parametrize('resolution, rule', [('5m', '5min'), ('1h', '1h'), ('1d', '1D')])
+def test_chunked_resample_matches_pandas(resolution, rule):
+    minutes = make_minutes()
+    records = intraday.to_records(minutes)
+    # Chunks far smaller than a bucket, so most buckets straddle a chunk boundary
+    chunked = intraday.to_frame(intraday.resample(records, intraday.RESOLUTIONS[resolution], chunk_rows=7))
+    one_pass = intraday.to_frame(intraday.resample(records, intraday.RESOLUTIONS[resolution], chunk_rows=len(records)))
+
+    pd.testing.assert_frame_equal(chunked, one_pass)
+    pd.testing.assert_frame_equal(chunked, pandas_resample(minutes, rule), check_freq=False, check_names=False)
+
+
+def test_bars_of_a_range(store):
+    minutes = make_minutes()
+    start, end = minutes.index[500], minutes.index[1500]
+    bars = store.bars('AAA', '15m', start, end)
+    expected = pandas_resample(minutes[(minutes.index >= start) & (minutes.index < end)], '15min')
+    pd.testing.assert_frame_equal(bars, expected, check_freq=False, check_names=False)
+    assert not bars.attrs['clipped']
+
+
+def test_bars_are_capped_at_max_bars(store, monkeypatch):
+    monkeypatch.setattr(intraday, 'MAX_BARS', 20)
+    minutes = make_minutes()
+
+    bars = store.bars('AAA', '1m')
+    assert bars.attrs['clipped']
+    pd.testing.assert_frame_equal(bars, minutes.iloc[-20:], check_freq=False, check_names=False)
+
+    # Each hourly bar is complete: the partial bucket at the cut is dropped
+    hourly = store.bars('AAA', '1h')
+    assert hourly.attrs['clipped'] and 0 < len(hourly) <= 20
+    expected = pandas_resample(minutes, '1h')
+    pd.testing.assert_frame_equal(hourly, expected.iloc[-len(hourly):], check_freq=False, check_names=False)
+
+
+def test_bars_for_period_adds_warmup(store):
+    minutes = make_minutes()
+    bars = store.bars_for_period('AAA', '1m', '1d', warmup=30)
+    first_visible = minutes.index.searchsorted(minutes.index[-1] - pd.Timedelta(days=1))
+    assert bars.index[0] == minutes.index[first_visible - 30]
+    assert bars.index[-1] == minutes.index[-1]
@@ -0,0 +1,54 @@
+import os
+import pickle
+import pytest
+from pages.utils import model_cache
+
+
+@pytest.fixture
+def scans(monkeypatch):
+    calls = []
+    scandir = os.scandir
+
+    def counting(path):
+        calls.append(path)
+        return scandir(path)
+
+    monkeypatch.setattr(os, 'scandir', counting)
+    return calls
+
+
+def test_directory_is_scanned_only_when_over_budget(tmp_path, scans):
+    cache = model_cache.ModelCache(str(tmp_path), max_memory_entries=4, max_disk_entries=20)
+    for i in range(100):
+        cache.put(f'k{i}', {'value': i})
+
+    files = [name for name in os.listdir(tmp_path) if name.endswith('.pkl')]
+    assert len(files) <= 20
+    # One scan to learn the usage, then one each time the count passes 20 (trimming to 18)
+    assert len(scans) < 50
+    assert cache.get('k99') == {'value': 99}
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = model_cache.ModelCache(str(tmp_path), max_memory_entries=1, max_disk_entries=10)
+    for i in range(10):
+        cache.put(f'k{i}', i)
+        os.utime(cache._path(f'k{i}'), (i, i))
+    cache.get('k0')  # touching it makes it the most recent
+    cache.put('k10', 10)
+
+    assert cache.get('k0') == 0
+    assert cache.get('k1') is None
+    assert len(os.listdir(tmp_path)) == 9
+
+
+@pytest.mark.parametrize('payload', [
+    b'cno_such_module\nthing\n.',           # ImportError: class moved to another module
+    b'cbuiltins\nno_such_name\n.',          # AttributeError: class renamed
+    pickle.dumps(1)[:-3],                   # truncated file
+])
+def test_unloadable_pickle_is_a_miss(tmp_path, payload):
+    cache = model_cache.ModelCache(str(tmp_path))
+    with open(cache._path('key'), 'wb') as f:
+        f.write(payload)
+    assert cache.get('key') is None
@@ -0,0 +1,24 @@
+import numpy as np
+import pandas as pd
+from pages.utils.model_train import get_panel_rolling_mean, get_rolling_mean
+
+
+def test_panel_rolling_mean_skips_holes_per_ticker():
+    index = pd.bdate_range('2024-01-02', periods=60, name='Date')
+    rng = np.random.default_rng(0)
+    panel = pd.DataFrame({'AAA': 100 + rng.normal(size=60).cumsum(),
+                          'BBB': 50 + rng.normal(size=60).cumsum()}, index=index)
+    # BBB did not trade on one day in the middle (a local holiday, a halt)
+    panel.iloc[30, 1] = np.nan
+
+    rolled = get_panel_rolling_mean(panel)
+
+    assert rolled.index.equals(panel.index)
+    assert rolled['BBB'].isna().sum() == 6 + 1
+    pd.testing.assert_series_equal(rolled['BBB'].dropna(), get_rolling_mean(panel['BBB'].dropna()))
+    pd.testing.assert_series_equal(rolled['AAA'].dropna(), get_rolling_mean(panel['AAA']))
+
+
+def test_panel_rolling_mean_of_an_empty_panel():
+    panel = pd.DataFrame(index=pd.DatetimeIndex([], name='Date'))
+    assert get_panel_rolling_mean(panel).empty
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pages.utils import portfolio
+
+
+@pytest.fixture
+def assets():
+    # Daily returns in percent, as daily_return() produces them
+    rng = np.random.default_rng(0)
+    index = pd.date_range('2022-01-03', periods=500, freq='B')
+    drift = np.array([0.02, 0.05, 0.08, 0.03, 0.06])
+    scale = np.array([0.8, 1.2, 2.0, 1.0, 1.5])
+    common = rng.normal(size=(len(index), 1))
+    returns = drift + scale * (0.5 * common + rng.normal(size=(len(index), len(drift))))
+    frame = pd.DataFrame(returns, index=index, columns=['AAA', 'BBB', 'CCC', 'DDD', 'EEE'])
+    frame['sp500'] = frame.mean(axis=1)
+    return portfolio.moments(frame)
+
+
+@pytest.mark.parametrize('solve', [portfolio.min_variance, portfolio.max_sharpe])
+def test_long_only_weights_are_a_simplex(assets, solve):
+    mu, cov = assets
+    w = solve(mu, cov)
+    assert list(w.index) == list(mu.index)
+    assert w.sum() == pytest.approx(1.0)
+    assert (w >= 0).all()
+
+
+def test_min_variance_beats_every_simulated_portfolio(assets):
+    mu, cov = assets
+    points = portfolio.simulate(mu, cov, 20_000, memory_budget=64 * 1024)
+    vol = portfolio.performance(portfolio.min_variance(mu, cov), mu, cov)['Volatility']
+    assert vol <= points['Volatility'].min() + 1e-9
+
+
+def test_max_sharpe_beats_every_simulated_portfolio(assets):
+    mu, cov = assets
+    points = portfolio.simulate(mu, cov, 20_000, rf=0.02)
+    sharpe = portfolio.performance(portfolio.max_sharpe(mu, cov, rf=0.02), mu, cov, rf=0.02)['Sharpe']
+    assert sharpe >= points['Sharpe'].max() - 1e-9
+
+
+def test_simulate_is_independent_of_chunking(assets):
+    mu, cov = assets
+    one_pass = portfolio.simulate(mu, cov, 5_000)
+    chunked = portfolio.simulate(mu, cov, 5_000, memory_budget=4 * 1024)
+    pd.testing.assert_frame_equal(one_pass, chunked, rtol=1e-12)
+
+
+def test_closed_form_matches_long_only_when_no_weight_binds():
+    # Two uncorrelated assets: the unconstrained optimum is already long-only
+    mu = pd.Series([0.05, 0.10], index=['AAA', 'BBB'])
+    cov = pd.DataFrame(np.diag([0.04, 0.09]), index=mu.index, columns=mu.index)
+    pd.testing.assert_series_equal(portfolio.min_variance(mu, cov, long_only=False),
+                                   pd.Series([9 / 13, 4 / 13], index=mu.index, name='Weight'))
+    pd.testing.assert_series_equal(portfolio.min_variance(mu, cov),
+                                   portfolio.min_variance(mu, cov, long_only=False), atol=1e-6)
+    # The Sharpe ratio is flat near its peak, so compare it rather than the weights
+    sharpe = [portfolio.performance(portfolio.max_sharpe(mu, cov, long_only=long_only), mu, cov)['Sharpe']
+              for long_only in (True, False)]
+    assert sharpe[0] == pytest.approx(sharpe[1], rel=1e-5)
+
+
+@pytest.mark.parametrize('long_only', [True, False])
+def test_frontier_starts_at_min_variance(assets, long_only):
+    mu, cov = assets
+    curve = portfolio.frontier(mu, cov, points=12, long_only=long_only)
+    start = portfolio.performance(portfolio.min_variance(mu, cov, long_only), mu, cov)
+
+    assert curve['Return'].iloc[0] == pytest.approx(start['Return'])
+    assert curve['Volatility'].iloc[0] == pytest.approx(start['Volatility'], rel=1e-4)
+    assert (np.diff(curve['Volatility']) >= -1e-9).all()
+    if long_only:
+        assert curve['Return'].iloc[-1] == pytest.approx(mu.max())
+        # Every long-only mix lies on or to the right of the frontier
+        points = portfolio.simulate(mu, cov, 20_000)
+        bucket = np.searchsorted(curve['Return'], points['Return']).clip(1, len(curve) - 1)
+        assert (points['Volatility'] >= np.minimum(curve['Volatility'].iloc[bucket - 1].to_numpy(),
+                                                   curve['Volatility'].iloc[bucket].to_numpy()) - 1e-6).all()
@@ -0,0 +1,85 @@
+import copy
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from pages.utils import data_store, indicators, parallel, precompute
+
+
+@pytest.fixture
+def close():
+    values = 100 + np.cumsum(np.random.default_rng(7).normal(size=400))
+    return pd.Series(values, index=pd.bdate_range('2022-01-03', periods=400, name='Date'), name='Close')
+
+
+@pytest.fixture
+def published(close, tmp_path, monkeypatch):
+    """A result store holding indicators for all but the last 5 bars of close."""
+    store = precompute.ResultStore(str(tmp_path))
+    version = store.begin()
+    store.put(version, 'indicators', 'AAA', *precompute.indicator_result(close.iloc[:-5]))
+    store.publish(version, {'indicators': {'AAA': {}}})
+    monkeypatch.setattr(precompute, '_store', store)
+    monkeypatch.setattr(indicators, '_engine', indicators.IndicatorEngine())
+    return store
+
+
+def test_reseed_after_eviction_matches_compute(close, published):
+    engine = indicators.get_engine()
+    for _ in range(2):
+        # The second round reseeds from the store's cached state after the engine forgot the ticker
+        engine._entries.clear()
+        assert precompute.load_indicators('AAA')
+        for name in indicators.INDICATORS:
+            window = engine.window('AAA', name, close)
+            expected = indicators.compute(close, name)
+            np.testing.assert_allclose(window.to_numpy(), expected.to_numpy(), rtol=1e-9, equal_nan=True)
+
+
+def test_seed_leaves_published_state_untouched(close, published):
+    _, meta = published.get('indicators', 'AAA')
+    before = copy.deepcopy(meta['states'])
+    precompute.load_indicators('AAA')
+    for name in indicators.INDICATORS:
+        indicators.get_engine().window('AAA', name, close)
+    assert meta['states'] == before
+
+
+def test_forecast_needs_same_bars_and_options(tmp_path, monkeypatch):
+    store = precompute.ResultStore(str(tmp_path))
+    version = store.begin()
+    options = {'search_method': 'grid', 'search_budget': 60}
+    frame = pd.DataFrame({'Date': pd.bdate_range('2024-06-03', periods=3), 'Close': [1.0, 2.0, 3.0]})
+    store.put(version, 'forecast', 'AAA', frame, {'as_of': '2024-05-31 00:00:00', 'options': options})
+    store.publish(version, {'forecast': {'AAA': {'as_of': '2024-05-31 00:00:00', 'options': options}}})
+    monkeypatch.setattr(precompute, '_store', store)
+
+    assert precompute.get_forecast('AAA', pd.Timestamp('2024-05-31'), options) is not None
+    assert precompute.get_forecast('AAA', pd.Timestamp('2024-05-31'), {**options, 'search_budget': 60.0}) is not None
+    assert precompute.get_forecast('AAA', pd.Timestamp('2024-06-03'), options) is None
+    assert precompute.get_forecast('AAA', pd.Timestamp('2024-05-31'), {**options, 'search_method': 'stepwise'}) is None
+    assert precompute.get_forecast('AAA', pd.Timestamp('2024-05-31'), {**options, 'search_budget': 30}) is None
+
+
+def hang(ticker, options):
+    time.sleep(60)
+
+
+def test_hung_job_fails_without_blocking_the_pass(close, tmp_path, monkeypatch):
+    frame = pd.DataFrame({'Open': close, 'High': close, 'Low': close, 'Close': close, 'Volume': 1.0})
+    monkeypatch.setattr(data_store, '_store', data_store.PriceStore(str(tmp_path / 'prices'),
+                                                                     data_store.FixtureProvider({'AAA': frame})))
+    # Forked workers see the patched job table
+    monkeypatch.setattr(parallel, 'START_METHOD', 'fork')
+    monkeypatch.setitem(precompute.JOBS, 'forecast', hang)
+
+    store = precompute.ResultStore(str(tmp_path / 'precompute'))
+    with precompute.Precompute(['AAA'], store=store, workers=2, job_timeout=2, log=lambda message: None) as service:
+        started = time.monotonic()
+        manifest = service.run_once()
+        assert time.monotonic() - started < 10
+        assert service._pool is None
+        assert 'no result within' in manifest['failures']['AAA']['forecast']
+        assert list(manifest['results']) == ['indicators']
+        # The timed-out job is due again on the next pass
+        assert [key[0] for key in service.due()] == ['forecast']
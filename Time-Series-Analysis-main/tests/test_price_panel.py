@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pages.utils import capm_functions, price_panel
+
+
+def make_close(names, dates, seed):
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({'Date': pd.DatetimeIndex(dates)})
+    for name in names:
+        frame[name] = 100 * np.cumprod(1 + rng.normal(0, 0.01, len(dates)))
+    return frame
+
+
+@pytest.fixture
+def stocks():
+    # A US holiday the market also skips, plus a stock-only halt day missing
+    dates = pd.bdate_range('2024-06-03', periods=40).delete([7, 15])
+    frame = make_close(['AAA', 'BBB'], dates, 0)
+    frame.loc[20, 'BBB'] = np.nan
+    return frame
+
+
+@pytest.fixture
+def market():
+    dates = pd.bdate_range('2024-05-31', periods=45).delete([8, 30])
+    return make_close(['sp500'], dates, 1)
+
+
+def as_frame(panel):
+    return panel.to_frame().astype({name: np.float64 for name in panel.names})
+
+
+def test_from_frame_sorts_and_keeps_the_last_row_per_day(stocks):
+    # Newest first, then a second row for day 3 that should replace the first
+    unsorted = pd.concat([stocks.iloc[::-1], stocks.iloc[[3]].assign(AAA=1.0)])
+    unsorted['Note'] = 'x'
+    panel = price_panel.from_frame(unsorted)
+
+    assert panel.names == ['AAA', 'BBB']
+    expected = stocks.copy()
+    expected.loc[3, 'AAA'] = 1.0
+    pd.testing.assert_frame_equal(as_frame(panel), expected, check_dtype=False)
+    pd.testing.assert_frame_equal(as_frame(price_panel.from_frame(stocks.set_index('Date'))), stocks, check_dtype=False)
+
+
+def test_from_frame_uses_the_local_calendar_day():
+    index = pd.date_range('2024-03-08 16:00', periods=3, freq='D', tz='America/New_York')
+    panel = price_panel.from_frame(pd.DataFrame({'AAA': [1.0, 2.0, 3.0]}, index=index))
+    assert panel.index.strftime('%Y-%m-%d').tolist() == ['2024-03-08', '2024-03-09', '2024-03-10']
+
+
+@pytest.mark.parametrize('how', ['inner', 'outer'])
+def test_align_matches_merge(stocks, market, how):
+    merged = price_panel.from_frame(stocks).align(price_panel.from_frame(market), how=how)
+    expected = stocks.merge(market, on='Date', how=how).sort_values('Date', ignore_index=True)
+    pd.testing.assert_frame_equal(as_frame(merged), expected, check_dtype=False)
+
+
+def test_ffill_align_matches_merge_asof(stocks, market):
+    market = market.copy()
+    market.loc[12, 'sp500'] = np.nan  # a missing value is carried over like a missing day
+    merged = price_panel.from_frame(stocks).align(price_panel.from_frame(market), how='ffill')
+    expected = pd.merge_asof(stocks, market.ffill(), on='Date', direction='backward')
+    pd.testing.assert_frame_equal(as_frame(merged), expected, check_dtype=False)
+
+
+@pytest.mark.parametrize('how', ['inner', 'outer'])
+def test_daily_return_matches_pct_change(stocks, market, how):
+    merged = price_panel.from_frame(stocks).align(price_panel.from_frame(market), how=how)
+    frame = stocks.merge(market, on='Date', how=how).sort_values('Date', ignore_index=True)
+    returns = capm_functions.daily_return(merged)
+    expected = capm_functions.daily_return(frame)
+    pd.testing.assert_frame_equal(as_frame(returns), expected, check_dtype=False)
+    assert np.array_equal(expected.iloc[1:, 1:], (frame.iloc[:, 1:].pct_change() * 100).fillna(0).iloc[1:])
@@ -0,0 +1,27 @@
+import os
+from pages.utils import profiling
+
+
+def test_trace_writes_prometheus_textfile(tmp_path, monkeypatch):
+    path = tmp_path / 'ts.prom'
+    monkeypatch.setattr(profiling, 'PROM_PATH', str(path))
+    monkeypatch.setattr(profiling, '_enabled', True)
+
+    profiling.start_trace('Test_Page')
+    with profiling.span('test.stage'):
+        pass
+    profiling.finish_trace()
+
+    text = path.read_text()
+    assert 'ts_span_duration_seconds_count{span="test.stage"}' in text
+    assert 'ts_span_duration_seconds_count{span="page.Test_Page"}' in text
+    assert os.listdir(tmp_path) == ['ts.prom']
+
+
+def test_no_textfile_while_profiling_is_off(tmp_path, monkeypatch):
+    path = tmp_path / 'ts.prom'
+    monkeypatch.setattr(profiling, 'PROM_PATH', str(path))
+    monkeypatch.setattr(profiling, '_enabled', False)
+
+    assert profiling.write_prometheus() is None
+    assert not path.exists()
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+from numpy.lib.stride_tricks import sliding_window_view
+from pages.utils import price_panel, rolling_stats
+
+WINDOWS = [5, 63, 252]
+
+
+@pytest.fixture
+def returns():
+    rng = np.random.default_rng(0)
+    n = 3000
+    market = rng.normal(0.04, 1.0, n)
+    frame = pd.DataFrame({'Date': pd.bdate_range('2012-01-02', periods=n)})
+    for beta, stock in zip([0.5, 1.2, -0.3], ['AAA', 'BBB', 'CCC']):
+        frame[stock] = beta * market + rng.normal(0.02, 1.5, n)
+    frame['sp500'] = market
+    return frame
+
+
+def pandas_stat(returns, window, stat):
+    frame = returns.set_index('Date')
+    stocks, market = frame.drop(columns='sp500'), frame['sp500']
+    rolling = stocks.rolling(window)
+    if stat == 'beta':
+        return rolling.cov(market).div(market.rolling(window).var(), axis=0)
+    if stat == 'correlation':
+        return rolling.corr(market)
+    if stat == 'volatility':
+        return rolling.std() * np.sqrt(252)
+    if stat == 'sharpe':
+        excess = stocks - 2 / 252
+        return excess.rolling(window).mean() / excess.rolling(window).std() * np.sqrt(252)
+    wealth = (1 + frame / 100).cumprod()
+    return wealth / wealth.rolling(window).max() - 1
+
+
+STATS = {
+    'beta': lambda r, w: rolling_stats.rolling_beta(r, w),
+    'correlation': lambda r, w: rolling_stats.rolling_correlation(r, w),
+    'volatility': lambda r, w: rolling_stats.rolling_volatility(r, w),
+    'sharpe': lambda r, w: rolling_stats.rolling_sharpe(r, w, rf=2),
+    'drawdown': lambda r, w: rolling_stats.rolling_drawdown(r, w),
+}
+
+
+@pytest.mark.parametrize('stat', list(STATS))
+@pytest.mark.parametrize('as_panel', [False, True])
+def test_matches_pandas_rolling(returns, stat, as_panel):
+    data = price_panel.from_frame(returns) if as_panel else returns
+    result = STATS[stat](data, WINDOWS)
+    for window in WINDOWS:
+        expected = pandas_stat(returns, window, stat)
+        got = result[window][expected.columns]
+        np.testing.assert_allclose(got.to_numpy(), expected.to_numpy(), rtol=1e-9, atol=1e-12)
+
+
+def test_window_longer_than_history(returns):
+    result = rolling_stats.rolling_volatility(returns.iloc[:10], [5, 20])
+    assert result[20].isna().all().all()
+    assert result[5].iloc[4:].notna().all().all()
+
+
+def test_long_high_level_series():
+    # Twenty thousand bars of a random walk around 10,000: window variance is
+    # tiny next to the squared level, the case plain cumulative sums get wrong
+    rng = np.random.default_rng(1)
+    n = 20000
+    market = 10_000 + rng.normal(size=n).cumsum()
+    stock = 5_000 + 0.5 * (market - 10_000) + rng.normal(size=n).cumsum()
+    frame = pd.DataFrame({'AAA': stock, 'sp500': market})
+
+    for window in [21, 252]:
+        volatility = rolling_stats.rolling_volatility(frame[['AAA']], [window])[window]['AAA'].to_numpy()
+        exact = sliding_window_view(stock, window).std(axis=1, ddof=1) * np.sqrt(252)
+        np.testing.assert_allclose(volatility[window - 1:], exact, rtol=1e-10)
+        pandas = frame['AAA'].rolling(window).std().to_numpy() * np.sqrt(252)
+        np.testing.assert_allclose(volatility, pandas, rtol=1e-6)
+
+        beta = rolling_stats.rolling_beta(frame, [window])[window]['AAA'].to_numpy()
+        xs, ms = sliding_window_view(stock, window), sliding_window_view(market, window)
+        cov = ((xs - xs.mean(axis=1, keepdims=True)) * (ms - ms.mean(axis=1, keepdims=True))).mean(axis=1)
+        np.testing.assert_allclose(beta[window - 1:], cov / ms.var(axis=1), rtol=1e-9)
+
+
+@pytest.mark.parametrize('n, window', [(100, 7), (100, 10), (100, 100), (100, 1), (5, 9)])
+def test_sliding_max_matches_pandas(n, window):
+    values = np.random.default_rng(2).normal(size=(n, 3))
+    expected = pd.DataFrame(values).rolling(window).max().to_numpy()
+    np.testing.assert_array_equal(rolling_stats._sliding_max(values, window), expected)
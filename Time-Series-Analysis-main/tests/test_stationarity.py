@@ -0,0 +1,86 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from pages.utils import parallel, stationarity
+
+
+@pytest.fixture
+def log(tmp_path, monkeypatch):
+    log = stationarity.PValueLog(str(tmp_path / 'stationarity.jsonl'))
+    monkeypatch.setattr(stationarity, '_log', log)
+    return log
+
+
+@pytest.fixture
+def panel():
+    rng = np.random.default_rng(0)
+    index = pd.bdate_range('2022-01-03', periods=300, name='Date')
+    walk = 100 + rng.normal(size=300).cumsum()
+    frame = pd.DataFrame({'WALK': walk,                          # one difference
+                          'NOISE': 100 + rng.normal(size=300),    # already stationary
+                          'TREND': 100 + rng.normal(size=300).cumsum().cumsum() / 10,
+                          'SAME': walk}, index=index)
+    frame.iloc[::17, 1] = np.nan  # calendar holes are skipped, not tested
+    return frame
+
+
+@pytest.fixture
+def count_tests(monkeypatch):
+    calls = []
+    pvalue = stationarity._pvalue
+
+    def counting(values, test):
+        calls.append(test)
+        return pvalue(values, test)
+
+    monkeypatch.setattr(stationarity, '_pvalue', counting)
+    return calls
+
+
+@pytest.mark.parametrize('test', ['adf', 'kpss'])
+def test_panel_matches_one_series_at_a_time(log, panel, test, count_tests):
+    orders = stationarity.differencing_orders(panel, test=test, workers=1)
+    assert orders.index.tolist() == panel.columns.tolist()
+    assert orders.tolist() == [1, 0, 2, 1]
+
+    log.clear()
+    for column in panel.columns:
+        assert stationarity.differencing_order(panel[column], test=test) == orders[column]
+
+
+def test_panel_is_answered_from_the_log(log, panel, count_tests):
+    first = stationarity.differencing_orders(panel, workers=1)
+    tested = len(count_tests)
+    # SAME repeats WALK, so they share a record
+    assert len(log._loaded()) == 3
+
+    # A fresh process replays the file
+    stationarity._log = stationarity.PValueLog(log.path)
+    pd.testing.assert_series_equal(stationarity.differencing_orders(panel, workers=1), first)
+    assert len(count_tests) == tested
+    assert stationarity.pvalue(panel['WALK'], order=1) == stationarity._log.get(
+        stationarity.model_cache.fingerprint(panel['WALK'].to_numpy()), 'adf')[1]
+    assert len(count_tests) == tested
+
+
+def test_panel_on_worker_processes(log, panel, monkeypatch):
+    monkeypatch.setattr(parallel, 'START_METHOD', 'fork')
+    serial = stationarity.differencing_orders(panel, workers=1)
+    log.clear()
+    pd.testing.assert_series_equal(stationarity.differencing_orders(panel, workers=2), serial)
+
+
+def test_log_is_compacted(tmp_path):
+    log = stationarity.PValueLog(str(tmp_path / 'p.jsonl'), max_series=3)
+    for i in range(10):
+        log.add({f'fp{i}': {'adf': {0: i / 10}}})
+        log.add({f'fp{i}': {'kpss': {0: i / 100}}})
+
+    with open(log.path) as f:
+        lines = [json.loads(line) for line in f]
+    assert len(lines) <= 7
+    replayed = stationarity.PValueLog(log.path)
+    assert replayed.get('fp9', 'adf') == {0: 0.9}
+    assert replayed.get('fp9', 'kpss') == {0: 0.09}
+    assert replayed.get('fp0', 'adf') == {}